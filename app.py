@@ -4,23 +4,32 @@ from auth.authentication import login, logout, is_authenticated, get_current_use
 from modules import show_dashboard, show_beneficiaries
 from modules.activities import show_activities_main
 from modules.donations import show_donations_main as show_donations
+from modules.settings import show_settings
 
 # ... بعد استيراد streamlit
 
 # 1. استيراد الإعدادات
 from config import Config
 
-# 2. تهيئة المجلدات فوراً
-print("🔧 جاري تهيئة المجلدات...")
-if Config.setup_directories():
-    print("✅ المجلدات جاهزة")
-else:
-    print("⚠️  مشكلة في إنشاء المجلدات")
+from database.session import db_manager
+from database.instrumentation import track_rerun, set_current_page
+
+# 2. تهيئة المجلدات وقاعدة البيانات مرة واحدة لكل عملية (وليس مع كل إعادة تشغيل للصفحة)
+@st.cache_resource(show_spinner=False)
+def init_system():
+    """تهيئة المجلدات ومحرك قاعدة البيانات (مورد مشترك بين كل الجلسات)"""
+    print("🔧 جاري تهيئة المجلدات...")
+    if Config.setup_directories():
+        print("✅ المجلدات جاهزة")
+    else:
+        print("⚠️  مشكلة في إنشاء المجلدات")
+    
+    db_manager.initialize()
+    print("✅ قاعدة البيانات جاهزة")
+    return db_manager
 
-# 3. استيراد باقي المكتبات
 try:
-    from database.session import db_manager
-    print("✅ قاعدة البيانات جاهزة")
+    init_system()
 except Exception as e:
     print(f"❌ خطأ في قاعدة البيانات: {e}")
     st.error("خطأ في تهيئة النظام. يرجى مراجعة السجلات.")
@@ -61,8 +70,38 @@ def apply_custom_css():
 apply_custom_css()
 
 
+# أسماء الصفحات في إحصائيات الاستعلامات
+PAGE_KEYS = {
+    "🏠 لوحة التحكم": "dashboard",
+    "👥 المستفيدون": "beneficiaries",
+    "📅 الأنشطة": "activities",
+    "💰 التبرعات": "donations",
+    "📊 التقارير": "reports",
+    "👨‍💼 الموظفون": "employees",
+    "🏢 إدارة الأسر": "families",
+    "⚙️ الإعدادات": "settings",
+}
+
+
 def main_page():
-    """الصفحة الرئيسية"""
+    """الصفحة الرئيسية (كل استعلامات إعادة التشغيل تُنسب إلى الصفحة المعروضة)"""
+    with track_rerun("login") as rerun:
+        _render_main_page()
+
+    if Config.DEBUG and rerun.detector.findings:
+        _show_n_plus_one_warning(rerun.detector.findings)
+
+
+def _show_n_plus_one_warning(findings):
+    """تنبيه المطور (وضع DEBUG فقط) بجمل تكررت داخل حلقة في هذا العرض"""
+    st.warning(f"🐞 تم رصد {len(findings)} نمط استعلامات N+1 في هذه الصفحة")
+    with st.expander("تفاصيل N+1"):
+        for finding in findings:
+            st.markdown(f"**{finding.count} مرة** - `{finding.call_site}`")
+            st.code(finding.fingerprint[:500], language="sql")
+            st.code("\n".join(finding.stack) or finding.call_site)
+
+def _render_main_page():
     st.title("🕌 نظام إدارة الجمعية الخيرية")
     st.markdown("---")
     
@@ -171,6 +210,8 @@ def show_authenticated_ui(user_data):
             
             st.rerun()
     
+    set_current_page(PAGE_KEYS.get(selected, selected))
+    
     # عرض المحتوى حسب الاختيار
     if selected == "🏠 لوحة التحكم":
         show_dashboard(user_data)
@@ -194,29 +235,9 @@ def show_authenticated_ui(user_data):
         # سأستخدم حالياً نفس صفحة المستفيدين حيث تحتوي على إدارة الأسر
         show_beneficiaries(user_data)
     elif selected == "⚙️ الإعدادات" and user_data['role'] == 'admin':
-        st.info("🚧 صفحة الإعدادات قيد التطوير")
+        show_settings(user_data)
     # ... وهكذا لباقي الصفحات
 
-def show_dashboard(user_data):
-    """عرض لوحة التحكم"""
-    st.header("🏠 لوحة التحكم")
-    st.write(f"مرحباً بك في نظام إدارة الجمعية، {user_data['full_name']}!")
-    
-    # إحصائيات سريعة
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("👥 المستفيدون", "150")
-    
-    with col2:
-        st.metric("📅 الأنشطة", "24")
-    
-    with col3:
-        st.metric("💰 التبرعات", "₣45,320")
-    
-    with col4:
-        st.metric("🏢 الأسر", "42")
-
 # def show_beneficiaries(user_data):
 #     """عرض صفحة المستفيدين"""
 #     st.header("👥 إدارة المستفيدين")
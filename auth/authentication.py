@@ -1,8 +1,252 @@
 # auth/authentication.py - النسخة المصححة
-from database.session import session_scope
+"""
+تسجيل الدخول والخروج والتحقق من الجلسات
+
+التحقق يتم مع كل إعادة تشغيل للصفحة، لذلك:
+- نتيجة التحقق تُحفظ في ذاكرة العملية لمدة Config.SESSION_CACHE_TTL ثانية
+  (تُلغى فوراً عند تسجيل الخروج)، والقراءة عند انتهائها من جلسة قراءة فقط
+- last_activity يُكتب مرة واحدة على الأكثر لكل جلسة كل
+  Config.SESSION_ACTIVITY_INTERVAL ثانية بدلاً من معاملة كتابة مع كل نقرة
+- هذه الكتابات و last_login لا تُنفذ في طلب المستخدم: تُجمع في الذاكرة
+  (session_flusher) وتُكتب بجملة UPDATE مجمعة كل Config.SESSION_FLUSH_INTERVAL
+  ثانية من خيط خلفي، وعند إغلاق العملية؛ لذلك قد تتأخر القيم المعروضة
+  بضع ثوانٍ
+
+تعطيل المستخدم أو تغيير دوره يظهر بعد انتهاء مدة صلاحية الذاكرة (أو فوراً
+عبر session_cache.revoke_user)
+"""
+from config import Config
+from database.session import session_scope, read_session_scope, run_in_transaction
 from database.models import User, UserSession
 from datetime import datetime, timedelta
+from sqlalchemy import bindparam, update
+import atexit
 import secrets
+import threading
+import time
+
+# عند تجاوز هذا العدد تُحذف العناصر المنتهية من الذاكرة
+_SESSION_CACHE_PRUNE_SIZE = 1000
+
+
+class SessionCache:
+    """ذاكرة نتائج التحقق من الجلسات (token -> بيانات المستخدم)"""
+
+    def __init__(self, ttl_seconds: float = 30, activity_interval: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self.activity_interval = activity_interval
+        # token -> [cached_until, session_expires_at, user_data, activity_written_at]
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.activity_writes = 0
+
+    def get(self, session_token: str):
+        """بيانات المستخدم إذا كانت النتيجة المحفوظة ما زالت صالحة"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_token)
+            if entry is None or entry[0] <= now or entry[1] <= datetime.now():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry[2])
+
+    def put(self, session_token: str, user_data: dict, expires_at: datetime,
+            last_activity: datetime = None):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= _SESSION_CACHE_PRUNE_SIZE:
+                self._prune(now)
+            previous = self._entries.get(session_token)
+            if previous is not None:
+                written = previous[3]
+            elif last_activity is not None:
+                # تحويل وقت آخر نشاط المسجل إلى ساعة monotonic
+                written = now - (datetime.now() - last_activity).total_seconds()
+            else:
+                written = None
+            self._entries[session_token] = [now + self.ttl_seconds, expires_at, dict(user_data), written]
+
+    def claim_activity_write(self, session_token: str) -> bool:
+        """True إذا حان وقت كتابة last_activity لهذه الجلسة (ويُسجل أنها كُتبت الآن)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_token)
+            if entry is None:
+                return True
+            if entry[3] is not None and now - entry[3] < self.activity_interval:
+                return False
+            entry[3] = now
+            self.activity_writes += 1
+            return True
+
+    def revoke(self, session_token: str):
+        with self._lock:
+            self._entries.pop(session_token, None)
+
+    def revoke_user(self, user_id: int):
+        """إلغاء كل الجلسات المحفوظة لمستخدم (بعد تعطيله أو تغيير دوره)"""
+        with self._lock:
+            for token in [t for t, entry in self._entries.items() if entry[2].get("user_id") == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _prune(self, now: float):
+        expired = [token for token, entry in self._entries.items() if entry[0] <= now]
+        for token in expired:
+            del self._entries[token]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "activity_writes": self.activity_writes,
+            }
+
+
+session_cache = SessionCache(Config.SESSION_CACHE_TTL, Config.SESSION_ACTIVITY_INTERVAL)
+
+
+class SessionWriteBehind:
+    """تجميع تحديثات last_activity و last_login وكتابتها دفعة واحدة من خيط خلفي
+
+    لكل جلسة/مستخدم تُحفظ آخر قيمة فقط، فالتحديثات المتكررة بين دفعتين
+    تصبح صفاً واحداً. نسخة واحدة لكل عملية (session_flusher) تبقى عبر
+    إعادات تشغيل Streamlit لأن الوحدة لا يعاد تحميلها.
+    """
+
+    def __init__(self, interval: float = 5, max_pending: int = 10000):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._sessions = {}  # token -> last_activity
+        self._logins = {}    # user_id -> last_login
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self.events = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.failures = 0
+
+    # ---------- التسجيل ----------
+
+    def touch_session(self, session_token: str, at: datetime = None):
+        self._record(self._sessions, session_token, at or datetime.now())
+
+    def record_login(self, user_id: int, at: datetime = None):
+        self._record(self._logins, user_id, at or datetime.now())
+
+    def _record(self, pending: dict, key, at: datetime):
+        with self._lock:
+            self.events += 1
+            if pending.get(key) is None or pending[key] < at:
+                pending[key] = at
+            full = len(self._sessions) + len(self._logins) >= self.max_pending
+        if self._stopped:
+            # بعد الإيقاف (إغلاق العملية) لا يوجد خيط يكتب لاحقاً
+            self.flush()
+        elif full:
+            self._wake.set()
+        else:
+            self._ensure_thread()
+
+    # ---------- الكتابة ----------
+
+    def flush(self) -> int:
+        """كتابة كل التحديثات المعلقة الآن (يُرجع عدد الصفوف)"""
+        with self._flush_lock:
+            with self._lock:
+                sessions, self._sessions = self._sessions, {}
+                logins, self._logins = self._logins, {}
+            if not sessions and not logins:
+                return 0
+
+            def write(session):
+                if sessions:
+                    session.execute(
+                        update(UserSession.__table__)
+                        .where(UserSession.session_token == bindparam("b_token"))
+                        .values(last_activity=bindparam("b_at")),
+                        [{"b_token": token, "b_at": at} for token, at in sessions.items()],
+                    )
+                if logins:
+                    session.execute(
+                        update(User.__table__)
+                        .where(User.id == bindparam("b_user_id"))
+                        .values(last_login=bindparam("b_at")),
+                        [{"b_user_id": user_id, "b_at": at} for user_id, at in logins.items()],
+                    )
+
+            try:
+                run_in_transaction(write)
+            except Exception as e:
+                # إعادة التحديثات للدفعة التالية (مع الاحتفاظ بالأحدث)
+                with self._lock:
+                    self.failures += 1
+                    for pending, failed in ((self._sessions, sessions), (self._logins, logins)):
+                        for key, at in failed.items():
+                            if pending.get(key) is None or pending[key] < at:
+                                pending[key] = at
+                print(f"⚠️ تعذر كتابة آخر نشاط للجلسات: {e}")
+                return 0
+
+            written = len(sessions) + len(logins)
+            with self._lock:
+                self.rows_written += written
+                self.flushes += 1
+            return written
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="session-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        """إيقاف الخيط وكتابة ما تبقى (يُستدعى عند إغلاق العملية)"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._sessions) + len(self._logins),
+                "events": self.events,
+                "rows_written": self.rows_written,
+                "saved_writes": self.events - self.rows_written - len(self._sessions) - len(self._logins),
+                "flushes": self.flushes,
+                "failures": self.failures,
+            }
+
+
+session_flusher = SessionWriteBehind(Config.SESSION_FLUSH_INTERVAL, Config.SESSION_FLUSH_MAX_PENDING)
+atexit.register(session_flusher.stop)
+
 
 class AuthManager:
     """مدير المصادقة"""
@@ -49,8 +293,8 @@ class AuthManager:
                 
                 session.add(user_session)
                 
-                # تحديث آخر دخول
-                user.last_login = datetime.now()
+                # تحديث آخر دخول (كتابة مؤجلة)
+                session_flusher.record_login(user.id)
                 
                 # إرجاع البيانات
                 return {
@@ -74,6 +318,7 @@ class AuthManager:
     
     def logout(self, session_token: str):
         """تسجيل خروج المستخدم"""
+        session_cache.revoke(session_token)
         with session_scope() as session:
             try:
                 user_session = session.query(UserSession).filter(
@@ -100,40 +345,53 @@ class AuthManager:
                 }
     
     def validate_session(self, session_token: str):
-        """التحقق من صحة الجلسة"""
-        with session_scope() as session:
-            try:
-                user_session = session.query(UserSession).filter(
+        """التحقق من صحة الجلسة (من الذاكرة إن أمكن)"""
+        if not session_token:
+            return None
+        
+        user_data = session_cache.get(session_token)
+        if user_data is None:
+            user_data = self._load_session(session_token)
+            if user_data is None:
+                session_cache.revoke(session_token)
+                return None
+        
+        # تحديث وقت آخر نشاط (مرة واحدة كل SESSION_ACTIVITY_INTERVAL، كتابة مؤجلة)
+        if session_cache.claim_activity_write(session_token):
+            session_flusher.touch_session(session_token)
+        
+        return user_data
+    
+    def _load_session(self, session_token: str):
+        """قراءة الجلسة والمستخدم بجملة واحدة وحفظ النتيجة في الذاكرة"""
+        try:
+            with read_session_scope() as session:
+                row = session.query(
+                    UserSession.expires_at, UserSession.last_activity,
+                    User.id, User.username, User.full_name, User.role,
+                    User.email, User.department
+                ).join(User, User.id == UserSession.user_id).filter(
                     UserSession.session_token == session_token,
                     UserSession.is_active == True,
                     UserSession.expires_at > datetime.now()
                 ).first()
-                
-                if not user_session:
-                    return None
-                
-                # تحديث وقت آخر نشاط
-                user_session.last_activity = datetime.now()
-                
-                # الحصول على بيانات المستخدم
-                user = session.query(User).filter(
-                    User.id == user_session.user_id
-                ).first()
-                
-                if not user:
-                    return None
-                
-                return {
-                    "user_id": user.id,
-                    "username": user.username,
-                    "full_name": user.full_name,
-                    "role": str(user.role),  # تأكد أنه نص
-                    "email": user.email,
-                    "department": user.department
-                }
-            except Exception as e:
-                print(f"❌ خطأ في التحقق من الجلسة: {e}")
-                return None
+        except Exception as e:
+            print(f"❌ خطأ في التحقق من الجلسة: {e}")
+            return None
+        
+        if not row:
+            return None
+        
+        user_data = {
+            "user_id": row.id,
+            "username": row.username,
+            "full_name": row.full_name,
+            "role": str(row.role),  # تأكد أنه نص
+            "email": row.email,
+            "department": row.department
+        }
+        session_cache.put(session_token, user_data, row.expires_at, row.last_activity)
+        return user_data
 
 # إنشاء نسخة عامة
 auth_manager = AuthManager()
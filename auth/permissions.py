@@ -1,5 +1,20 @@
 # auth/permissions.py - النسخة المصححة
-from typing import List, Dict, Any, Set, Tuple
+"""
+الأدوار والصلاحيات
+
+- صلاحيات كل دور تُعرّف ككائنات Permission (المورد، المستوى، النطاق)
+  ثم تُترجم مرة واحدة عند التشغيل إلى جدول أقنعة بتات:
+  الدور -> المورد -> عدد صحيح فيه بت لكل (مستوى، نطاق)
+- المستوى ALL يُوسع إلى كل المستويات، والنطاق الأوسع يشمل الأضيق
+  (all يشمل department و own، و department يشمل own) عند الترجمة،
+  فيصبح كل فحص عملية AND واحدة على عدد صحيح
+- استثناءات لكل مستخدم من Config.USER_PERMISSION_OVERRIDES
+  ("+المستوى:المورد:النطاق" للمنح، "-..." للسحب، و * لأي مستوى أو مورد)
+  تُترجم مرة واحدة لكل مستخدم عبر permission_manager.for_user()
+- للقوائم: database.scoping.scope_clause يحول النطاق (all/department/own)
+  إلى شرط SQL بدلاً من فحص كل سجل عبر check_resource_access
+"""
+from typing import List, Dict, Any, Optional, Set, Tuple
 from enum import Enum
 from config import Config
 
@@ -32,6 +47,87 @@ class Resource(str, Enum):
     BACKUP = "backup"
     LOGS = "logs"
 
+# النطاقات؛ كل نطاق يشمل ما بعده في _SCOPE_IMPLIES
+SCOPES = ("all", "department", "own", "limited")
+_SCOPE_IMPLIES = {
+    "all": ("all", "department", "own", "limited"),
+    "department": ("department", "own"),
+    "own": ("own",),
+    "limited": ("limited",),
+}
+
+# المستويات الفعلية (ALL يُوسع إليها، NONE لا يحتاج صلاحية)
+_LEVELS = tuple(level for level in PermissionLevel
+                if level not in (PermissionLevel.NONE, PermissionLevel.ALL))
+
+
+def _bit(level: PermissionLevel, scope: str) -> int:
+    return 1 << (_LEVELS.index(level) * len(SCOPES) + SCOPES.index(scope))
+
+
+# المستوى -> النطاق -> البتات المطلوبة
+_BITS = {level: {scope: _bit(level, scope) for scope in SCOPES} for level in _LEVELS}
+_BITS[PermissionLevel.ALL] = {
+    scope: sum(_BITS[level][scope] for level in _LEVELS) for scope in SCOPES
+}
+_BITS[PermissionLevel.NONE] = {scope: 0 for scope in SCOPES}
+
+# بتات كل المستويات/النطاقات لمستوى واحد (للسحب بدون نطاق ولـ get_allowed_resources)
+_LEVEL_BITS = {level: sum(bits.values()) for level, bits in _BITS.items()}
+
+# جداول كل مستوى كمتغيرات عامة (الوصول إلى عضو Enum أبطأ من الفحص نفسه)
+_VIEW_BITS = _BITS[PermissionLevel.VIEW]
+_CREATE_BITS = _BITS[PermissionLevel.CREATE]
+_EDIT_BITS = _BITS[PermissionLevel.EDIT]
+_DELETE_BITS = _BITS[PermissionLevel.DELETE]
+_APPROVE_BITS = _BITS[PermissionLevel.APPROVE]
+_EXPORT_BITS = _BITS[PermissionLevel.EXPORT]
+
+# نطاق غير معروف: -1 لا يطابق أي قناع؛ ودور غير معروف: بدون أقنعة
+_UNKNOWN_SCOPE = -1
+_NO_MASKS: Dict = {}
+
+
+def _grant_bits(level: PermissionLevel, scope: str) -> int:
+    """بتات منح صلاحية بعد توسيع ALL والنطاقات المشمولة"""
+    levels = _LEVELS if level == PermissionLevel.ALL else (level,)
+    return sum(_BITS[lvl][implied] for lvl in levels for implied in _SCOPE_IMPLIES[scope])
+
+
+def parse_override(rule: str) -> Tuple[bool, List["Resource"], int]:
+    """"+export:donations:all" أو "-delete:*" -> (منح؟، الموارد، البتات)"""
+    grant = not rule.startswith("-")
+    parts = rule.lstrip("+-").split(":")
+    if len(parts) < 2 or len(parts) > 3:
+        raise ValueError(f"قاعدة صلاحية غير صالحة: {rule}")
+
+    level_str, resource_str = parts[0], parts[1]
+    scope = parts[2] if len(parts) == 3 else ("all" if grant else "*")
+
+    level = PermissionLevel.ALL if level_str == "*" else PermissionLevel(level_str)
+    resources = list(Resource) if resource_str == "*" else [Resource(resource_str)]
+
+    if grant:
+        bits = _grant_bits(level, scope)
+    elif scope == "*":
+        bits = _LEVEL_BITS[level]
+    else:
+        bits = _BITS[level][scope]
+    return grant, resources, bits
+
+
+def compile_permissions(permissions, overrides=()) -> Dict["Resource", int]:
+    """ترجمة مجموعة Permission (واستثناءات نصية) إلى أقنعة بتات لكل مورد"""
+    masks = {resource: 0 for resource in Resource}
+    for permission in permissions:
+        masks[permission.resource] |= _grant_bits(permission.level, permission.scope)
+    for rule in overrides:
+        grant, resources, bits = parse_override(rule)
+        for resource in resources:
+            masks[resource] = masks[resource] | bits if grant else masks[resource] & ~bits
+    return masks
+
+
 class Permission:
     """كائن يمثل صلاحية"""
     
@@ -67,35 +163,61 @@ class Permission:
         return cls(Resource(tuple_data[0]), PermissionLevel(tuple_data[1]), tuple_data[2])
     
     def check(self, user_role: str, user_id: int = None, resource_owner_id: int = None) -> bool:
-        """التحقق من الصلاحية"""
-        if user_role == "admin":
-            return True
-        
-        role_permissions = Config.ROLE_PERMISSIONS.get(user_role, [])
-        
-        if "*" in role_permissions:
-            return True
-        
-        permission_str = f"{self.level.value}:{self.resource.value}"
-        
-        for perm in role_permissions:
-            if permission_str == perm:
-                return True
-            if perm.endswith(":*") and permission_str.startswith(perm[:-2]):
-                return True
-        
-        if resource_owner_id is not None and user_id is not None:
-            if self.scope == "own" and resource_owner_id == user_id:
-                return True
-        
-        return False
+        """التحقق من الصلاحية (سجل لمستخدم آخر يحتاج نطاق all)"""
+        scope = self.scope
+        if scope == "own" and resource_owner_id is not None and resource_owner_id != user_id:
+            scope = "all"
+        return permission_manager.allows(user_role, self.resource, self.level, scope)
+
+
+class UserPermissions:
+    """صلاحيات مترجمة لمستخدم واحد (دوره + استثناءاته)"""
+    
+    __slots__ = ("user_id", "role", "masks")
+    
+    def __init__(self, user_id: Optional[int], role: str, masks: Dict[Resource, int]):
+        self.user_id = user_id
+        self.role = role
+        self.masks = masks
+    
+    def allows(self, resource: Resource, level: PermissionLevel, scope: str = "all") -> bool:
+        bits = _BITS[level].get(scope, _UNKNOWN_SCOPE)
+        return self.masks.get(resource, 0) & bits == bits
+    
+    # كل دالة فحص AND واحد بدون استدعاءات إضافية
+    def can_view(self, resource: Resource, scope: str = "all") -> bool:
+        bits = _VIEW_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self.masks.get(resource, 0) & bits == bits
+    
+    def can_create(self, resource: Resource, scope: str = "all") -> bool:
+        bits = _CREATE_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self.masks.get(resource, 0) & bits == bits
+    
+    def can_edit(self, resource: Resource, scope: str = "all") -> bool:
+        bits = _EDIT_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self.masks.get(resource, 0) & bits == bits
+    
+    def can_delete(self, resource: Resource, scope: str = "all") -> bool:
+        bits = _DELETE_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self.masks.get(resource, 0) & bits == bits
+    
+    def can_approve(self, resource: Resource, scope: str = "all") -> bool:
+        bits = _APPROVE_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self.masks.get(resource, 0) & bits == bits
+    
+    def can_export(self, resource: Resource, scope: str = "all") -> bool:
+        bits = _EXPORT_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self.masks.get(resource, 0) & bits == bits
 
 class PermissionManager:
     """مدير الصلاحيات"""
     
     def __init__(self):
         self._permissions_cache = {}
+        self._role_masks: Dict[str, Dict[Resource, int]] = {}
+        self._user_cache: Dict[tuple, UserPermissions] = {}
         self._initialize_permissions()
+        self._compile()
     
     def _initialize_permissions(self):
         """تهيئة الصلاحيات المحددة مسبقاً"""
@@ -144,58 +266,100 @@ class PermissionManager:
         
         self._permissions_cache["viewer"] = viewer_perms
     
+    def _compile(self):
+        """ترجمة صلاحيات كل الأدوار إلى أقنعة بتات (مرة واحدة عند التشغيل)"""
+        self._role_masks = {
+            role: compile_permissions(permissions)
+            for role, permissions in self._permissions_cache.items()
+        }
+        self._user_cache.clear()
+    
+    def allows(self, role: str, resource: Resource, level: PermissionLevel, scope: str = "all") -> bool:
+        """الفحص الأساسي: AND واحد على قناع المورد"""
+        bits = _BITS[level].get(scope, _UNKNOWN_SCOPE)
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0) & bits == bits
+    
+    def role_mask(self, role: str, resource: Resource) -> int:
+        """قناع بتات الدور على المورد (0 للدور غير المعروف)"""
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0)
+    
+    def for_user(self, user_data: Optional[dict]) -> UserPermissions:
+        """صلاحيات المستخدم مع استثناءاته (تُترجم مرة واحدة لكل مستخدم ودور)"""
+        user_data = user_data or {}
+        role = user_data.get("role")
+        username = user_data.get("username")
+        key = (username, role)
+        permissions = self._user_cache.get(key)
+        if permissions is None:
+            overrides = Config.USER_PERMISSION_OVERRIDES.get(username, ()) if username else ()
+            if overrides:
+                masks = compile_permissions(self._permissions_cache.get(role, ()), overrides)
+            else:
+                masks = self._role_masks.get(role, {})
+            permissions = self._user_cache[key] = UserPermissions(user_data.get("user_id"), role, masks)
+        return permissions
+    
+    def invalidate_user(self, username: str = None):
+        """إعادة ترجمة صلاحيات مستخدم (أو الجميع) بعد تغيير الاستثناءات"""
+        if username is None:
+            self._user_cache.clear()
+            return
+        for key in [key for key in self._user_cache if key[0] == username]:
+            del self._user_cache[key]
+    
     def get_permissions(self, role: str) -> Set[Permission]:
         """الحصول على صلاحيات دور معين"""
         return self._permissions_cache.get(role, set())
     
     def has_permission(self, role: str, permission: Permission) -> bool:
-        """التحقق من وجود صلاحية معينة"""
+        """التحقق من وجود صلاحية معينة
+
+        واجهة توافقية بنفس نتائجها السابقة: المدير يملك أي صلاحية (حتى بنطاق
+        غير معروف)، والمستوى none ليس صلاحية تُمنح لغيره.
+        """
         if role == "admin":
             return True
-        
-        permissions = self.get_permissions(role)
-        return permission in permissions
+        if permission.level == PermissionLevel.NONE:
+            return False
+        return self.allows(role, permission.resource, permission.level, permission.scope)
     
     def can_view(self, role: str, resource: Resource, scope: str = "all") -> bool:
         """التحقق من صلاحية المشاهدة"""
-        permission = Permission(resource, PermissionLevel.VIEW, scope)
-        return self.has_permission(role, permission)
+        bits = _VIEW_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0) & bits == bits
     
     def can_create(self, role: str, resource: Resource, scope: str = "all") -> bool:
         """التحقق من صلاحية الإنشاء"""
-        permission = Permission(resource, PermissionLevel.CREATE, scope)
-        return self.has_permission(role, permission)
+        bits = _CREATE_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0) & bits == bits
     
     def can_edit(self, role: str, resource: Resource, scope: str = "all") -> bool:
         """التحقق من صلاحية التعديل"""
-        permission = Permission(resource, PermissionLevel.EDIT, scope)
-        return self.has_permission(role, permission)
+        bits = _EDIT_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0) & bits == bits
     
     def can_delete(self, role: str, resource: Resource, scope: str = "all") -> bool:
         """التحقق من صلاحية الحذف"""
-        permission = Permission(resource, PermissionLevel.DELETE, scope)
-        return self.has_permission(role, permission)
+        bits = _DELETE_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0) & bits == bits
     
     def can_approve(self, role: str, resource: Resource, scope: str = "all") -> bool:
         """التحقق من صلاحية الاعتماد"""
-        permission = Permission(resource, PermissionLevel.APPROVE, scope)
-        return self.has_permission(role, permission)
+        bits = _APPROVE_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0) & bits == bits
     
     def can_export(self, role: str, resource: Resource, scope: str = "all") -> bool:
         """التحقق من صلاحية التصدير"""
-        permission = Permission(resource, PermissionLevel.EXPORT, scope)
-        return self.has_permission(role, permission)
+        bits = _EXPORT_BITS.get(scope, _UNKNOWN_SCOPE)
+        return self._role_masks.get(role, _NO_MASKS).get(resource, 0) & bits == bits
     
     def get_allowed_resources(self, role: str, level: PermissionLevel) -> List[Resource]:
-        """الحصول على الموارد المسموح بها"""
-        permissions = self.get_permissions(role)
-        resources = []
-        
-        for perm in permissions:
-            if perm.level == level or perm.level == PermissionLevel.ALL:
-                resources.append(perm.resource)
-        
-        return list(set(resources))  # إزالة التكرارات
+        """الحصول على الموارد المسموح بها (بأي نطاق)"""
+        bits = _LEVEL_BITS[level]
+        return [
+            resource for resource, mask in self._role_masks.get(role, {}).items()
+            if mask & bits
+        ]
     
     def check_resource_access(self, role: str, resource: Resource, 
                             action: str, user_id: int = None, 
@@ -224,8 +388,7 @@ class PermissionManager:
                 if resource_data["department"] == resource_data["user_department"]:
                     scope = "department"
         
-        permission = Permission(resource, level, scope)
-        return self.has_permission(role, permission)
+        return self.allows(role, resource, level, scope)
     
     def get_role_summary(self, role: str) -> Dict[str, Any]:
         """الحصول على ملخص صلاحيات الدور"""
@@ -233,7 +396,7 @@ class PermissionManager:
         
         summary = {
             "role": role,
-            "role_name": Config.get_role_name(role),
+            "role_name": Config.ROLES.get(role, role),
             "total_permissions": len(permissions),
             "resources": {},
             "allowed_actions": {}
@@ -261,28 +424,44 @@ class PermissionManager:
 permission_manager = PermissionManager()
 
 # دوال مختصرة للاستخدام
-def check_permission(role: str, permission_str: str) -> bool:
-    """التحقق من صلاحية (واجهة توافقية مع Config)"""
+# نص الصلاحية -> (المورد، البتات) أو False إذا كان غير صالح
+_PERMISSION_STRINGS: Dict[str, Any] = {}
+_PERMISSION_STRINGS_MAX = 1024
+
+def _compile_permission_string(permission_str: str):
+    """"edit:donations:own" -> (المورد، بتات المستوى والنطاق)؛ False إذا كانت غير صالحة"""
     try:
         parts = permission_str.split(":", 2)
-        
         if len(parts) < 2:
             return False
-        
-        level_str, resource_str = parts[0], parts[1]
-        scope = parts[2] if len(parts) > 2 else "all"
-        
-        try:
-            level = PermissionLevel(level_str)
-            resource = Resource(resource_str)
-        except ValueError:
-            return False
-        
-        permission = Permission(resource, level, scope)
-        return permission_manager.has_permission(role, permission)
-        
-    except Exception:
+        level = PermissionLevel(parts[0])
+        resource = Resource(parts[1])
+    except (AttributeError, ValueError):
+        return False
+    scope = parts[2] if len(parts) > 2 else "all"
+    if level == PermissionLevel.NONE:
+        # "none:..." ليست صلاحية تُمنح (بتاتها صفر فكانت ستنجح لأي دور)
+        return resource, _UNKNOWN_SCOPE
+    return resource, _BITS[level].get(scope, _UNKNOWN_SCOPE)
+
+def check_permission(role: str, permission_str: str) -> bool:
+    """التحقق من صلاحية (واجهة توافقية مع Config)
+
+    النتائج كما في الواجهة القديمة: النص غير الصالح False، والمدير True لأي
+    نص صالح (حتى none أو نطاق غير معروف)، وغير المدير False لـ none أو لنطاق
+    غير معروف.
+    """
+    compiled = _PERMISSION_STRINGS.get(permission_str)
+    if compiled is None:
+        compiled = _compile_permission_string(permission_str)
+        if len(_PERMISSION_STRINGS) < _PERMISSION_STRINGS_MAX:
+            _PERMISSION_STRINGS[permission_str] = compiled
+    if compiled is False:
         return False
+    if role == "admin":
+        return True
+    resource, bits = compiled
+    return permission_manager.role_mask(role, resource) & bits == bits
 
 def has_role_permission(role: str, resource: str, action: str, 
                        user_id: int = None, resource_data: Dict = None) -> bool:
@@ -0,0 +1,351 @@
+# benchmarks/page_benchmark.py
+"""
+قياس زمن عرض الصفحات بدون متصفح (streamlit.testing.v1.AppTest)
+
+الاستخدام:
+    python benchmarks/page_benchmark.py                          # الأحجام tiny,small وكل الصفحات
+    python benchmarks/page_benchmark.py --sizes small,medium --pages dashboard,donations
+    python benchmarks/page_benchmark.py --roles employee            # مسارات القوائم المحصورة في النطاق
+    python benchmarks/page_benchmark.py --compare base.json new.json   # مقارنة نتيجتين
+
+- كل حجم له قاعدة بيانات مولدة بـ generate_test_data.py (بذرة وتاريخ ثابتين)
+  تُحفظ في benchmarks/data وتُعاد استخدامها
+- كل صفحة تُقاس في عملية مستقلة (DATABASE_PATH مختلف لكل حجم، وذروة الذاكرة
+  لكل صفحة وحدها): تشغيل أول بارد ثم --repeats إعادات تشغيل
+- كل صفحة تُقاس لكل دور في --roles (الافتراضي admin,employee): المدير بمستخدم قياس خاص،
+  والموظف بالموظف المولد صاحب أكثر الأنشطة، فتُقاس استعلامات النطاق (database.scoping)
+- المقاييس لكل تشغيل: الزمن الكلي، عدد جمل SQL وزمنها، الصفوف المقروءة
+  (QUERY_COUNT_ROWS)، وذروة الذاكرة (RSS) للعملية
+- النتيجة JSON في benchmarks/results/<التاريخ>-<commit>.json للمقارنة بين commits؛
+  --compare يعرض الفروق ويرجع رمز خروج 1 عند تراجع أكبر من --threshold
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.absolute()
+BENCH_DIR = ROOT / "benchmarks"
+DATA_DIR = BENCH_DIR / "data"
+RESULTS_DIR = BENCH_DIR / "results"
+
+# الصفحات: الاسم -> (الوحدة، الدالة)؛ app = التطبيق كاملاً (القائمة + لوحة التحكم)
+PAGES = {
+    "app": (None, None),
+    "dashboard": ("modules.dashboard", "show_dashboard"),
+    "beneficiaries": ("modules.beneficiaries", "show_beneficiaries"),
+    "activities": ("modules.activities", "show_activities_main"),
+    "donations": ("modules.donations", "show_donations_main"),
+}
+
+DEFAULT_SIZES = "tiny,small"
+DEFAULT_ROLES = "admin,employee"
+DEFAULT_SEED = 42
+# تاريخ نهاية ثابت حتى تكون القواعد المولدة متطابقة بين الأجهزة
+DATA_END_DATE = "2025-12-31"
+
+BENCH_USER = "bench_admin"
+BENCH_PASSWORD = "bench123"
+# كلمة مرور المستخدمين الذين ينشئهم generate_test_data.py
+GENERATED_PASSWORD = "test123"
+
+RESULT_MARKER = "BENCH_RESULT "
+
+# المقاييس التي تُقارن (الأعلى أسوأ)
+COMPARED_METRICS = ("wall_ms", "cold_ms", "queries", "rows_fetched", "peak_rss_mb")
+
+
+# ============== العامل (عملية لكل صفحة) ==============
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # لينكس بالكيلوبايت، macOS بالبايت
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _ensure_bench_admin():
+    """مستخدم مدير خاص بالقياس (يُنشأ مرة واحدة في كل قاعدة)"""
+    from database.models import User
+    from database.session import session_scope
+
+    with session_scope() as session:
+        if not session.query(User.id).filter(User.username == BENCH_USER).first():
+            session.add(User(
+                username=BENCH_USER,
+                email=f"{BENCH_USER}@charity.org",
+                password_hash=BENCH_PASSWORD,
+                full_name="مستخدم القياس",
+                role="admin",
+                status="active",
+            ))
+    return BENCH_USER, BENCH_PASSWORD
+
+
+def _busiest_generated_user(role: str):
+    """المستخدم المولد بهذا الدور صاحب أكثر الأنشطة (حتى لا تكون قوائمه المحصورة فارغة)"""
+    from sqlalchemy import func, select
+    from database.models import Activity, User
+    from database.session import read_session_scope
+
+    with read_session_scope() as session:
+        username = session.execute(
+            select(User.username)
+            .outerjoin(Activity, Activity.created_by == User.id)
+            .where(User.role == role, User.status == "active", User.username != BENCH_USER)
+            .group_by(User.id)
+            .order_by(func.count(Activity.id).desc(), User.id)
+            .limit(1)
+        ).scalar()
+    if username is None:
+        raise RuntimeError(f"لا يوجد مستخدم مولد بالدور {role}")
+    return username, GENERATED_PASSWORD
+
+
+def _login_bench_user(role: str):
+    """تسجيل دخول مستخدم القياس وإرجاع (الرمز، user_data كما تستقبله الصفحات)"""
+    from auth.authentication import get_current_user, login
+
+    username, password = _ensure_bench_admin() if role == "admin" else _busiest_generated_user(role)
+    result = login(username, password)
+    if not result["success"]:
+        raise RuntimeError(f"تعذر تسجيل دخول مستخدم القياس {username}: {result['message']}")
+    # نفس شكل user_data في app.py (validate_session: user_id، department ...)
+    user_data = get_current_user(result["session_token"])
+    if user_data is None:
+        raise RuntimeError(f"تعذر التحقق من جلسة مستخدم القياس {username}")
+    return result["session_token"], user_data
+
+
+def _page_script(page: str) -> str:
+    module, function = PAGES[page]
+    return (
+        "import streamlit as st\n"
+        f"from {module} import {function}\n"
+        f"{function}(st.session_state['user_data'])\n"
+    )
+
+
+def run_worker(page: str, role: str, repeats: int, timeout: float) -> dict:
+    """قياس صفحة واحدة بدور واحد في هذه العملية (تشغيل بارد ثم repeats تشغيلات)"""
+    sys.path.insert(0, str(ROOT))
+    from streamlit.testing.v1 import AppTest
+    from database.instrumentation import query_recorder
+    from database.session import db_manager
+
+    db_manager.initialize()
+    token, user = _login_bench_user(role)
+    baseline_rss = _peak_rss_mb()
+
+    if PAGES[page][0] is None:
+        app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=timeout)
+    else:
+        app = AppTest.from_string(_page_script(page), default_timeout=timeout)
+    app.session_state["session_token"] = token
+    app.session_state["user_data"] = user
+
+    runs, errors = [], []
+    for _ in range(repeats + 1):
+        query_recorder.reset()
+        started = time.perf_counter()
+        app.run()
+        wall = time.perf_counter() - started
+        summary = query_recorder.summary()
+        runs.append({
+            "wall_ms": wall * 1000,
+            "queries": summary["queries"],
+            "sql_ms": summary["total_time"] * 1000,
+            "rows_fetched": summary["rows_fetched"],
+        })
+        errors.extend(str(exception.value) for exception in app.exception)
+
+    cold, warm = runs[0], runs[1:] or runs[:1]
+    return {
+        "page": page,
+        "role": role,
+        "user": user["username"],
+        "cold_ms": round(cold["wall_ms"], 1),
+        "wall_ms": round(statistics.median(run["wall_ms"] for run in warm), 1),
+        "wall_min_ms": round(min(run["wall_ms"] for run in warm), 1),
+        "wall_max_ms": round(max(run["wall_ms"] for run in warm), 1),
+        "queries": max(run["queries"] for run in warm),
+        "cold_queries": cold["queries"],
+        "sql_ms": round(statistics.median(run["sql_ms"] for run in warm), 1),
+        "rows_fetched": max(run["rows_fetched"] for run in warm),
+        "cold_rows_fetched": cold["rows_fetched"],
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "repeats": repeats,
+        "errors": sorted(set(errors)),
+    }
+
+
+# ============== المنسق ==============
+
+def ensure_database(size: str, seed: int) -> Path:
+    """قاعدة البيانات المولدة لهذا الحجم (تُولد أول مرة فقط)"""
+    path = DATA_DIR / f"{size}-{seed}.db"
+    if path.exists():
+        return path
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"🔧 توليد قاعدة البيانات {path.name} (مرة واحدة)...")
+    subprocess.run(
+        [sys.executable, str(ROOT / "generate_test_data.py"),
+         "--scale", size, "--seed", str(seed), "--end", DATA_END_DATE],
+        env={**os.environ, "DATABASE_PATH": str(path), "QUERY_STATS": "0"},
+        cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+    )
+    return path
+
+
+def measure_page(database: Path, page: str, role: str, repeats: int, timeout: float) -> dict:
+    """تشغيل العامل لصفحة واحدة في عملية مستقلة وقراءة نتيجته"""
+    completed = subprocess.run(
+        [sys.executable, __file__, "--worker", page, "--roles", role,
+         "--repeats", str(repeats), "--timeout", str(timeout)],
+        env={**os.environ, "DATABASE_PATH": str(database),
+             "QUERY_STATS": "1", "QUERY_COUNT_ROWS": "1"},
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    return {"page": page, "role": role, "errors": [completed.stderr.strip()[-2000:] or "لا توجد نتيجة"]}
+
+
+def _git_commit() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown",
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run_suite(sizes, roles, pages, repeats: int, seed: int, timeout: float) -> dict:
+    results = []
+    for size in sizes:
+        database = ensure_database(size, seed)
+        for role in roles:
+            for page in pages:
+                result = measure_page(database, page, role, repeats, timeout)
+                result["size"] = size
+                results.append(result)
+                label = f"{size}/{role}/{page}"
+                if "wall_ms" in result:
+                    print(
+                        f"✅ {label}: {result['wall_ms']:.0f} م.ث (بارد {result['cold_ms']:.0f})، "
+                        f"{result['queries']} جملة، {result['rows_fetched']:,} صف، "
+                        f"ذروة {result['peak_rss_mb']:.0f} MB"
+                    )
+                for error in result["errors"]:
+                    print(f"❌ {label}: {error}")
+
+    return {
+        **_git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+# ============== المقارنة ==============
+
+def compare(base: dict, head: dict, threshold: float) -> list:
+    """الفروق لكل (حجم، دور، صفحة، مقياس)؛ تراجع = زيادة نسبتها أكبر من threshold"""
+    # النتائج الأقدم من --roles كانت للمدير فقط
+    def key(result):
+        return result["size"], result.get("role", "admin"), result["page"]
+
+    base_results = {key(r): r for r in base["results"]}
+    rows = []
+    for result in head["results"]:
+        previous = base_results.get(key(result))
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (1.0 if new else 0.0)
+            rows.append({
+                "size": result["size"], "role": result.get("role", "admin"),
+                "page": result["page"], "metric": metric,
+                "base": old, "head": new, "change": change,
+                "regression": change > threshold,
+            })
+    return rows
+
+
+def show_comparison(base_path: Path, head_path: Path, threshold: float) -> int:
+    base = json.loads(base_path.read_text(encoding="utf-8"))
+    head = json.loads(head_path.read_text(encoding="utf-8"))
+    print(f"📊 {base.get('commit')} ← {head.get('commit')} (حد التراجع {threshold:.0%})")
+
+    rows = compare(base, head, threshold)
+    for row in rows:
+        mark = "🔴" if row["regression"] else ("🟢" if row["change"] < -threshold else "  ")
+        print(f"{mark} {row['size']}/{row['role']}/{row['page']} {row['metric']}: "
+              f"{row['base']:,} ← {row['head']:,} ({row['change']:+.0%})")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"⚠️  {len(regressions)} تراجع")
+        return 1
+    print("✅ لا يوجد تراجع")
+    return 0
+
+
+# ============== التشغيل ==============
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="قياس زمن عرض الصفحات")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="أحجام generate_test_data مفصولة بفواصل")
+    parser.add_argument("--pages", default=",".join(PAGES), help="الصفحات مفصولة بفواصل")
+    parser.add_argument("--roles", default=DEFAULT_ROLES, help="الأدوار مفصولة بفواصل (admin, employee, ...)")
+    parser.add_argument("--repeats", type=int, default=3, help="عدد التشغيلات بعد التشغيل البارد")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--timeout", type=float, default=300, help="مهلة كل تشغيل بالثواني")
+    parser.add_argument("--output", type=Path, help="ملف النتيجة (الافتراضي benchmarks/results)")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASE", "HEAD"))
+    parser.add_argument("--threshold", type=float, default=0.2, help="نسبة الزيادة التي تُعد تراجعاً")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.worker:
+        print(RESULT_MARKER + json.dumps(run_worker(args.worker, args.roles, args.repeats, args.timeout)))
+        return 0
+
+    if args.compare:
+        return show_comparison(*args.compare, args.threshold)
+
+    pages = [page.strip() for page in args.pages.split(",") if page.strip()]
+    unknown = [page for page in pages if page not in PAGES]
+    if unknown:
+        print(f"❌ صفحات غير معروفة: {', '.join(unknown)} (المتاح: {', '.join(PAGES)})")
+        return 2
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    roles = [role.strip() for role in args.roles.split(",") if role.strip()]
+    report = run_suite(sizes, roles, pages, args.repeats, args.seed, args.timeout)
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"💾 النتيجة: {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
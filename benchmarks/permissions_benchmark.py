@@ -0,0 +1,93 @@
+# benchmarks/permissions_benchmark.py
+"""
+قياس تكلفة فحص الصلاحيات (بالنانو ثانية لكل فحص)
+
+الاستخدام:
+    python benchmarks/permissions_benchmark.py
+    python benchmarks/permissions_benchmark.py --budget-ns 500 --json
+
+- يقيس الفحوص المترجمة (أقنعة البتات) والطريقة القديمة للمقارنة
+  (إنشاء Permission والبحث عنه في مجموعة)
+- يرجع رمز خروج 1 إذا تجاوز أي فحص مترجم الحد (--budget-ns، الافتراضي 1000)
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from auth.permissions import (
+    Permission, PermissionLevel, Resource, check_permission, permission_manager
+)
+
+DEFAULT_BUDGET_NS = 1000
+
+
+def _legacy_check(role, resource, level, scope):
+    """الطريقة السابقة: كائن جديد + hash + بحث في مجموعة"""
+    return Permission(resource, level, scope) in permission_manager.get_permissions(role)
+
+
+def cases():
+    """(الاسم، الدالة، مترجم؟)"""
+    user = permission_manager.for_user({"username": "bench", "role": "employee", "user_id": 1})
+    manager = permission_manager
+    # أعضاء Enum تُقرأ مرة واحدة هنا: الوصول إليها داخل الحلقة أبطأ من الفحص نفسه
+    donations, users, activities = Resource.DONATIONS, Resource.USERS, Resource.ACTIVITIES
+    edit, approve = PermissionLevel.EDIT, PermissionLevel.APPROVE
+    return [
+        ("manager.can_edit (مسموح)",
+         lambda: manager.can_edit("employee", donations, "own"), True),
+        ("manager.can_delete (مرفوض)",
+         lambda: manager.can_delete("viewer", users), True),
+        ("manager.allows",
+         lambda: manager.allows("supervisor", activities, approve, "limited"), True),
+        ("for_user().can_export",
+         lambda: user.can_export(donations, "own"), True),
+        ("check_permission (نص)",
+         lambda: check_permission("employee", "edit:donations:own"), True),
+        ("الطريقة القديمة (مجموعة Permission)",
+         lambda: _legacy_check("employee", donations, edit, "own"), False),
+    ]
+
+
+def measure(func, number: int, repeat: int) -> float:
+    """أفضل زمن (نانو ثانية) لفحص واحد بعد طرح تكلفة استدعاء lambda فارغة"""
+    empty = min(timeit.repeat(lambda: None, number=number, repeat=repeat))
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return max(best - empty, 0) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس تكلفة فحص الصلاحيات")
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ns", type=float, default=DEFAULT_BUDGET_NS)
+    parser.add_argument("--json", action="store_true", help="طباعة النتيجة JSON")
+    args = parser.parse_args()
+
+    results = []
+    for name, func, compiled in cases():
+        results.append({
+            "check": name,
+            "ns": round(measure(func, args.number, args.repeat), 1),
+            "compiled": compiled,
+        })
+
+    over_budget = [r for r in results if r["compiled"] and r["ns"] > args.budget_ns]
+
+    if args.json:
+        print(json.dumps({"budget_ns": args.budget_ns, "results": results}, ensure_ascii=False, indent=2))
+    else:
+        for result in results:
+            mark = "🔴" if result in over_budget else ("✅" if result["compiled"] else "  ")
+            print(f"{mark} {result['check']}: {result['ns']:.0f} ns")
+        print(f"الحد: {args.budget_ns:.0f} ns لكل فحص مترجم")
+
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,12 +32,85 @@ class Config:
         BACKUP_DIR = DATA_DIR / "backups"
         print("💻 تشغيل محلي")
     
+    # مسار بديل لقاعدة البيانات (قواعد القياس والبيانات المولدة)
+    if os.environ.get("DATABASE_PATH"):
+        DATABASE_PATH = Path(os.environ["DATABASE_PATH"]).absolute()
+    
     STATIC_DIR = BASE_DIR / "static"
     
     # ============== قاعدة البيانات ==============
     DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
     DATABASE_ECHO = False
     
+    # ملف إعدادات اتصال SQLite (يُطبق كـ PRAGMA على كل اتصال جديد)
+    # dev: للتطوير، production: عدة مستخدمين متزامنين، bulk_load: الاستيراد الكبير فقط
+    # foreign_keys معطل في كل الملفات كما كان سلوك SQLite الافتراضي: الحذف في
+    # الصفحات (النشاط مع مرفقاته أو مشاركيه، المتبرع مع تبرعاته ...) لا يمر
+    # بسلسلة حذف كاملة بعد، وتفعيله يجعل هذا الحذف يفشل بـ IntegrityError
+    DB_PROFILE = os.environ.get("DB_PROFILE", "production")
+    DB_PROFILES = {
+        "dev": {
+            "busy_timeout": 5000,          # ملي ثانية انتظار عند قفل قاعدة البيانات
+            "journal_mode": "WAL",         # القراء لا ينتظرون الكاتب
+            "synchronous": "NORMAL",
+            "cache_size": -16000,          # بالكيلوبايت عند القيمة السالبة (16MB)
+            "mmap_size": 0,
+            "temp_store": "DEFAULT",
+            "foreign_keys": "OFF",
+        },
+        "production": {
+            "busy_timeout": 15000,
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",       # آمن مع WAL (قد يضيع آخر commit فقط عند انقطاع الكهرباء)
+            "cache_size": -64000,          # 64MB لكل اتصال
+            "mmap_size": 268435456,        # 256MB قراءة عبر الذاكرة
+            "temp_store": "MEMORY",
+            "foreign_keys": "OFF",
+        },
+        "bulk_load": {
+            "busy_timeout": 60000,
+            "journal_mode": "WAL",
+            "synchronous": "OFF",          # أسرع كتابة؛ لا يُستخدم أثناء عمل الموظفين
+            "cache_size": -256000,
+            "mmap_size": 1073741824,
+            "temp_store": "MEMORY",
+            "foreign_keys": "OFF",         # المستورد يتحقق من المراجع بنفسه
+        },
+    }
+    
+    # منسق الكتابة: كاتب واحد في كل مرة داخل العملية
+    WRITE_LOCK_TIMEOUT = float(os.environ.get("WRITE_LOCK_TIMEOUT", 30))     # ثوانٍ انتظار قبل الاعتذار
+    WRITE_MAX_RETRIES = int(os.environ.get("WRITE_MAX_RETRIES", 5))          # إعادة المحاولة عند SQLITE_BUSY
+    WRITE_RETRY_DELAY = float(os.environ.get("WRITE_RETRY_DELAY", 0.05))     # التأخير الأول (يتضاعف)
+    WRITE_RETRY_MAX_DELAY = float(os.environ.get("WRITE_RETRY_MAX_DELAY", 2))
+    
+    # ============== الأداء والتخزين المؤقت ==============
+    # مدة صلاحية لقطات الإحصائيات بالثواني (لوحة التحكم، إحصائيات الأنشطة والتبرعات)
+    STATS_CACHE_TTL = int(os.environ.get("STATS_CACHE_TTL", 60))
+    
+    # عدد الصفوف في كل دفعة عند الاستيراد الجماعي من Excel/CSV
+    IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 2000))
+    
+    # ذاكرة التحقق من الجلسات: مدة صلاحية نتيجة التحقق (ثوانٍ) قبل إعادة قراءتها
+    SESSION_CACHE_TTL = float(os.environ.get("SESSION_CACHE_TTL", 30))
+    # تحديث last_activity مرة واحدة على الأكثر لكل جلسة خلال هذه المدة (ثوانٍ)
+    SESSION_ACTIVITY_INTERVAL = float(os.environ.get("SESSION_ACTIVITY_INTERVAL", 300))
+    # الكتابة المؤجلة لآخر نشاط وآخر دخول: دفعة واحدة كل هذه المدة (ثوانٍ)
+    SESSION_FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", 5))
+    # أقصى عدد تحديثات معلقة في الذاكرة (عند بلوغه تُكتب فوراً)
+    SESSION_FLUSH_MAX_PENDING = int(os.environ.get("SESSION_FLUSH_MAX_PENDING", 10000))
+    
+    # الحد الأقصى لعدد الصفوف في التصدير لأصحاب صلاحية التصدير المحدودة (limited)
+    EXPORT_LIMITED_ROWS = int(os.environ.get("EXPORT_LIMITED_ROWS", 1000))
+    
+    # قياس الاستعلامات: الجمل الأبطأ من هذا الحد (ملي ثانية) تُكتب في logs/slow_queries.log
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
+    QUERY_STATS_ENABLED = os.environ.get("QUERY_STATS", "1") != "0"
+    # عد الصفوف المقروءة من SELECT (مؤشر sqlite3 مخصص؛ للقياس فقط لأن له تكلفة صغيرة)
+    QUERY_COUNT_ROWS = os.environ.get("QUERY_COUNT_ROWS", "0") == "1"
+    # كشف N+1: نفس شكل الجملة أكثر من هذا العدد في عرض صفحة واحد (تحذير في وضع DEBUG)
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 10))
+    
     # ============== إعدادات التطبيق ==============
     APP_NAME = "نظام إدارة الجمعية الخيرية"
     APP_VERSION = "1.0.0"
@@ -54,6 +127,10 @@ class Config:
         "viewer": "مراجع"
     }
     
+    # استثناءات الصلاحيات لمستخدمين محددين (تُضاف إلى صلاحيات الدور أو تُسحب منها)
+    # مثال: {"employee1": ["+export:donations:all", "-delete:*"]}
+    USER_PERMISSION_OVERRIDES = {}
+    
     # ============== دوال المساعدة ==============
     @classmethod
     def setup_directories(cls):
@@ -92,6 +169,16 @@ class Config:
                     return False
             return False
     
+    @classmethod
+    def get_db_profile(cls, name: str = None) -> dict:
+        """إعدادات ملف الاتصال (الافتراضي DB_PROFILE)"""
+        name = name or cls.DB_PROFILE
+        if name not in cls.DB_PROFILES:
+            raise ValueError(
+                f"ملف اتصال غير معروف: {name} (المتاح: {', '.join(cls.DB_PROFILES)})"
+            )
+        return cls.DB_PROFILES[name]
+    
     @classmethod
     def check_permission(cls, role: str, permission: str) -> bool:
         """التحقق من صلاحية دور معين"""
@@ -0,0 +1,150 @@
+# database/cache.py - التخزين المؤقت للإحصائيات
+"""
+ذاكرة مؤقتة مشتركة للقطات الإحصائية (لوحة التحكم، إحصائيات الأنشطة والتبرعات)
+
+- كل عنصر له مدة صلاحية (TTL) قابلة للضبط من Config.STATS_CACHE_TTL
+- كل عنصر يصرّح بالجداول التي يعتمد عليها، ويُحذف تلقائياً عند إضافة
+  أو تعديل أو حذف صفوف في تلك الجداول عبر جلسة ORM (بعد نجاح الـ commit)
+- لكل جدول رقم جيل يزداد مع كل إبطال؛ القيمة المحسوبة لا تُخزن إذا تغير
+  جيل أحد جداولها أثناء الحساب (حتى لا تُحفظ لقطة قديمة بعد الإبطال)
+- عدادات الإصابة/الإخفاق متاحة عبر stats()
+
+ملاحظة: الذاكرة خاصة بالعملية الحالية؛ التغييرات من عمليات أخرى
+(سكربتات خارجية مثلاً) تظهر بعد انتهاء مدة الصلاحية فقط.
+"""
+
+import threading
+import time
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import Config
+
+# مفتاح تخزين الجداول المعدلة داخل session.info
+_CHANGED_TABLES_KEY = "stats_cache_changed_tables"
+
+
+class SnapshotCache:
+    """ذاكرة مؤقتة بمدة صلاحية وإبطال حسب الجداول"""
+
+    def __init__(self, ttl_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[tuple, tuple] = {}  # key -> (expires_at, tables, value)
+        self._generations: Dict[str, int] = {}  # الجدول -> عدد مرات إبطاله
+        self._epoch = 0  # يزداد مع كل مسح كامل
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.discarded = 0
+
+    def get_or_compute(self, name: str, compute: Callable[[], Any],
+                       depends_on: Iterable[str] = (), scope: Any = None,
+                       ttl: Optional[float] = None) -> Any:
+        """إرجاع القيمة المخزنة أو حسابها وتخزينها
+
+        scope: مفتاح إضافي (مثل الدور أو رقم المستخدم) عندما تختلف النتيجة حسبه
+        """
+        key = (name, scope)
+        tables = frozenset(depends_on)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            generations = self._generations_of(tables)
+
+        # الحساب خارج القفل حتى لا تنتظر الصفحات الأخرى
+        value = compute()
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl is None else ttl)
+
+        with self._lock:
+            # إبطال أثناء الحساب: القيمة قد تكون قديمة، تُعاد للمستدعي ولا تُخزن
+            if self._generations_of(tables) == generations:
+                self._entries[key] = (expires_at, tables, value)
+            else:
+                self.discarded += 1
+
+        return value
+
+    def _generations_of(self, tables) -> tuple:
+        """أرقام أجيال الجداول (يُستدعى تحت القفل)"""
+        return self._epoch, {table: self._generations.get(table, 0) for table in tables}
+
+    def invalidate(self, *tables: str) -> int:
+        """حذف العناصر المعتمدة على أي من الجداول المحددة"""
+        if not tables:
+            return 0
+
+        changed = set(tables)
+        with self._lock:
+            for table in changed:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry[1] & changed]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+        return len(stale)
+
+    def clear(self):
+        """مسح الذاكرة بالكامل"""
+        with self._lock:
+            self._entries.clear()
+            # الحسابات الجارية بدأت قبل المسح فلا تُخزن نتائجها
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات الاستخدام"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "discarded": self.discarded,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+# نسخة عامة مشتركة بين جميع الصفحات
+stats_cache = SnapshotCache(Config.STATS_CACHE_TTL)
+
+
+def mark_tables_changed(session: Session, *tables: str):
+    """تسجيل جداول معدلة بعمليات لا تمر عبر وحدة العمل (إدخال جماعي مثلاً)"""
+    session.info.setdefault(_CHANGED_TABLES_KEY, set()).update(tables)
+
+
+# ============== ربط الإبطال بأحداث جلسة ORM ==============
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    """جمع أسماء الجداول التي تأثرت بعملية flush"""
+    changed = session.info.setdefault(_CHANGED_TABLES_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            changed.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    """إبطال العناصر المتأثرة بعد نجاح الـ commit فقط"""
+    changed = session.info.pop(_CHANGED_TABLES_KEY, None)
+    if changed:
+        stats_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    """تجاهل التغييرات التي تم التراجع عنها"""
+    session.info.pop(_CHANGED_TABLES_KEY, None)
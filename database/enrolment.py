@@ -0,0 +1,148 @@
+# database/enrolment.py - التسجيل الجماعي للمشاركين في الأنشطة
+"""
+إضافة المستفيدين إلى نشاط دفعة واحدة
+
+- الإدخال يتم بجملة INSERT ... SELECT ... ON CONFLICT DO NOTHING على القيد
+  uq_activity_beneficiary، فالمستفيد المسجل مسبقاً يتم تجاهله دون خطأ
+- المعرفات غير الموجودة في جدول المستفيدين تُستبعد تلقائياً (لا أخطاء مفتاح أجنبي)
+- كل العملية داخل معاملة الجلسة المُمررة؛ الـ commit مسؤولية المستدعي
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select, func, literal, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database.cache import mark_tables_changed
+from database.models import ActivityBeneficiary, Beneficiary, Family
+
+# حد عدد المعرفات في جملة IN واحدة (حد متغيرات SQLite)
+ENROLMENT_CHUNK_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class EnrolmentResult:
+    """نتيجة التسجيل الجماعي"""
+    requested: int
+    inserted: int
+    elapsed: float
+
+    @property
+    def skipped(self) -> int:
+        """المسجلون مسبقاً أو المعرفات غير الموجودة"""
+        return self.requested - self.inserted
+
+
+def _insert_from(session, activity_id: int, beneficiaries_query, role: Optional[str],
+                 status: str, start_date: Optional[date]) -> int:
+    """إدخال المستفيدين الناتجين عن استعلام وإرجاع عدد الصفوف المضافة فعلاً"""
+    stmt = sqlite_insert(ActivityBeneficiary).from_select(
+        ['activity_id', 'beneficiary_id', 'role', 'status', 'start_date'],
+        beneficiaries_query.with_only_columns(
+            literal(activity_id), Beneficiary.id, literal(role),
+            literal(status), literal(start_date or date.today()),
+        ),
+    ).on_conflict_do_nothing(index_elements=['activity_id', 'beneficiary_id'])
+    return session.execute(stmt).rowcount
+
+
+def enrol_beneficiaries(session, activity_id: int, beneficiary_ids: Iterable[int],
+                        role: Optional[str] = None, status: str = 'active',
+                        start_date: Optional[date] = None,
+                        chunk_size: int = ENROLMENT_CHUNK_SIZE) -> EnrolmentResult:
+    """تسجيل قائمة معرفات مستفيدين في نشاط"""
+    started = time.perf_counter()
+    ids = sorted(set(int(beneficiary_id) for beneficiary_id in beneficiary_ids))
+
+    inserted = 0
+    for offset in range(0, len(ids), chunk_size):
+        chunk = ids[offset:offset + chunk_size]
+        query = select(Beneficiary.id).where(Beneficiary.id.in_(chunk))
+        inserted += _insert_from(session, activity_id, query, role, status, start_date)
+
+    if inserted:
+        mark_tables_changed(session, ActivityBeneficiary.__tablename__)
+
+    return EnrolmentResult(
+        requested=len(ids), inserted=inserted, elapsed=time.perf_counter() - started
+    )
+
+
+def _filter_query(family_id: Optional[int], city: Optional[str],
+                  beneficiary_status: Optional[str]):
+    """استعلام المستفيدين المطابقين للفلتر (المدينة من المستفيد أو من أسرته)"""
+    # WHERE مطلوبة دائماً حتى لا يلتبس ON CONFLICT مع شرط الربط عند SQLite
+    query = select(Beneficiary.id).outerjoin(
+        Family, Family.id == Beneficiary.family_id
+    ).where(true())
+
+    if family_id is not None:
+        query = query.where(Beneficiary.family_id == family_id)
+    if city:
+        query = query.where(func.coalesce(Beneficiary.city, Family.city) == city)
+    if beneficiary_status:
+        query = query.where(Beneficiary.status == beneficiary_status)
+    return query
+
+
+def count_by_filter(session, family_id: Optional[int] = None, city: Optional[str] = None,
+                    beneficiary_status: Optional[str] = 'active') -> int:
+    """عدد المستفيدين المطابقين للفلتر (للتأكيد قبل التسجيل الجماعي)"""
+    query = _filter_query(family_id, city, beneficiary_status)
+    return session.execute(select(func.count()).select_from(query.subquery())).scalar() or 0
+
+
+def enrol_by_filter(session, activity_id: int, family_id: Optional[int] = None,
+                    city: Optional[str] = None, beneficiary_status: Optional[str] = 'active',
+                    role: Optional[str] = None, status: str = 'active',
+                    start_date: Optional[date] = None) -> EnrolmentResult:
+    """تسجيل كل المستفيدين المطابقين لفلتر (أسرة، مدينة، حالة) في نشاط
+
+    يتم الإدخال بجملة واحدة داخل قاعدة البيانات دون تحميل المعرفات
+    """
+    started = time.perf_counter()
+    query = _filter_query(family_id, city, beneficiary_status)
+
+    requested = count_by_filter(session, family_id, city, beneficiary_status)
+    inserted = _insert_from(session, activity_id, query, role, status, start_date) if requested else 0
+
+    if inserted:
+        mark_tables_changed(session, ActivityBeneficiary.__tablename__)
+
+    return EnrolmentResult(
+        requested=requested, inserted=inserted, elapsed=time.perf_counter() - started
+    )
+
+
+def enrol_family(session, activity_id: int, family_id: int, **kwargs) -> EnrolmentResult:
+    """تسجيل جميع أفراد أسرة في نشاط"""
+    kwargs.setdefault('beneficiary_status', None)
+    return enrol_by_filter(session, activity_id, family_id=family_id, **kwargs)
+
+
+def get_participants(session, activity_id: int):
+    """المشاركون في نشاط مع بيانات المستفيدين (استعلام واحد، مرتبون بالاسم)
+
+    يُرجع قائمة (ActivityBeneficiary, Beneficiary).
+    """
+    return session.query(ActivityBeneficiary, Beneficiary).join(
+        Beneficiary, Beneficiary.id == ActivityBeneficiary.beneficiary_id
+    ).filter(
+        ActivityBeneficiary.activity_id == activity_id
+    ).order_by(Beneficiary.full_name_ar).all()
+
+
+def count_participants(session, activity_ids: Iterable[int]) -> Dict[int, int]:
+    """عدد المشاركين لكل نشاط من قائمة أنشطة (استعلام GROUP BY واحد بدلاً من استعلام لكل نشاط)"""
+    activity_ids = list(activity_ids)
+    if not activity_ids:
+        return {}
+    rows = session.execute(
+        select(ActivityBeneficiary.activity_id, func.count(ActivityBeneficiary.id))
+        .where(ActivityBeneficiary.activity_id.in_(activity_ids))
+        .group_by(ActivityBeneficiary.activity_id)
+    ).all()
+    return dict(rows)
@@ -0,0 +1,449 @@
+# database/instrumentation.py - قياس استعلامات SQL
+"""
+تسجيل زمن كل جملة SQL وتجميعه لكل إعادة تشغيل (rerun) ولكل صفحة
+
+- أحداث before/after_cursor_execute على المحركات تقيس زمن كل جملة
+  وعدد الصفوف المتأثرة (INSERT/UPDATE/DELETE؛ SQLite لا يعرف عدد صفوف SELECT
+  قبل قراءتها) ومكان الاستدعاء في كود المشروع
+- عدد الصفوف المقروءة فعلاً (Config.QUERY_COUNT_ROWS): اتصالات sqlite3 بمؤشر
+  يعد ما يُجلب بـ fetchone/fetchmany/fetchall (للقياس؛ معطل افتراضياً)
+- track_rerun() يحيط بتنفيذ الصفحة: كل الجمل داخله تُنسب إلى إعادة التشغيل
+  الحالية، و set_current_page() يحدد اسم الصفحة عند معرفته
+- الجمل الأبطأ من Config.SLOW_QUERY_MS تُكتب في LOGS_DIR/slow_queries.log
+  (ملف دوار)
+- كشف N+1: كل جملة تُختزل إلى بصمة (بدون المعاملات والقيم الحرفية)، وإذا تكررت
+  البصمة أكثر من Config.N_PLUS_ONE_THRESHOLD مرة في عرض واحد تُسجل مع مسار
+  الاستدعاء (مكان الحلقة). assert_no_n_plus_one() لاستخدامه في الاختبارات
+- الإحصائيات في الذاكرة (خاصة بالعملية) وتُعرض في لوحة الأداء بالإعدادات
+"""
+
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from config import Config, BASE_DIR
+
+# حدود فئات مدرج زمن الجمل (ملي ثانية)
+HISTOGRAM_BUCKETS = (1, 5, 20, 100, 500)
+
+# الحد الأقصى لعدد الجمل المختلفة المحفوظة (الزائد يُجمع تحت مفتاح واحد)
+MAX_STATEMENTS = 500
+
+# عدد إعادات التشغيل الأخيرة المحفوظة للعرض
+RECENT_RERUNS = 50
+
+_PROJECT_DIR = str(BASE_DIR)
+_SKIPPED_FILES = (
+    str(Path(__file__)),
+    str(BASE_DIR / "database" / "session.py"),
+)
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def _normalize(statement: str) -> str:
+    """توحيد الجمل التي تختلف في طول قوائم IN فقط"""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("?, ...", statement)
+
+
+def fingerprint(statement: str) -> str:
+    """شكل الجملة بدون القيم: المعاملات (?) والقيم الحرفية تُستبدل بـ ?"""
+    return _PLACEHOLDER_LIST.sub("?, ...", _LITERALS.sub("?", _normalize(statement)))
+
+
+def _project_stack() -> List[str]:
+    """مسار الاستدعاء داخل كود المشروع فقط (من الأقدم إلى الأحدث)"""
+    lines = []
+    for frame in traceback.extract_stack()[:-1]:
+        if frame.filename.startswith(_PROJECT_DIR) and frame.filename not in _SKIPPED_FILES:
+            relative = frame.filename[len(_PROJECT_DIR):].lstrip("/\\")
+            lines.append(f"{relative}:{frame.lineno} in {frame.name}: {frame.line}")
+    return lines
+
+
+def _call_site() -> str:
+    """أول إطار من كود المشروع (خارج SQLAlchemy وملفات قاعدة البيانات الداخلية)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and filename not in _SKIPPED_FILES:
+            relative = filename[len(_PROJECT_DIR):].lstrip("/\\")
+            return f"{relative}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "-"
+
+
+@dataclass
+class StatementStats:
+    """تجميع جملة واحدة (حسب النص ومكان الاستدعاء)"""
+    statement: str
+    call_site: str
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    rows: int = 0
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class RowCountingCursor(sqlite3.Cursor):
+    """مؤشر sqlite3 يبلغ query_recorder بعدد الصفوف المجلوبة"""
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            query_recorder.add_fetched(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        query_recorder.add_fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        query_recorder.add_fetched(len(rows))
+        return rows
+
+
+class RowCountingConnection(sqlite3.Connection):
+    """اتصال sqlite3 تستخدم مؤشراته RowCountingCursor"""
+
+    def cursor(self, factory=RowCountingCursor):
+        return super().cursor(factory)
+
+
+@dataclass
+class NPlusOneFinding:
+    """بصمة تكررت أكثر من الحد في عرض واحد"""
+    fingerprint: str
+    call_site: str
+    count: int
+    stack: List[str]
+
+
+class NPlusOneError(AssertionError):
+    """فشل assert_no_n_plus_one"""
+
+
+class NPlusOneDetector:
+    """عد تكرار بصمات الجمل داخل نطاق واحد (عرض صفحة أو اختبار)"""
+
+    def __init__(self, threshold: int = None):
+        self.threshold = Config.N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.counts: Dict[str, int] = {}
+        self._findings: Dict[str, NPlusOneFinding] = {}
+
+    def feed(self, statement_fingerprint: str, call_site: str):
+        count = self.counts.get(statement_fingerprint, 0) + 1
+        self.counts[statement_fingerprint] = count
+        finding = self._findings.get(statement_fingerprint)
+        if finding is not None:
+            finding.count = count
+        elif count > self.threshold:
+            # المسار يُلتقط مرة واحدة عند تجاوز الحد (تكلفته لا تتكرر مع كل جملة)
+            self._findings[statement_fingerprint] = NPlusOneFinding(
+                statement_fingerprint, call_site, count, _project_stack()
+            )
+
+    @property
+    def findings(self) -> List[NPlusOneFinding]:
+        return sorted(self._findings.values(), key=lambda f: f.count, reverse=True)
+
+    def report(self) -> str:
+        """وصف نصي للنتائج (رسالة الاختبار)"""
+        parts = []
+        for finding in self.findings:
+            parts.append(
+                f"{finding.count}x {finding.fingerprint[:200]}\n  من: {finding.call_site}\n    "
+                + "\n    ".join(finding.stack)
+            )
+        return "\n".join(parts)
+
+
+@dataclass
+class RerunStats:
+    """إعادة تشغيل واحدة للصفحة"""
+    page: str
+    started: float
+    queries: int = 0
+    sql_time: float = 0.0
+    elapsed: float = 0.0
+    rows_fetched: int = 0
+    call_sites: Dict[str, int] = field(default_factory=dict)
+    detector: NPlusOneDetector = field(default_factory=NPlusOneDetector)
+
+
+@dataclass
+class PageStats:
+    """تجميع كل إعادات التشغيل لصفحة"""
+    page: str
+    reruns: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    sql_time: float = 0.0
+    elapsed: float = 0.0
+    n_plus_one: int = 0  # عدد مرات التشغيل التي ظهر فيها N+1
+
+    @property
+    def avg_queries(self) -> float:
+        return self.queries / self.reruns if self.reruns else 0.0
+
+
+class QueryRecorder:
+    """مسجل الاستعلامات المرتبط بمحركات قاعدة البيانات"""
+
+    def __init__(self, slow_query_ms: float = None, enabled: bool = None):
+        self.slow_query_ms = Config.SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms
+        self.enabled = Config.QUERY_STATS_ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._slow_logger = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._statements: Dict[tuple, StatementStats] = {}
+            self._pages: Dict[str, PageStats] = {}
+            self._recent = deque(maxlen=RECENT_RERUNS)
+            self._histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+            self.total_queries = 0
+            self.total_time = 0.0
+            self.slow_queries = 0
+            self.rows_fetched = 0
+
+    # ---------- ربط المحركات ----------
+
+    @staticmethod
+    def connect_args() -> Dict:
+        """معاملات sqlite3.connect الإضافية للمحركات (عد الصفوف عند تفعيله)"""
+        return {"factory": RowCountingConnection} if Config.QUERY_COUNT_ROWS else {}
+
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if not self.enabled or not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        self.record(statement, elapsed, rows, _call_site(), parameters)
+
+    # ---------- التسجيل ----------
+
+    def add_fetched(self, rows: int):
+        if not rows or not self.enabled:
+            return
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun.rows_fetched += rows
+        with self._lock:
+            self.rows_fetched += rows
+
+    def record(self, statement: str, elapsed: float, rows: int = 0,
+               call_site: str = "-", parameters=None):
+        elapsed_ms = elapsed * 1000
+        rerun = getattr(self._local, "rerun", None)
+        normalized = _normalize(statement)
+
+        with self._lock:
+            self.total_queries += 1
+            self.total_time += elapsed
+            self._histogram[self._bucket(elapsed_ms)] += 1
+
+            key = (normalized, call_site)
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= MAX_STATEMENTS:
+                    key = ("(جمل أخرى)", "-")
+                    stats = self._statements.setdefault(key, StatementStats(*key))
+                else:
+                    stats = self._statements[key] = StatementStats(normalized, call_site)
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.rows += rows
+
+            if rerun is not None:
+                rerun.queries += 1
+                rerun.sql_time += elapsed
+                rerun.call_sites[call_site] = rerun.call_sites.get(call_site, 0) + 1
+
+            slow = elapsed_ms >= self.slow_query_ms
+            if slow:
+                self.slow_queries += 1
+
+        if slow:
+            self._log_slow(normalized, elapsed_ms, call_site, rerun, parameters)
+
+        # الكواشف خاصة بالخيط الحالي فلا تحتاج إلى القفل
+        detectors = getattr(self._local, "detectors", None)
+        if detectors:
+            statement_fingerprint = fingerprint(statement)
+            for detector in detectors:
+                detector.feed(statement_fingerprint, call_site)
+
+    @staticmethod
+    def _bucket(elapsed_ms: float) -> int:
+        for index, limit in enumerate(HISTOGRAM_BUCKETS):
+            if elapsed_ms < limit:
+                return index
+        return len(HISTOGRAM_BUCKETS)
+
+    def _log_slow(self, statement, elapsed_ms, call_site, rerun, parameters):
+        logger = self._get_slow_logger()
+        if logger is None:
+            return
+        params = repr(parameters)
+        if len(params) > 200:
+            params = params[:200] + "..."
+        logger.warning(
+            "%.1f ms | %s | %s | %s | %s",
+            elapsed_ms, rerun.page if rerun else "-", call_site, statement[:1000], params,
+        )
+
+    def _get_slow_logger(self) -> Optional[logging.Logger]:
+        if self._slow_logger is None:
+            try:
+                Config.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+                handler = RotatingFileHandler(
+                    Config.LOGS_DIR / "slow_queries.log",
+                    maxBytes=1_000_000, backupCount=5, encoding="utf-8",
+                )
+                handler.setFormatter(logging.Formatter("%(asctime)s | %(message)s"))
+                logger = logging.getLogger("charity.slow_queries")
+                logger.setLevel(logging.WARNING)
+                logger.propagate = False
+                logger.addHandler(handler)
+                self._slow_logger = logger
+            except OSError as e:
+                print(f"⚠️ تعذر فتح سجل الاستعلامات البطيئة: {e}")
+                self.slow_query_ms = float("inf")
+        return self._slow_logger
+
+    # ---------- إعادات التشغيل والصفحات ----------
+
+    @contextmanager
+    def track_rerun(self, page: str = None):
+        """نسب كل الاستعلامات داخل المحيط إلى إعادة تشغيل واحدة"""
+        if getattr(self._local, "rerun", None) is not None:
+            # محيط متداخل: يتبع إعادة التشغيل الخارجية
+            if page:
+                self.set_current_page(page)
+            yield self._local.rerun
+            return
+
+        rerun = RerunStats(page=page or "-", started=time.perf_counter())
+        self._local.rerun = rerun
+        try:
+            with self.detect_n_plus_one(rerun.detector):
+                yield rerun
+        finally:
+            self._local.rerun = None
+            rerun.elapsed = time.perf_counter() - rerun.started
+            with self._lock:
+                page_stats = self._pages.setdefault(rerun.page, PageStats(rerun.page))
+                page_stats.reruns += 1
+                page_stats.queries += rerun.queries
+                page_stats.max_queries = max(page_stats.max_queries, rerun.queries)
+                page_stats.sql_time += rerun.sql_time
+                page_stats.elapsed += rerun.elapsed
+                if rerun.detector.findings:
+                    page_stats.n_plus_one += 1
+                self._recent.append(rerun)
+
+    @contextmanager
+    def detect_n_plus_one(self, detector: NPlusOneDetector = None):
+        """تفعيل كاشف N+1 على الجمل المنفذة في هذا الخيط داخل المحيط"""
+        detector = detector or NPlusOneDetector()
+        detectors = self._local.__dict__.setdefault("detectors", [])
+        detectors.append(detector)
+        try:
+            yield detector
+        finally:
+            detectors.remove(detector)
+
+    @contextmanager
+    def assert_no_n_plus_one(self, threshold: int = None):
+        """للاختبارات: يفشل بـ NPlusOneError إذا تكررت بصمة أكثر من threshold مرة
+
+            with assert_no_n_plus_one(threshold=3):
+                get_donors_page(session)
+        """
+        was_enabled = self.enabled
+        self.enabled = True
+        try:
+            with self.detect_n_plus_one(NPlusOneDetector(threshold)) as detector:
+                yield detector
+        finally:
+            self.enabled = was_enabled
+        if detector.findings:
+            raise NPlusOneError("استعلامات N+1:\n" + detector.report())
+
+    def set_current_page(self, page: str):
+        """تحديد اسم صفحة إعادة التشغيل الحالية"""
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun.page = page
+
+    # ---------- القراءة ----------
+
+    def top_statements(self, limit: int = 20, order_by: str = "total") -> List[StatementStats]:
+        with self._lock:
+            statements = list(self._statements.values())
+        return sorted(statements, key=lambda s: getattr(s, order_by), reverse=True)[:limit]
+
+    def page_stats(self) -> List[PageStats]:
+        with self._lock:
+            return sorted(self._pages.values(), key=lambda p: p.sql_time, reverse=True)
+
+    def recent_reruns(self) -> List[RerunStats]:
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def histogram(self) -> Dict[str, int]:
+        labels = [f"< {limit} ms" for limit in HISTOGRAM_BUCKETS]
+        labels.append(f">= {HISTOGRAM_BUCKETS[-1]} ms")
+        with self._lock:
+            return dict(zip(labels, self._histogram))
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "queries": self.total_queries,
+                "total_time": self.total_time,
+                "avg_time": self.total_time / self.total_queries if self.total_queries else 0.0,
+                "slow_queries": self.slow_queries,
+                "slow_query_ms": self.slow_query_ms,
+                "rows_fetched": self.rows_fetched,
+            }
+
+
+# نسخة عامة مشتركة بين المحركات والصفحات
+query_recorder = QueryRecorder()
+track_rerun = query_recorder.track_rerun
+set_current_page = query_recorder.set_current_page
+detect_n_plus_one = query_recorder.detect_n_plus_one
+assert_no_n_plus_one = query_recorder.assert_no_n_plus_one
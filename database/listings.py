@@ -0,0 +1,248 @@
+# database/listings.py - استعلامات القوائم المقسمة إلى صفحات
+"""
+استعلامات القوائم الكبيرة (الأسر، المتبرعون ...) مع التقسيم إلى صفحات بطريقة keyset
+
+بدلاً من OFFSET (الذي يمسح كل الصفوف السابقة)، تبدأ كل صفحة بعد مفتاح
+آخر صف في الصفحة السابقة، فتبقى التكلفة ثابتة مهما تقدمت الصفحات.
+النتائج صفوف بسيطة (dataclass) وليست كائنات ORM، فلا تُحمّل العلاقات.
+عند تمرير user_data تُحصر القائمة في السجلات المسموحة للمستخدم (database.scoping).
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, func, and_, or_, case, true
+
+from auth.permissions import PermissionLevel, Resource
+from database.models import Beneficiary, Family, Donor, Donation, DonationStatus
+from database.scoping import scope_clause
+
+
+@dataclass(frozen=True)
+class Page:
+    """صفحة من النتائج مع مفتاح الصفحة التالية"""
+    rows: Tuple
+    next_cursor: Optional[Tuple] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _keyset_page(session, query, page_size: int, row_factory, cursor_of) -> Page:
+    """تنفيذ الاستعلام وجلب صف إضافي لمعرفة وجود صفحة تالية"""
+    result = session.execute(query.limit(page_size + 1)).all()
+    rows = tuple(row_factory(row) for row in result[:page_size])
+    next_cursor = cursor_of(rows[-1]) if len(result) > page_size else None
+    return Page(rows=rows, next_cursor=next_cursor)
+
+
+# ============== الأسر ==============
+
+@dataclass(frozen=True)
+class FamilyRow:
+    """صف في قائمة الأسر"""
+    id: int
+    family_code: str
+    family_name: str
+    phone: Optional[str]
+    address: Optional[str]
+    city: Optional[str]
+    family_status: Optional[str]
+    registration_date: Optional[date]
+    beneficiaries_count: int
+    editable: bool = True
+
+
+def get_families_page(session, city: str = None, family_status: str = None,
+                      after: Tuple[str, int] = None, page_size: int = 25,
+                      user_data: dict = None) -> Page:
+    """صفحة من الأسر مرتبة حسب (الاسم، المعرف) مع عدد المستفيدين لكل أسرة
+
+    after: مفتاح آخر صف في الصفحة السابقة (family_name, id)
+    user_data: يحصر الصفحة في الأسر التي يراها المستخدم، ويحسب editable
+    لكل صف من نطاق التعديل في نفس الجملة
+    """
+    beneficiaries_count = (
+        select(func.count(Beneficiary.id))
+        .where(Beneficiary.family_id == Family.id)
+        .correlate(Family)
+        .scalar_subquery()
+    )
+
+    editable = true()
+    if user_data is not None:
+        editable = scope_clause(user_data, Resource.FAMILIES, PermissionLevel.EDIT)
+
+    query = select(
+        Family.id, Family.family_code, Family.family_name, Family.phone,
+        Family.address, Family.city, Family.family_status, Family.registration_date,
+        beneficiaries_count.label("beneficiaries_count"),
+        editable.label("editable"),
+    )
+
+    if user_data is not None:
+        query = query.where(scope_clause(user_data, Resource.FAMILIES))
+
+    # الفلاتر تستفيد من الفهرس ix_families_city_status
+    if city:
+        query = query.where(Family.city == city)
+    if family_status:
+        query = query.where(Family.family_status == family_status)
+
+    if after is not None:
+        last_name, last_id = after
+        query = query.where(or_(
+            Family.family_name > last_name,
+            and_(Family.family_name == last_name, Family.id > last_id),
+        ))
+
+    query = query.order_by(Family.family_name, Family.id)
+
+    return _keyset_page(
+        session, query, page_size,
+        row_factory=lambda row: FamilyRow(**{**row._mapping, "editable": bool(row.editable)}),
+        cursor_of=lambda row: (row.family_name, row.id),
+    )
+
+
+def get_family_cities(session, user_data: dict = None) -> List[str]:
+    """المدن المسجلة للأسر (لقائمة الفلترة)"""
+    query = select(Family.city).where(Family.city.isnot(None))
+    if user_data is not None:
+        query = query.where(scope_clause(user_data, Resource.FAMILIES))
+    return list(session.execute(query.distinct().order_by(Family.city)).scalars())
+
+
+# ============== المتبرعون ==============
+
+# الحالات التي يُحتسب مبلغها ضمن إجمالي تبرعات المتبرع
+COLLECTED_STATUSES = (DonationStatus.RECEIVED, DonationStatus.VERIFIED)
+
+DONOR_SORTS = {
+    'recent': "آخر تبرع",
+    'total': "إجمالي التبرعات",
+    'name': "الاسم",
+}
+
+# تاريخ بديل للمتبرعين بلا تبرعات (يأتون في آخر الترتيب حسب آخر تبرع)
+_NO_DONATION_DATE = date.min
+
+
+@dataclass(frozen=True)
+class DonorRow:
+    """صف في قائمة المتبرعين مع ملخص تبرعاته"""
+    id: int
+    donor_code: Optional[str]
+    donor_type: str
+    display_name: str
+    phone: Optional[str]
+    email: Optional[str]
+    city: Optional[str]
+    status: Optional[str]
+    first_donation_date: Optional[date]
+    last_donation_date: Optional[date]
+    donations_count: int
+    total_amount: float
+
+
+def _donation_totals():
+    """عدد التبرعات وإجمالي المبالغ المحصلة (للاستخدام مع GROUP BY)"""
+    collected = case(
+        (Donation.status.in_(COLLECTED_STATUSES), Donation.amount), else_=0
+    )
+    return (
+        func.count(Donation.id).label("donations_count"),
+        func.coalesce(func.sum(collected), 0).label("total_amount"),
+    )
+
+
+def get_donors_page(session, sort: str = 'recent', after: Tuple = None,
+                    page_size: int = 25, status: str = None) -> Page:
+    """صفحة من المتبرعين مع عدد التبرعات والإجمالي وتاريخ أول/آخر تبرع
+
+    كل الملخص يأتي من جملة واحدة مجمعة بدلاً من استعلامين لكل متبرع.
+
+    sort:
+        recent - حسب آخر تبرع (الأحدث أولاً)، المفتاح (last_donation_date, id)
+        total  - حسب إجمالي المبالغ المحصلة (الأكبر أولاً)، المفتاح (total_amount, id)
+        name   - حسب الاسم، المفتاح (display_name, id)
+    after: مفتاح آخر صف في الصفحة السابقة (next_cursor)
+    """
+    if sort not in DONOR_SORTS:
+        raise ValueError(f"ترتيب غير معروف: {sort}")
+
+    display_name = func.coalesce(Donor.full_name, Donor.company_name, '')
+    donor_columns = (
+        Donor.id, Donor.donor_code, Donor.donor_type, display_name.label("display_name"),
+        Donor.phone, Donor.email, Donor.city, Donor.status,
+        Donor.first_donation_date, Donor.last_donation_date,
+    )
+
+    if sort == 'total':
+        # الترتيب يعتمد على التجميع نفسه، فيُجمع جدول التبرعات كاملاً مرة واحدة
+        totals = select(Donation.donor_id, *_donation_totals()).group_by(
+            Donation.donor_id
+        ).subquery()
+        sort_key = func.coalesce(totals.c.total_amount, 0)
+        query = select(
+            *donor_columns,
+            func.coalesce(totals.c.donations_count, 0).label("donations_count"),
+            sort_key.label("total_amount"),
+        ).outerjoin(totals, totals.c.donor_id == Donor.id)
+
+        if status:
+            query = query.where(Donor.status == status)
+        if after is not None:
+            last_total, last_id = after
+            query = query.where(or_(
+                sort_key < last_total,
+                and_(sort_key == last_total, Donor.id < last_id),
+            ))
+        query = query.order_by(sort_key.desc(), Donor.id.desc())
+
+        return _keyset_page(
+            session, query, page_size,
+            row_factory=lambda row: DonorRow(**row._mapping),
+            cursor_of=lambda row: (row.total_amount, row.id),
+        )
+
+    # الترتيب من جدول المتبرعين: تُحدد الصفحة أولاً ثم تُجمع تبرعاتها فقط
+    if sort == 'recent':
+        sort_key = func.coalesce(Donor.last_donation_date, _NO_DONATION_DATE)
+        order_by = (sort_key.desc(), Donor.id.desc())
+        if after is not None:
+            last_date, last_id = after
+            keyset = or_(sort_key < last_date, and_(sort_key == last_date, Donor.id < last_id))
+    else:
+        sort_key = display_name
+        order_by = (sort_key, Donor.id)
+        if after is not None:
+            last_name, last_id = after
+            keyset = or_(sort_key > last_name, and_(sort_key == last_name, Donor.id > last_id))
+
+    # الصفحة تُحدد بالمفتاح فقط (ترتيب صفوف صغيرة) ثم تُربط ببقية الأعمدة
+    page_query = select(Donor.id, sort_key.label("sort_key"))
+    if status:
+        page_query = page_query.where(Donor.status == status)
+    if after is not None:
+        page_query = page_query.where(keyset)
+    page = page_query.order_by(*order_by).limit(page_size + 1).subquery()
+
+    query = select(*donor_columns, *_donation_totals()).select_from(page).join(
+        Donor, Donor.id == page.c.id
+    ).outerjoin(Donation, Donation.donor_id == page.c.id).group_by(page.c.id)
+
+    if sort == 'recent':
+        query = query.order_by(page.c.sort_key.desc(), page.c.id.desc())
+        cursor_of = lambda row: (row.last_donation_date or _NO_DONATION_DATE, row.id)
+    else:
+        query = query.order_by(page.c.sort_key, page.c.id)
+        cursor_of = lambda row: (row.display_name, row.id)
+
+    return _keyset_page(
+        session, query, page_size,
+        row_factory=lambda row: DonorRow(**row._mapping),
+        cursor_of=cursor_of,
+    )
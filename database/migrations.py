@@ -0,0 +1,200 @@
+# database/migrations.py - ترحيلات المخطط لقواعد البيانات القائمة
+"""
+ترحيلات مرقمة تُطبق مرة واحدة على كل قاعدة بيانات
+
+create_all تنشئ الجداول الجديدة فقط، ولا تضيف عموداً أو فهرساً إلى جدول موجود.
+هذه الترحيلات تكمل ذلك:
+
+- كل ترحيل له رقم واسم ودالة تستقبل اتصالاً، ويُسجل في جدول schema_migrations
+- كل ترحيل في معاملة قصيرة مستقلة، فيستطيع التطبيق الكتابة بين الخطوات
+  (إنشاء فهرس في SQLite يمنع الكتابة على جدوله فقط أثناء البناء)
+- بعد تطبيق أي ترحيل يتم تشغيل ANALYZE لتحديث إحصائيات المُخطط
+- الترحيل الجديد يُضاف في نهاية MIGRATIONS برقم أكبر، ولا يُعدل ترحيل قديم
+- كل ترحيل يحمل DDL صريحاً (أسماء الفهارس وأعمدتها) ولا يقرأ models.py الحالي،
+  فيبقى أثره ثابتاً مهما تغيرت النماذج لاحقاً
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+
+from database.models import SchemaMigration
+
+
+@dataclass(frozen=True)
+class Migration:
+    """ترحيل واحد"""
+    version: int
+    name: str
+    apply: Callable
+
+
+@dataclass(frozen=True)
+class MigrationResult:
+    """نتيجة تطبيق خطوة (ترحيل أو ANALYZE)"""
+    version: Optional[int]
+    name: str
+    elapsed: float
+
+
+# ============== أدوات الترحيلات ==============
+
+def create_index(connection, name: str, table: str, *columns: str):
+    """إنشاء فهرس باسمه إن لم يكن موجوداً"""
+    connection.exec_driver_sql(
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+
+
+def add_column(connection, table: str, name: str, ddl: str):
+    """إضافة عمود إن لم يكن موجوداً (القواعد الجديدة تنشئه مع جدولها)"""
+    columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+    if name not in columns:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+def _create_indexes(indexes):
+    """ترحيل ينشئ قائمة ثابتة من الفهارس (الاسم، الجدول، الأعمدة...)"""
+    def apply(connection):
+        for name, table, *columns in indexes:
+            create_index(connection, name, table, *columns)
+    return apply
+
+
+def _drop_triggers(triggers):
+    """ترحيل يحذف قائمة ثابتة من الـ triggers"""
+    def apply(connection):
+        for name in triggers:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    return apply
+
+
+# ============== الترحيلات ==============
+
+# الفهارس كما كانت في models.py عند إضافة الترحيل 1 (لا تُعدل؛ الفهارس الجديدة في ترحيل جديد)
+# فهارس الأعمدة (index=True / unique=True) تُنشأ مع جداولها منذ الإصدار الأول فلا تحتاج ترحيلاً
+_MODEL_INDEXES = (
+    ('ix_users_role_status', 'users', 'role', 'status'),
+    ('ix_user_sessions_user_active', 'user_sessions', 'user_id', 'is_active'),
+    ('ix_user_sessions_token', 'user_sessions', 'session_token'),
+    ('ix_user_logs_user_action', 'user_logs', 'user_id', 'action'),
+    ('ix_user_logs_module', 'user_logs', 'module'),
+    ('ix_user_logs_created', 'user_logs', 'created_at'),
+    ('ix_families_city_status', 'families', 'city', 'family_status'),
+    ('ix_families_name', 'families', 'family_name'),
+    ('ix_beneficiaries_family', 'beneficiaries', 'family_id'),
+    ('ix_beneficiaries_city', 'beneficiaries', 'city'),
+    ('ix_beneficiaries_status', 'beneficiaries', 'status'),
+    ('ix_activity_categories_active', 'activity_categories', 'is_active'),
+    ('ix_activity_types_category', 'activity_types', 'category_id'),
+    ('ix_custom_fields_activity_type', 'custom_fields', 'activity_type_id'),
+    ('ix_activities_type_status', 'activities', 'activity_type_id', 'status'),
+    ('ix_activities_dates', 'activities', 'start_date', 'end_date'),
+    ('ix_activities_location', 'activities', 'location'),
+    ('ix_activity_beneficiaries_activity', 'activity_beneficiaries', 'activity_id'),
+    ('ix_activity_beneficiaries_beneficiary', 'activity_beneficiaries', 'beneficiary_id'),
+    ('ix_field_values_activity', 'field_values', 'activity_id'),
+    ('ix_field_values_field', 'field_values', 'custom_field_id'),
+    ('ix_donors_type_status', 'donors', 'donor_type', 'status'),
+    ('ix_donation_allocations_donation', 'donation_allocations', 'donation_id'),
+    ('ix_donation_allocations_beneficiary', 'donation_allocations', 'beneficiary_id'),
+    ('ix_donations_donor_date', 'donations', 'donor_id', 'donation_date'),
+    ('ix_donations_status', 'donations', 'status'),
+    ('ix_donation_items_donation', 'donation_items', 'donation_id'),
+    ('ix_attachments_beneficiary', 'attachments', 'beneficiary_id'),
+    ('ix_attachments_activity', 'attachments', 'activity_id'),
+    ('ix_system_logs_level_type', 'system_logs', 'log_level', 'log_type'),
+    ('ix_system_logs_created', 'system_logs', 'created_at'),
+    ('ix_notifications_user_status', 'notifications', 'user_id', 'status'),
+    ('ix_notifications_type', 'notifications', 'notification_type'),
+    ('ix_notifications_created', 'notifications', 'created_at'),
+    ('ix_daily_donation_rollups_status_day', 'daily_donation_rollups', 'status', 'day'),
+    ('ix_daily_activity_rollups_status_day', 'daily_activity_rollups', 'status', 'day'),
+)
+
+# فهارس (created_by, ...) لقوائم الموظفين المحصورة في سجلاتهم (database.scoping)
+_OWNER_INDEXES = (
+    ('ix_families_creator_name', 'families', 'created_by', 'family_name'),
+    ('ix_activities_creator_date', 'activities', 'created_by', 'start_date'),
+    ('ix_donations_creator_date', 'donations', 'created_by', 'donation_date'),
+)
+
+# triggers فهارس البحث القديمة: كانت تستدعي normalize_ar (دالة Python غير موجودة خارج التطبيق)
+# فتفشل أي كتابة من sqlite3 أو أدوات أخرى؛ الفهرس الآن يُحدث من التطبيق (database.search)
+_SEARCH_TRIGGERS = tuple(
+    f"{index}_{suffix}"
+    for index in ("beneficiaries_fts", "donors_fts")
+    for suffix in ("ai", "ad", "au")
+)
+
+
+def _beneficiary_owner(connection):
+    """منشئ المستفيد (created_by) مع فهرسه؛ السجلات القديمة تبقى بلا منشئ"""
+    add_column(connection, 'beneficiaries', 'created_by', 'INTEGER REFERENCES users (id)')
+    create_index(connection, 'ix_beneficiaries_creator', 'beneficiaries', 'created_by')
+
+
+def _daily_rollups(connection):
+    """تعبئة جداول التجميع اليومي وتواريخ المتبرعين من الجداول الأصلية"""
+    from database.rollups import rebuild_rollups
+
+    with Session(bind=connection) as session:
+        rebuild_rollups(session)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "model_indexes", _create_indexes(_MODEL_INDEXES)),
+    Migration(2, "daily_rollups_and_donor_dates", _daily_rollups),
+    Migration(3, "owner_indexes", _create_indexes(_OWNER_INDEXES)),
+    Migration(4, "drop_search_triggers", _drop_triggers(_SEARCH_TRIGGERS)),
+    Migration(5, "beneficiary_owner", _beneficiary_owner),
+]
+
+
+# ============== التشغيل ==============
+
+def applied_versions(connection) -> set:
+    SchemaMigration.__table__.create(connection, checkfirst=True)
+    return set(connection.execute(select(SchemaMigration.version)).scalars())
+
+
+def pending_migrations(engine) -> List[Migration]:
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+def run_migrations(engine, analyze: bool = True) -> List[MigrationResult]:
+    """تطبيق الترحيلات المعلقة بالترتيب وإرجاع زمن كل خطوة"""
+    results = []
+
+    for migration in pending_migrations(engine):
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            migration.apply(connection)
+            elapsed = time.perf_counter() - started
+            connection.execute(insert(SchemaMigration).values(
+                version=migration.version,
+                name=migration.name,
+                duration_ms=int(elapsed * 1000),
+            ))
+        results.append(MigrationResult(migration.version, migration.name, elapsed))
+        print(f"🔧 ترحيل {migration.version} ({migration.name}): {elapsed * 1000:.0f} ملي ثانية")
+
+    if results and analyze:
+        results.append(run_analyze(engine))
+
+    return results
+
+
+def run_analyze(engine) -> MigrationResult:
+    """تحديث إحصائيات الجداول والفهارس (sqlite_stat1) لمُخطط الاستعلامات"""
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+    elapsed = time.perf_counter() - started
+    print(f"📊 ANALYZE: {elapsed * 1000:.0f} ملي ثانية")
+    return MigrationResult(None, "analyze", elapsed)
@@ -200,6 +200,8 @@ class Family(Base):
     # قيود
     __table_args__ = (
         Index('ix_families_city_status', 'city', 'family_status'),
+        Index('ix_families_name', 'family_name'),
+        Index('ix_families_creator_name', 'created_by', 'family_name'),
         UniqueConstraint('family_code', name='uq_family_code'),
     )
 
@@ -267,6 +269,7 @@ class Beneficiary(Base):
     next_followup_date = Column(Date)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
+    created_by = Column(Integer, ForeignKey('users.id'))
     
     # علاقات
     family = relationship("Family", back_populates="beneficiaries")
@@ -278,6 +281,7 @@ class Beneficiary(Base):
         Index('ix_beneficiaries_family', 'family_id'),
         Index('ix_beneficiaries_city', 'city'),
         Index('ix_beneficiaries_status', 'status'),
+        Index('ix_beneficiaries_creator', 'created_by'),
         CheckConstraint("gender IN ('M', 'F')", name='ck_beneficiary_gender'),
     )
 
@@ -436,6 +440,7 @@ class Activity(Base):
         Index('ix_activities_type_status', 'activity_type_id', 'status'),
         Index('ix_activities_dates', 'start_date', 'end_date'),
         Index('ix_activities_location', 'location'),
+        Index('ix_activities_creator_date', 'created_by', 'start_date'),
         CheckConstraint("priority IN ('low', 'medium', 'high', 'urgent')", name='ck_activity_priority'),
     )
 
@@ -637,6 +642,7 @@ class Donation(Base):
     __table_args__ = (
         Index('ix_donations_donor_date', 'donor_id', 'donation_date'),
         Index('ix_donations_status', 'status'),
+        Index('ix_donations_creator_date', 'created_by', 'donation_date'),
         CheckConstraint("donation_type IN ('cash', 'in_kind', 'service')", name='ck_donation_type'),
     )
 
@@ -772,6 +778,66 @@ class Notification(Base):
     )
 
 
+# ============== جداول التجميع اليومي ==============
+
+class DailyDonationRollup(Base):
+    """تجميع يومي للتبرعات (يُحدّث تلقائياً مع كل تعديل على التبرعات)"""
+    __tablename__ = 'daily_donation_rollups'
+    
+    day = Column(Date, primary_key=True)
+    donation_type = Column(String(20), primary_key=True)
+    status = Column(String(20), primary_key=True)  # قيمة DonationStatus (verified, ...)
+    currency = Column(String(3), primary_key=True)
+    
+    donation_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('ix_daily_donation_rollups_status_day', 'status', 'day'),
+    )
+
+
+class DailyActivityRollup(Base):
+    """تجميع يومي للأنشطة حسب تاريخ البدء (يُحدّث تلقائياً مع كل تعديل على الأنشطة)"""
+    __tablename__ = 'daily_activity_rollups'
+    
+    day = Column(Date, primary_key=True)
+    activity_type_id = Column(Integer, primary_key=True)
+    status = Column(String(20), primary_key=True)  # قيمة ActivityStatus (planned, ...)
+    
+    activity_count = Column(Integer, nullable=False, default=0)
+    estimated_cost_total = Column(Numeric(14, 2), nullable=False, default=0)
+    actual_cost_total = Column(Numeric(14, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('ix_daily_activity_rollups_status_day', 'status', 'day'),
+    )
+
+
+# ============== العدادات التسلسلية ==============
+
+class SequenceCounter(Base):
+    """عدادات الأرقام التسلسلية (رقم التبرع، رقم الإيصال) لكل بادئة وسنة"""
+    __tablename__ = 'sequence_counters'
+    
+    prefix = Column(String(10), primary_key=True)  # DON, RCP
+    year = Column(Integer, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+# ============== ترحيلات المخطط ==============
+
+class SchemaMigration(Base):
+    """الترحيلات المطبقة على قاعدة البيانات (انظر database/migrations.py)"""
+    __tablename__ = 'schema_migrations'
+    
+    version = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime, server_default=func.now())
+    duration_ms = Column(Integer)
+
+
 # ============== دوال المساعدة ==============
 
 def get_all_models():
@@ -782,5 +848,7 @@ def get_all_models():
         ActivityCategory, ActivityType, CustomField, Activity,
         ActivityBeneficiary, FieldValue,
         Donor, Donation, DonationItem, DonationAllocation,
-        Attachment, SystemLog, Notification
+        Attachment, SystemLog, Notification,
+        DailyDonationRollup, DailyActivityRollup, SequenceCounter,
+        SchemaMigration
     ]
\ No newline at end of file
@@ -0,0 +1,362 @@
+# database/rollups.py - جداول التجميع اليومي
+"""
+صيانة جداول التجميع اليومي للتبرعات والأنشطة
+
+- يتم تحديث التجميعات تدريجياً داخل نفس المعاملة مع كل flush يضيف أو يعدل
+  أو يحذف تبرعاً أو نشاطاً عبر جلسة ORM (فرق +1/-1 على المفتاح القديم والجديد)
+- العمليات الجماعية التي لا تمر عبر ORM يجب أن تتبعها إعادة بناء:
+      python rebuild_rollups.py
+- لوحات التحكم والإحصائيات تقرأ من هذه الجداول فلا تزداد تكلفتها مع حجم السجل
+- بنفس الطريقة يتم تحديث تاريخ أول وآخر تبرع لكل متبرع تأثرت تبرعاته
+"""
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import (
+    event, inspect, select, func, case, delete, insert, update, type_coerce, or_, String
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database.models import (
+    Activity, Donation, Donor, DailyActivityRollup, DailyDonationRollup,
+    ActivityStatus, DonationStatus
+)
+
+# الحقول التي تحدد مفتاح التجميع أو قيمه
+_DONATION_FIELDS = ('donation_date', 'donation_type', 'status', 'currency', 'amount')
+_ACTIVITY_FIELDS = ('start_date', 'activity_type_id', 'status', 'estimated_cost', 'actual_cost')
+
+# الحقول التي تؤثر على تاريخ أول/آخر تبرع للمتبرع
+_DONOR_DATE_FIELDS = ('donor_id', 'donation_date', 'status')
+
+
+def _enum_value(value, enum_cls) -> str:
+    """تحويل الحالة (enum أو نص) إلى قيمتها النصية"""
+    if value is None:
+        return ''
+    try:
+        return enum_cls(value).value
+    except ValueError:
+        return str(value).lower()
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal('0')
+
+
+def _values(obj, fields, old: bool) -> Dict[str, object]:
+    """قيم الحقول الحالية أو القيم قبل التعديل"""
+    state = inspect(obj)
+    values = {}
+    for name in fields:
+        history = state.attrs[name].history
+        if old and history.deleted:
+            values[name] = history.deleted[0]
+        else:
+            values[name] = getattr(obj, name)
+    return values
+
+
+def _donation_entry(values):
+    """(مفتاح التجميع، العدد، المبلغ) لتبرع واحد"""
+    key = (
+        values['donation_date'] or date.today(),
+        values['donation_type'] or '',
+        _enum_value(values['status'] or DonationStatus.PENDING, DonationStatus),
+        values['currency'] or '',
+    )
+    return key, (1, _decimal(values['amount']))
+
+
+def _activity_entry(values):
+    """(مفتاح التجميع، العدد، التكلفة المتوقعة، التكلفة الفعلية) لنشاط واحد"""
+    key = (
+        values['start_date'],
+        values['activity_type_id'],
+        _enum_value(values['status'] or ActivityStatus.PLANNED, ActivityStatus),
+    )
+    return key, (1, _decimal(values['estimated_cost']), _decimal(values['actual_cost']))
+
+
+def _accumulate(deltas, key, amounts, sign):
+    bucket = deltas[key]
+    for index, amount in enumerate(amounts):
+        bucket[index] += sign * amount
+
+
+def _collect_deltas(session, model, fields, entry):
+    """حساب فروق التجميع من التغييرات المعلقة في الجلسة"""
+    deltas = defaultdict(lambda: [0, Decimal('0'), Decimal('0')])
+
+    for obj in session.new:
+        if isinstance(obj, model):
+            key, amounts = entry(_values(obj, fields, old=False))
+            _accumulate(deltas, key, amounts, +1)
+
+    for obj in session.deleted:
+        if isinstance(obj, model):
+            key, amounts = entry(_values(obj, fields, old=True))
+            _accumulate(deltas, key, amounts, -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, model) and obj not in session.deleted:
+            state = inspect(obj)
+            if not any(state.attrs[name].history.has_changes() for name in fields):
+                continue
+            old_key, old_amounts = entry(_values(obj, fields, old=True))
+            new_key, new_amounts = entry(_values(obj, fields, old=False))
+            _accumulate(deltas, old_key, old_amounts, -1)
+            _accumulate(deltas, new_key, new_amounts, +1)
+
+    return {key: values for key, values in deltas.items() if any(values)}
+
+
+def _apply_donation_deltas(connection, deltas):
+    rows = [
+        {
+            'day': day, 'donation_type': donation_type, 'status': status,
+            'currency': currency, 'donation_count': count, 'total_amount': amount,
+        }
+        for (day, donation_type, status, currency), (count, amount, _) in deltas.items()
+    ]
+    stmt = sqlite_insert(DailyDonationRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'donation_type', 'status', 'currency'],
+        set_={
+            'donation_count': DailyDonationRollup.donation_count + stmt.excluded.donation_count,
+            'total_amount': DailyDonationRollup.total_amount + stmt.excluded.total_amount,
+        },
+    )
+    connection.execute(stmt, rows)
+
+
+def _apply_activity_deltas(connection, deltas):
+    rows = [
+        {
+            'day': day, 'activity_type_id': activity_type_id, 'status': status,
+            'activity_count': count, 'estimated_cost_total': estimated,
+            'actual_cost_total': actual,
+        }
+        for (day, activity_type_id, status), (count, estimated, actual) in deltas.items()
+    ]
+    stmt = sqlite_insert(DailyActivityRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'activity_type_id', 'status'],
+        set_={
+            'activity_count': DailyActivityRollup.activity_count + stmt.excluded.activity_count,
+            'estimated_cost_total': DailyActivityRollup.estimated_cost_total + stmt.excluded.estimated_cost_total,
+            'actual_cost_total': DailyActivityRollup.actual_cost_total + stmt.excluded.actual_cost_total,
+        },
+    )
+    connection.execute(stmt, rows)
+
+
+# ============== تواريخ أول وآخر تبرع ==============
+
+def _refresh_donor_dates(connection, donor_ids=None) -> int:
+    """إعادة حساب first/last_donation_date (لكل المتبرعين أو لمتبرعين محددين)
+
+    التبرعات الملغاة لا تُحتسب؛ الاستعلامات الفرعية تستفيد من الفهرس ix_donations_donor_date
+    """
+    counted = (
+        (Donation.donor_id == Donor.id)
+        & or_(Donation.status.is_(None), Donation.status != DonationStatus.CANCELLED)
+    )
+    stmt = update(Donor).values(
+        first_donation_date=select(func.min(Donation.donation_date)).where(counted).scalar_subquery(),
+        last_donation_date=select(func.max(Donation.donation_date)).where(counted).scalar_subquery(),
+        # تحديث محسوب وليس تعديلاً من المستخدم
+        updated_at=Donor.updated_at,
+    )
+    if donor_ids is not None:
+        stmt = stmt.where(Donor.id.in_(donor_ids))
+    return connection.execute(stmt).rowcount
+
+
+def _affected_donors(session):
+    """معرفات المتبرعين الذين تغيرت تبرعاتهم في هذا الـ flush (قبل التعديل وبعده)"""
+    donor_ids = set()
+    for obj in session.new:
+        if isinstance(obj, Donation):
+            donor_ids.add(obj.donor_id)
+    for obj in session.deleted:
+        if isinstance(obj, Donation):
+            donor_ids.add(_values(obj, ('donor_id',), old=True)['donor_id'])
+    for obj in session.dirty:
+        if isinstance(obj, Donation) and obj not in session.deleted:
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in _DONOR_DATE_FIELDS):
+                donor_ids.add(_values(obj, ('donor_id',), old=True)['donor_id'])
+                donor_ids.add(obj.donor_id)
+    donor_ids.discard(None)
+    return donor_ids
+
+
+# ============== التحديث التدريجي مع كل flush ==============
+
+_TRACKED = (
+    (Donation, tuple(dict.fromkeys(_DONATION_FIELDS + _DONOR_DATE_FIELDS))),
+    (Activity, _ACTIVITY_FIELDS),
+)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """مستمع فارغ: وجوده مع active_history يضمن تحميل القيمة القديمة قبل التعديل"""
+
+
+for _model, _fields in _TRACKED:
+    for _name in _fields:
+        event.listen(getattr(_model, _name), 'set', _load_old_value, active_history=True)
+
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_values(session, flush_context, instances):
+    """تحميل قيم الصفوف المحذوفة قبل حذفها فعلياً من قاعدة البيانات"""
+    for obj in session.deleted:
+        for model, fields in _TRACKED:
+            if isinstance(obj, model):
+                for name in fields:
+                    getattr(obj, name)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_rollups(session, flush_context):
+    """تطبيق فروق التجميع داخل نفس المعاملة"""
+    donation_deltas = _collect_deltas(session, Donation, _DONATION_FIELDS, _donation_entry)
+    activity_deltas = _collect_deltas(session, Activity, _ACTIVITY_FIELDS, _activity_entry)
+    donor_ids = _affected_donors(session)
+
+    if not donation_deltas and not activity_deltas and not donor_ids:
+        return
+
+    connection = session.connection()
+    if donation_deltas:
+        _apply_donation_deltas(connection, donation_deltas)
+    if activity_deltas:
+        _apply_activity_deltas(connection, activity_deltas)
+    if donor_ids:
+        _refresh_donor_dates(connection, donor_ids)
+
+
+# ============== إعادة البناء الكامل ==============
+
+def rebuild_rollups(session) -> Dict[str, int]:
+    """إعادة بناء جداول التجميع وتواريخ المتبرعين من الجداول الأصلية (لقواعد البيانات القائمة)"""
+    session.execute(delete(DailyDonationRollup))
+    session.execute(delete(DailyActivityRollup))
+
+    # الحالة مخزنة باسم العنصر (VERIFIED) بينما التجميع يستخدم القيمة (verified)
+    donation_status = type_coerce(Donation.status, String)
+    activity_status = type_coerce(Activity.status, String)
+
+    session.execute(
+        insert(DailyDonationRollup).from_select(
+            ['day', 'donation_type', 'status', 'currency', 'donation_count', 'total_amount'],
+            select(
+                Donation.donation_date,
+                Donation.donation_type,
+                func.lower(func.coalesce(donation_status, 'PENDING')),
+                func.coalesce(Donation.currency, ''),
+                func.count(Donation.id),
+                func.coalesce(func.sum(Donation.amount), 0),
+            ).group_by(
+                Donation.donation_date, Donation.donation_type,
+                donation_status, Donation.currency
+            )
+        )
+    )
+
+    session.execute(
+        insert(DailyActivityRollup).from_select(
+            ['day', 'activity_type_id', 'status', 'activity_count',
+             'estimated_cost_total', 'actual_cost_total'],
+            select(
+                Activity.start_date,
+                Activity.activity_type_id,
+                func.lower(func.coalesce(activity_status, 'PLANNED')),
+                func.count(Activity.id),
+                func.coalesce(func.sum(Activity.estimated_cost), 0),
+                func.coalesce(func.sum(Activity.actual_cost), 0),
+            ).group_by(
+                Activity.start_date, Activity.activity_type_id,
+                activity_status
+            )
+        )
+    )
+
+    donors = _refresh_donor_dates(session.connection())
+
+    return {
+        'daily_donation_rollups': session.query(DailyDonationRollup).count(),
+        'daily_activity_rollups': session.query(DailyActivityRollup).count(),
+        'donors': donors,
+    }
+
+
+# ============== القراءة من التجميعات ==============
+
+def donation_totals(session, start: Optional[date] = None, end: Optional[date] = None,
+                    statuses=None):
+    """عدد ومجموع التبرعات في فترة (من جدول التجميع)"""
+    query = select(
+        func.coalesce(func.sum(DailyDonationRollup.donation_count), 0),
+        func.coalesce(func.sum(DailyDonationRollup.total_amount), 0),
+    )
+    if start is not None:
+        query = query.where(DailyDonationRollup.day >= start)
+    if end is not None:
+        query = query.where(DailyDonationRollup.day <= end)
+    if statuses:
+        query = query.where(DailyDonationRollup.status.in_(
+            [_enum_value(s, DonationStatus) for s in statuses]
+        ))
+
+    count, amount = session.execute(query).one()
+    return int(count), float(amount)
+
+
+def donation_type_breakdown(session, collected_statuses=(DonationStatus.RECEIVED, DonationStatus.VERIFIED)):
+    """(النوع، العدد، إجمالي المبالغ، المبالغ المحصلة) لكل نوع تبرع"""
+    collected = DailyDonationRollup.status.in_(
+        [_enum_value(s, DonationStatus) for s in collected_statuses]
+    )
+    return session.execute(
+        select(
+            DailyDonationRollup.donation_type,
+            func.sum(DailyDonationRollup.donation_count),
+            func.sum(DailyDonationRollup.total_amount),
+            func.sum(case((collected, DailyDonationRollup.total_amount), else_=0)),
+        )
+        .group_by(DailyDonationRollup.donation_type)
+        .having(func.sum(DailyDonationRollup.donation_count) > 0)
+    ).all()
+
+
+def activity_status_counts(session, start: Optional[date] = None, end: Optional[date] = None):
+    """عدد الأنشطة حسب الحالة في فترة (من جدول التجميع)"""
+    query = select(
+        DailyActivityRollup.status,
+        func.sum(DailyActivityRollup.activity_count),
+    ).group_by(DailyActivityRollup.status).having(
+        func.sum(DailyActivityRollup.activity_count) > 0
+    )
+    if start is not None:
+        query = query.where(DailyActivityRollup.day >= start)
+    if end is not None:
+        query = query.where(DailyActivityRollup.day <= end)
+
+    return [(status, int(count)) for status, count in session.execute(query).all()]
+
+
+def count_activities(session, status: Optional[str] = None,
+                     start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """عدد الأنشطة المطابقة لفلتر الحالة والفترة"""
+    counts = activity_status_counts(session, start, end)
+    if status:
+        status = _enum_value(status, ActivityStatus)
+        return sum(count for value, count in counts if value == status)
+    return sum(count for _, count in counts)
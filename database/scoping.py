@@ -0,0 +1,95 @@
+# database/scoping.py - تحويل نطاق الصلاحية إلى شرط SQL
+"""
+تطبيق نطاق صلاحية المستخدم (all / department / own) داخل الاستعلام نفسه
+
+بدلاً من جلب كل السجلات ثم فحص كل سجل في Python
+(permission_manager.check_resource_access مع created_by)، يُترجم أوسع نطاق
+مسموح للمستخدم على المورد إلى شرط WHERE:
+    all        -> بدون قيد
+    department -> السجلات التي أنشأها أي مستخدم في نفس القسم
+    own        -> السجلات التي أنشأها المستخدم (created_by == user_id)
+    لا شيء     -> لا سجلات
+فتقرأ قاعدة البيانات الصفوف المسموحة فقط (مع الاستفادة من فهارس created_by).
+
+السجلات بلا منشئ (created_by IS NULL، مثل الأسر المضافة قبل تسجيل المنشئ)
+لا تدخل في نطاق own ولا department: يعدلها فقط من له نطاق all (المدير والمشرف).
+"""
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, true, false
+
+from auth.permissions import PermissionLevel, Resource, permission_manager
+from database.models import Activity, Beneficiary, Donation, Donor, Family, User
+
+# عمود "منشئ السجل" لكل مورد يدعم النطاقات الضيقة
+OWNER_COLUMNS: Dict[Resource, Any] = {
+    Resource.ACTIVITIES: Activity.created_by,
+    Resource.DONATIONS: Donation.created_by,
+    Resource.FAMILIES: Family.created_by,
+}
+
+# موارد بلا عمود منشئ تتبع منشئ سجل آخر:
+# المورد -> (عمود الربط، عمود المفتاح في الجدول المالك، مورد الجدول المالك)
+# المستفيد يتبع أسرته، والمتبرع يتبع تبرعات أنشأها المستخدم
+OWNED_VIA: Dict[Resource, tuple] = {
+    Resource.BENEFICIARIES: (Beneficiary.family_id, Family.id, Resource.FAMILIES),
+    Resource.DONORS: (Donor.id, Donation.donor_id, Resource.DONATIONS),
+}
+
+# وصف النطاقات الضيقة لتنبيه المستخدم أن الأرقام المعروضة جزئية
+ROW_SCOPE_LABELS = {
+    "department": "سجلات قسمك",
+    "own": "السجلات التي أنشأتها",
+}
+
+# نطاقات الصفوف من الأوسع إلى الأضيق ("limited" حد لعدد الصفوف وليس شرطاً عليها)
+_ROW_SCOPES = ("all", "department", "own")
+
+
+def row_scope(user_data: Optional[dict], resource: Resource,
+              level: PermissionLevel = PermissionLevel.VIEW) -> Optional[str]:
+    """أوسع نطاق صفوف مسموح للمستخدم على المورد (أو None)"""
+    user_data = user_data or {}
+    if not user_data.get("role"):
+        return None
+    permissions = permission_manager.for_user(user_data)
+    for scope in _ROW_SCOPES:
+        if permissions.allows(resource, level, scope):
+            # نطاق القسم بدون قسم معروف للمستخدم يضيق إلى سجلاته فقط
+            if scope == "department" and not user_data.get("department"):
+                return "own" if permissions.allows(resource, level, "own") else None
+            return scope
+    return None
+
+
+def scope_clause(user_data: Optional[dict], resource: Resource,
+                 level: PermissionLevel = PermissionLevel.VIEW, owner_column=None):
+    """شرط SQL يحصر الاستعلام في السجلات المسموحة للمستخدم
+
+    owner_column: عمود المنشئ إذا كان الاستعلام يصل للمورد عبر جدول آخر
+    (الافتراضي OWNER_COLUMNS[resource])
+    """
+    scope = row_scope(user_data, resource, level)
+    if scope == "all":
+        return true()
+    if scope is None:
+        return false()
+
+    if owner_column is None and resource in OWNED_VIA:
+        link_column, owner_key, owner_resource = OWNED_VIA[resource]
+        owned = scope_clause(user_data, resource, level,
+                             owner_column=OWNER_COLUMNS[owner_resource])
+        return link_column.in_(select(owner_key).where(owned))
+
+    if owner_column is None:
+        owner_column = OWNER_COLUMNS.get(resource)
+        if owner_column is None:
+            raise ValueError(f"المورد {resource.value} لا يدعم نطاق {scope}")
+
+    if scope == "department":
+        return owner_column.in_(
+            select(User.id).where(User.department == user_data["department"])
+        )
+    user_id = user_data.get("user_id")
+    return owner_column == user_id if user_id is not None else false()
@@ -0,0 +1,315 @@
+# database/search.py - البحث النصي السريع (SQLite FTS5)
+"""
+فهارس بحث نصي كامل (FTS5) تظلل الجداول الأصلية
+
+- كل فهرس جدول افتراضي rowid فيه = معرف الصف الأصلي
+- النص يُطبّع في Python (utils.helpers.normalize_arabic) قبل الكتابة في الفهرس
+  وعند البحث؛ لا توجد triggers ولا دوال SQL خاصة بالتطبيق في المخطط، فأي أداة
+  (sqlite3، النسخ الاحتياطي، السكربتات) تستطيع الكتابة في الجداول الأصلية
+- التطبيق يحدث الفهرس في نفس المعاملة:
+    كائنات ORM: بعد كل flush (الإضافة، الحذف، وتعديل الأعمدة المفهرسة فقط)
+    الإدخال الجماعي (Core): sync_search_rows بالمعرفات المدخلة
+  التعديلات من خارج التطبيق تتطلب rebuild_search_indexes
+- الفهارس الحالية: المستفيدون (beneficiaries_fts) والمتبرعون (donors_fts)
+- البحث يعيد معرفات مرتبة حسب الصلة (bm25)؛ وإذا لم تتوفر FTS5
+  يتم الرجوع إلى LIKE العادي
+"""
+
+import re
+from itertools import islice
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import bindparam, event, inspect, text, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database.models import Beneficiary, Donor
+from utils.helpers import normalize_arabic
+
+_TOKEN_SPLIT = re.compile(r'[\s"\'*():^+\-]+')
+
+# عدد الصفوف في كل دفعة عند إعادة البناء أو المزامنة
+_SYNC_BATCH = 500
+
+# (رابط قاعدة البيانات، اسم الفهرس) -> هل الفهرس موجود (FTS5 قد لا تكون متوفرة)
+_AVAILABLE: Dict[Tuple[str, str], bool] = {}
+
+
+class FtsIndex:
+    """تعريف فهرس FTS5 لجدول أصلي
+
+    columns: اسم العمود في الفهرس -> أعمدة الجدول الأصلي (تُدمج بمسافة ثم تُطبّع)
+    أي تعديل على أحد هذه الأعمدة يعيد فهرسة الصف
+    """
+
+    def __init__(self, name: str, model, columns: Dict[str, Tuple[str, ...]],
+                 weights: Sequence[float] = None):
+        self.name = name
+        self.model = model
+        self.source_table = model.__tablename__
+        self.columns = columns
+        self.weights = tuple(weights or [1.0] * len(columns))
+        self.watch = tuple(dict.fromkeys(
+            source for sources in columns.values() for source in sources
+        ))
+
+    def create_statements(self) -> List[str]:
+        """جملة إنشاء الجدول الافتراضي (بدون triggers)"""
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5("
+            f"{', '.join(self.columns)}, tokenize = 'unicode61 remove_diacritics 2')",
+        ]
+
+    def exists(self, connection) -> bool:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": self.name},
+        ).first() is not None
+        _AVAILABLE[(str(connection.engine.url), self.name)] = exists
+        return exists
+
+    def available(self, connection) -> bool:
+        """هل الفهرس موجود في قاعدة البيانات (يُفحص مرة واحدة لكل قاعدة)"""
+        known = _AVAILABLE.get((str(connection.engine.url), self.name))
+        return self.exists(connection) if known is None else known
+
+    def ensure(self, connection) -> bool:
+        """إنشاء الفهرس إذا لم يكن موجوداً وتعبئته من الجدول الأصلي
+
+        يعيد True إذا تم إنشاء الفهرس الآن
+        """
+        created = not self.exists(connection)
+        for statement in self.create_statements():
+            connection.execute(text(statement))
+        _AVAILABLE[(str(connection.engine.url), self.name)] = True
+        if created:
+            self.rebuild(connection)
+        return created
+
+    # ---------- الكتابة في الفهرس ----------
+
+    def _document(self, row) -> dict:
+        """قيم الفهرس المطبّعة لصف من الجدول الأصلي"""
+        values = {"rowid": row.id}
+        for column, sources in self.columns.items():
+            parts = [str(row._mapping[source]) for source in sources if row._mapping[source]]
+            values[column] = normalize_arabic(" ".join(parts)) if parts else None
+        return values
+
+    def _select_source(self, where: str = "") -> str:
+        return f"SELECT id, {', '.join(self.watch)} FROM {self.source_table} {where}"
+
+    def _insert_documents(self, connection, rows) -> int:
+        documents = [self._document(row) for row in rows]
+        if documents:
+            connection.execute(text(
+                f"INSERT INTO {self.name}(rowid, {', '.join(self.columns)}) "
+                f"VALUES (:rowid, {', '.join(':' + column for column in self.columns)})"
+            ), documents)
+        return len(documents)
+
+    def sync(self, connection, ids: Iterable[int]):
+        """إعادة فهرسة صفوف محددة (المحذوفة من الجدول الأصلي تُحذف من الفهرس)"""
+        ids = iter(sorted(set(ids)))
+        delete = text(f"DELETE FROM {self.name} WHERE rowid IN :ids").bindparams(
+            bindparam("ids", expanding=True)
+        )
+        select = text(self._select_source("WHERE id IN :ids")).bindparams(
+            bindparam("ids", expanding=True)
+        )
+        while True:
+            batch = list(islice(ids, _SYNC_BATCH))
+            if not batch:
+                break
+            connection.execute(delete, {"ids": batch})
+            self._insert_documents(connection, connection.execute(select, {"ids": batch}).all())
+
+    def rebuild(self, connection):
+        """إعادة تعبئة الفهرس بالكامل من الجدول الأصلي (على دفعات)"""
+        connection.execute(text(f"DELETE FROM {self.name}"))
+        rows = connection.execution_options(yield_per=_SYNC_BATCH).execute(
+            text(self._select_source())
+        )
+        for batch in rows.partitions():
+            self._insert_documents(connection, batch)
+
+    def changed_ids(self, session) -> List[int]:
+        """معرفات كائنات هذا الجدول التي تحتاج إعادة فهرسة بعد flush"""
+        ids = [obj.id for obj in session.new if isinstance(obj, self.model)]
+        ids.extend(obj.id for obj in session.deleted if isinstance(obj, self.model))
+        for obj in session.dirty:
+            if isinstance(obj, self.model):
+                attrs = inspect(obj).attrs
+                if any(attrs[column].history.has_changes() for column in self.watch):
+                    ids.append(obj.id)
+        return [id_ for id_ in ids if id_ is not None]
+
+    def search_ids(self, connection, query: str, limit: int = 20,
+                   source_filter: str = None, **params) -> List[int]:
+        """معرفات الصفوف المطابقة مرتبة حسب الصلة
+
+        source_filter: شرط SQL إضافي على الجدول الأصلي (باسم src)
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        weights = ", ".join(str(weight) for weight in self.weights)
+        join = where = ""
+        if source_filter:
+            join = f"JOIN {self.source_table} src ON src.id = {self.name}.rowid "
+            where = f"AND ({source_filter}) "
+        rows = connection.execute(
+            text(
+                f"SELECT {self.name}.rowid FROM {self.name} {join}"
+                f"WHERE {self.name} MATCH :match {where}"
+                f"ORDER BY bm25({self.name}, {weights}) LIMIT :limit"
+            ),
+            {"match": match, "limit": limit, **params},
+        )
+        return [row[0] for row in rows]
+
+
+def build_match_query(query: str) -> str:
+    """تحويل نص المستخدم إلى استعلام FTS5 آمن
+
+    كل كلمة تُطبّع وتُقتبس وتُبحث كبادئة، والكلمات مرتبطة بـ AND
+    ("محم" تطابق "محمد" و"محمود")
+    """
+    tokens = _TOKEN_SPLIT.split(normalize_arabic(query or "").strip())
+    return " ".join(f'"{token}"*' for token in tokens if token)
+
+
+# ============== فهرس المستفيدين ==============
+
+BENEFICIARIES_FTS = FtsIndex(
+    name="beneficiaries_fts",
+    model=Beneficiary,
+    columns={
+        "full_name_ar": ("full_name_ar",),
+        "full_name_en": ("full_name_en",),
+        # الاسم المفكك في نص واحد
+        "name_parts": ("first_name", "father_name", "grandfather_name", "family_name"),
+        "national_id": ("national_id",),
+        "phone": ("phone",),
+    },
+    # الاسم الكامل والرقم القومي أهم من الاسم المفكك
+    weights=(10.0, 5.0, 3.0, 8.0, 4.0),
+)
+
+
+# ============== فهرس المتبرعين ==============
+
+DONORS_FTS = FtsIndex(
+    name="donors_fts",
+    model=Donor,
+    columns={
+        "full_name": ("full_name",),
+        "company_name": ("company_name",),
+        "phone": ("phone",),
+        "donor_code": ("donor_code",),
+    },
+    weights=(10.0, 8.0, 5.0, 5.0),
+)
+
+SEARCH_INDEXES = (BENEFICIARIES_FTS, DONORS_FTS)
+
+
+def ensure_search_indexes(engine) -> List[str]:
+    """إنشاء فهارس البحث الناقصة (يُستدعى عند تهيئة قاعدة البيانات)
+
+    يعيد أسماء الفهارس التي أنشئت الآن؛ إذا لم تتوفر FTS5 لا يتم إنشاء شيء
+    """
+    created = []
+    try:
+        with engine.begin() as connection:
+            for index in SEARCH_INDEXES:
+                if index.ensure(connection):
+                    created.append(index.name)
+    except OperationalError as e:
+        print(f"⚠️  تعذر إنشاء فهارس البحث (FTS5): {e}")
+    return created
+
+
+def rebuild_search_indexes(session):
+    """إعادة بناء جميع فهارس البحث (بعد إدخال جماعي أو تعديل من خارج التطبيق)"""
+    connection = session.connection()
+    for index in SEARCH_INDEXES:
+        if index.available(connection):
+            index.rebuild(connection)
+
+
+_INDEXES_BY_TABLE = {index.source_table: index for index in SEARCH_INDEXES}
+
+
+def sync_search_rows(connection, table_name: str, ids: Iterable[int]):
+    """إعادة فهرسة صفوف كُتبت بجمل Core (الإدخال الجماعي)؛ لا شيء للجداول بلا فهرس"""
+    index = _INDEXES_BY_TABLE.get(table_name)
+    if index is not None and ids and index.available(connection):
+        index.sync(connection, ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_after_flush(session, flush_context):
+    """تحديث الفهارس لكائنات ORM المضافة والمحذوفة والمعدلة في نفس المعاملة"""
+    if not (session.new or session.dirty or session.deleted):
+        return
+    connection = None
+    for index in SEARCH_INDEXES:
+        ids = index.changed_ids(session)
+        if ids:
+            connection = connection or session.connection()
+            if index.available(connection):
+                index.sync(connection, ids)
+
+
+# ============== واجهة البحث ==============
+
+def search_beneficiary_ids(session, query: str, limit: int = 20) -> List[int]:
+    """معرفات المستفيدين المطابقين مرتبة حسب الصلة"""
+    if not query or not query.strip():
+        return []
+
+    try:
+        return BENEFICIARIES_FTS.search_ids(session.connection(), query, limit)
+    except OperationalError:
+        # FTS5 غير متوفرة: بحث LIKE عادي (مسح كامل للجدول)
+        pattern = f"%{query.strip()}%"
+        rows = session.query(Beneficiary.id).filter(or_(
+            Beneficiary.full_name_ar.ilike(pattern),
+            Beneficiary.national_id.ilike(pattern),
+        )).limit(limit)
+        return [row.id for row in rows]
+
+
+def search_donor_ids(session, query: str, limit: int = 20,
+                     active_only: bool = True) -> List[int]:
+    """معرفات المتبرعين المطابقين (الاسم، الشركة، الهاتف، الكود) مرتبة حسب الصلة"""
+    if not query or not query.strip():
+        return []
+
+    try:
+        return DONORS_FTS.search_ids(
+            session.connection(), query, limit,
+            source_filter="src.status = :status" if active_only else None,
+            status="active",
+        )
+    except OperationalError:
+        # FTS5 غير متوفرة: بحث بالبادئة
+        pattern = f"{query.strip()}%"
+        rows = session.query(Donor.id).filter(or_(
+            Donor.full_name.ilike(pattern),
+            Donor.company_name.ilike(pattern),
+            Donor.phone.like(pattern),
+            Donor.donor_code.like(pattern),
+        ))
+        if active_only:
+            rows = rows.filter(Donor.status == 'active')
+        return [row.id for row in rows.limit(limit)]
+
+
+def load_ranked(session, model, ids: Sequence[int]) -> list:
+    """تحميل الكائنات بمعرفاتها في استعلام واحد مع الحفاظ على ترتيب الصلة"""
+    if not ids:
+        return []
+    objects = {obj.id: obj for obj in session.query(model).filter(model.id.in_(ids))}
+    return [objects[id_] for id_ in ids if id_ in objects]
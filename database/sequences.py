@@ -0,0 +1,119 @@
+# database/sequences.py - الأرقام التسلسلية للتبرعات والإيصالات
+"""
+توليد أرقام التبرعات والإيصالات من جدول عدادات (sequence_counters)
+
+- كل بادئة لها عداد مستقل لكل سنة: DON-2025-000001، RCP-2025-000001
+- الحجز يتم بجملة واحدة INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+  فلا يحصل مستخدمان على نفس الرقم مهما تزامنت الإضافات
+- allocate(): الحجز داخل معاملة الجلسة نفسها؛ إذا أُلغيت المعاملة يعود العداد
+  فلا توجد فجوات في الترقيم (مناسب للإدخال من الواجهة)
+- SequenceBlocks: حجز كتلة أرقام في معاملة مستقلة وتوزيعها من الذاكرة
+  (للاستيراد الجماعي؛ الأرقام غير المستخدمة عند إغلاق العملية تبقى فجوة)
+"""
+
+import threading
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database.models import DonationStatus, SequenceCounter
+
+DONATION_PREFIX = 'DON'
+RECEIPT_PREFIX = 'RCP'
+
+# الحالات التي يصدر لها رقم إيصال
+RECEIPT_STATUSES = (DonationStatus.RECEIVED, DonationStatus.VERIFIED)
+
+# حجم الكتلة الافتراضي للحجز المسبق
+DEFAULT_BLOCK_SIZE = 500
+
+
+def format_number(prefix: str, year: int, value: int) -> str:
+    """تنسيق الرقم: PREFIX-YYYY-NNNNNN"""
+    return f"{prefix}-{year}-{value:06d}"
+
+
+def _reserve(executor, prefix: str, year: int, count: int) -> Tuple[int, int]:
+    """حجز count رقماً متتالياً وإرجاع (أول رقم، آخر رقم)
+
+    executor: جلسة (تمر عبر منسق الكتابة) أو اتصال مستقل
+    """
+    stmt = sqlite_insert(SequenceCounter).values(
+        prefix=prefix, year=year, last_value=count
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['prefix', 'year'],
+        set_={
+            'last_value': SequenceCounter.last_value + stmt.excluded.last_value,
+            'updated_at': func.now(),
+        },
+    ).returning(SequenceCounter.last_value)
+
+    last = executor.execute(stmt).scalar_one()
+    return last - count + 1, last
+
+
+def allocate(session, prefix: str, year: Optional[int] = None, count: int = 1) -> Tuple[int, int]:
+    """حجز أرقام داخل معاملة الجلسة (تُثبت أو تُلغى مع بقية التعديلات)"""
+    if count < 1:
+        raise ValueError("عدد الأرقام يجب أن يكون 1 على الأقل")
+    return _reserve(session, prefix, year or date.today().year, count)
+
+
+def next_number(session, prefix: str, on: Optional[date] = None) -> str:
+    """الرقم التالي لبادئة في سنة التاريخ المُمرر (أو السنة الحالية)"""
+    year = (on or date.today()).year
+    value, _ = allocate(session, prefix, year)
+    return format_number(prefix, year, value)
+
+
+def next_donation_number(session, on: Optional[date] = None) -> str:
+    """رقم التبرع التالي (DON-YYYY-NNNNNN)"""
+    return next_number(session, DONATION_PREFIX, on)
+
+
+def next_receipt_number(session, on: Optional[date] = None) -> str:
+    """رقم الإيصال التالي (RCP-YYYY-NNNNNN)"""
+    return next_number(session, RECEIPT_PREFIX, on)
+
+
+def assign_receipt_number(session, donation) -> bool:
+    """إعطاء التبرع رقم إيصال إذا أصبح مستلماً/مؤكداً ولم يكن له رقم
+
+    يُرجع True إذا تم إصدار رقم جديد
+    """
+    if donation.receipt_number or donation.status not in RECEIPT_STATUSES:
+        return False
+    donation.receipt_number = next_receipt_number(session, donation.donation_date)
+    return True
+
+
+class SequenceBlocks:
+    """توزيع الأرقام من كتل محجوزة مسبقاً (آمن بين الخيوط داخل العملية)
+
+    كل كتلة تُحجز في معاملة مستقلة تُثبت فوراً، فلا ينتظر المستوردون بعضهم
+    على صف العداد طوال مدة الاستيراد.
+    """
+
+    def __init__(self, engine, block_size: int = DEFAULT_BLOCK_SIZE):
+        self.engine = engine
+        self.block_size = block_size
+        self._blocks: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def next_value(self, prefix: str, year: Optional[int] = None) -> int:
+        year = year or date.today().year
+        key = (prefix, year)
+        with self._lock:
+            current, last = self._blocks.get(key, (1, 0))
+            if current > last:
+                with self.engine.begin() as connection:
+                    current, last = _reserve(connection, prefix, year, self.block_size)
+            self._blocks[key] = (current + 1, last)
+            return current
+
+    def next_number(self, prefix: str, on: Optional[date] = None) -> str:
+        year = (on or date.today()).year
+        return format_number(prefix, year, self.next_value(prefix, year))
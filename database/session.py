@@ -1,45 +1,310 @@
 # database/session.py
-from sqlalchemy import create_engine, text
+import random
+import threading
+import time
+import zlib
+
+from sqlalchemy import create_engine, text, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 from config import Config
 
 # استخدم Base من models بدلاً من إنشاء قاعدة جديدة
 from database.models import Base
 
+# تسجيل أحداث الجلسات: إبطال الذاكرة المؤقتة وتحديث جداول التجميع اليومي
+import database.cache  # noqa: F401
+import database.rollups  # noqa: F401
+from database.instrumentation import query_recorder
+from database.migrations import MIGRATIONS, run_migrations
+from database.search import SEARCH_INDEXES, ensure_search_indexes
+
+# ترتيب تطبيق الإعدادات: busy_timeout أولاً حتى ينتظر تغيير journal_mode أي قفل قائم
+_PRAGMA_ORDER = (
+    "busy_timeout", "journal_mode", "synchronous", "cache_size",
+    "mmap_size", "temp_store", "foreign_keys",
+)
+
+
+def apply_connection_profile(dbapi_connection, profile: dict):
+    """تطبيق إعدادات ملف الاتصال كـ PRAGMA على اتصال SQLite"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name in sorted(profile, key=lambda key: (
+            _PRAGMA_ORDER.index(key) if key in _PRAGMA_ORDER else len(_PRAGMA_ORDER)
+        )):
+            cursor.execute(f"PRAGMA {name}={profile[name]}")
+    finally:
+        cursor.close()
+
+
+# ============== تنسيق الكتابة ==============
+
+class DatabaseBusyError(RuntimeError):
+    """تعذر الحفظ لأن قاعدة البيانات مشغولة بعمليات كتابة أخرى"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        # True عندما يكون السبب SQLITE_BUSY من اتصال آخر (تفيد إعادة المحاولة)
+        self.retryable = retryable
+
+
+def is_busy_error(error) -> bool:
+    """هل الخطأ SQLITE_BUSY / SQLITE_LOCKED"""
+    if not isinstance(error, OperationalError):
+        return False
+    code = getattr(error.orig, 'sqlite_errorcode', None)
+    return code in (5, 6) or 'database is locked' in str(error.orig)
+
+
+# مفتاح في session.info: الجلسة تحمل قفل الكتابة
+_HOLDS_WRITE_LOCK = 'holds_write_lock'
+
+
+class WriteCoordinator:
+    """منسق الكتابة: جلسة واحدة تكتب في كل مرة داخل العملية
+
+    SQLite يسمح بكاتب واحد فقط؛ بدلاً من أن تتسابق الخيوط على قفل الملف وتفشل
+    عشوائياً بـ "database is locked"، تنتظر كل جلسة دورها في قفل داخل العملية.
+
+    - القفل يُطلب عند أول كتابة فعلية في الجلسة (flush أو INSERT/UPDATE/DELETE
+      عبر session.execute؛ جمل text() الخام لا تُكتشف) ويُحرر عند انتهاء المعاملة،
+      فجلسات القراءة لا تنتظر أبداً
+    - الانتظار محدود بـ WRITE_LOCK_TIMEOUT ثم DatabaseBusyError برسالة واضحة
+    - الإحصائيات: عدد المنتظرين الآن، أقصى طابور، متوسط وأقصى زمن انتظار
+    """
+
+    def __init__(self, lock_timeout: float = None, max_retries: int = None,
+                 retry_delay: float = None, max_retry_delay: float = None):
+        self.lock_timeout = Config.WRITE_LOCK_TIMEOUT if lock_timeout is None else lock_timeout
+        self.max_retries = Config.WRITE_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_delay = Config.WRITE_RETRY_DELAY if retry_delay is None else retry_delay
+        self.max_retry_delay = Config.WRITE_RETRY_MAX_DELAY if max_retry_delay is None else max_retry_delay
+
+        # RLock: جلستان كاتبتان في نفس الخيط لا تنتظر إحداهما الأخرى حتى المهلة
+        self._lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        with self._stats_lock:
+            self._waiting = 0
+            self._stats = {
+                'writes': 0, 'max_waiting': 0, 'total_wait': 0.0, 'max_wait': 0.0,
+                'timeouts': 0, 'busy_errors': 0, 'retries': 0,
+            }
+
+    # ---------- القفل ----------
+
+    def acquire(self):
+        """انتظار دور الكتابة (بحد أقصى lock_timeout)"""
+        started = time.perf_counter()
+        with self._stats_lock:
+            self._waiting += 1
+            self._stats['max_waiting'] = max(self._stats['max_waiting'], self._waiting)
+        try:
+            acquired = self._lock.acquire(timeout=self.lock_timeout)
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self._waiting -= 1
+                if acquired:
+                    self._stats['writes'] += 1
+                    self._stats['total_wait'] += waited
+                    self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+                else:
+                    self._stats['timeouts'] += 1
+
+        if not acquired:
+            raise DatabaseBusyError(
+                f"قاعدة البيانات مشغولة بعمليات حفظ أخرى (انتظار {waited:.1f} ثانية)، حاول مرة أخرى"
+            )
+
+    def release(self):
+        self._lock.release()
+
+    def attach(self, session_factory):
+        """ربط المنسق بجلسات sessionmaker"""
+        event.listen(session_factory, "before_flush", self._on_before_flush)
+        event.listen(session_factory, "do_orm_execute", self._on_orm_execute)
+        event.listen(session_factory, "after_transaction_end", self._on_transaction_end)
+
+    def _hold(self, session):
+        if not session.info.get(_HOLDS_WRITE_LOCK):
+            self.acquire()
+            session.info[_HOLDS_WRITE_LOCK] = True
+
+    def _on_before_flush(self, session, flush_context, instances):
+        if session.new or session.dirty or session.deleted:
+            self._hold(session)
+
+    def _on_orm_execute(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            self._hold(orm_execute_state.session)
+
+    def _on_transaction_end(self, session, transaction):
+        if transaction.parent is None and session.info.pop(_HOLDS_WRITE_LOCK, False):
+            self.release()
+
+    # ---------- إعادة المحاولة ----------
+
+    def backoff(self, attempt: int) -> float:
+        """تأخير أُسّي مع عشوائية (حتى لا تعيد الجلسات المحاولة في نفس اللحظة)"""
+        delay = min(self.max_retry_delay, self.retry_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def record_busy(self):
+        with self._stats_lock:
+            self._stats['busy_errors'] += 1
+
+    def record_retry(self):
+        with self._stats_lock:
+            self._stats['retries'] += 1
+
+    def stats(self) -> dict:
+        """لقطة من إحصائيات الكتابة"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['waiting'] = self._waiting
+        stats['avg_wait'] = stats['total_wait'] / stats['writes'] if stats['writes'] else 0.0
+        return stats
+
+
+def schema_fingerprint() -> int:
+    """بصمة المخطط المطلوب من النماذج وفهارس البحث والترحيلات
+
+    تتغير عند إضافة جدول أو عمود أو فهرس، وتُحفظ في PRAGMA user_version
+    بعد إنشاء الجداول؛ إذا تطابقت عند التشغيل لا داعي لـ create_all والفحص.
+    """
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(sorted(column.name for column in table.columns))
+        parts.extend(sorted(index.name for index in table.indexes))
+    for index in SEARCH_INDEXES:
+        parts.append(index.name)
+        parts.extend(index.columns)
+    parts.extend(f"migration:{migration.version}" for migration in MIGRATIONS)
+    return zlib.crc32("|".join(parts).encode("utf-8")) & 0x7FFFFFFF
+
+
 class DatabaseManager:
+    """مدير قاعدة البيانات - التهيئة كسولة عند أول استخدام
+
+    الاستيراد لا يتصل بقاعدة البيانات؛ أول جلسة (أو أول وصول إلى engine)
+    تنشئ المحركات مرة واحدة للعملية كلها، وتتحقق من المخطط عبر بصمته.
+    """
+
     def __init__(self):
-        self.engine = None
-        self.SessionLocal = None
+        self._engine = None
+        self._session_local = None
+        self._read_engine = None
+        self._read_session_local = None
+        self._ready = False
+        self._init_lock = threading.Lock()
+        self.profile_name = Config.DB_PROFILE
+        self.profile = Config.get_db_profile(self.profile_name)
+        self.writes = WriteCoordinator()
+        self.init_timings = {}
+
+    def configure(self, profile: str = None):
+        """تغيير ملف الاتصال قبل أول استخدام (مثلاً bulk_load لسكربتات الاستيراد)"""
+        if self._ready:
+            raise RuntimeError("تمت تهيئة قاعدة البيانات بالفعل؛ استدعِ configure قبل أول استخدام")
+        if profile:
+            self.profile = Config.get_db_profile(profile)
+            self.profile_name = profile
+        return self
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._ready
+
+    def initialize(self):
+        """إنشاء المحركات والتحقق من المخطط (مرة واحدة، آمنة بين الخيوط)"""
+        if self._ready:
+            return self
+        with self._init_lock:
+            if self._ready:
+                return self
+
+            started = time.perf_counter()
+            print(f"🔧 تهيئة قاعدة البيانات...")
+            print(f"📁 المسار: {Config.DATABASE_PATH}")
+            print(f"⚙️ ملف الاتصال: {self.profile_name}")
 
-        print(f"🔧 تهيئة قاعدة البيانات...")
-        print(f"📁 المسار: {Config.DATABASE_PATH}")
-        print(f"🔗 URL: {Config.DATABASE_URL}")
+            self._init_engine()
+            engine_ready = time.perf_counter()
+            schema_created = self._ensure_schema()
+            finished = time.perf_counter()
 
-        self._init_engine()
-        self._create_tables()
+            self.init_timings = {
+                'engine': engine_ready - started,
+                'schema': finished - engine_ready,
+                'total': finished - started,
+                'schema_created': schema_created,
+            }
+            self._ready = True
+            print(f"⏱️ تهيئة قاعدة البيانات: {self.init_timings['total'] * 1000:.0f} ملي ثانية "
+                  f"(المخطط: {self.init_timings['schema'] * 1000:.0f})")
+        return self
+
+    @property
+    def engine(self):
+        return self.initialize()._engine
+
+    @property
+    def SessionLocal(self):
+        return self.initialize()._session_local
+
+    @property
+    def read_engine(self):
+        return self.initialize()._read_engine
+
+    @property
+    def ReadSessionLocal(self):
+        return self.initialize()._read_session_local
     
     def _init_engine(self):
         """تهيئة محرك قاعدة البيانات"""
         try:
-            print(f"📁 مسار قاعدة البيانات: {Config.DATABASE_PATH}")
-            print(f"📁 هل المجلد موجود؟: {Config.DATABASE_PATH.parent.exists()}")
-            
             # إنشاء المجلد إذا لم يكن موجوداً
             Config.DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
             
             # إنشاء المحرك
-            self.engine = create_engine(
+            self._engine = create_engine(
                 Config.DATABASE_URL,
-                connect_args={"check_same_thread": False},
+                connect_args={"check_same_thread": False, **query_recorder.connect_args()},
                 echo=False,  # تعطيل في الإنتاج
                 pool_pre_ping=True
             )
             
+            # إعدادات الاتصال (WAL، المهلة، الذاكرة ...) ودوال SQL المخصصة
+            event.listen(self._engine, "connect", self._on_connect)
+            query_recorder.attach(self._engine)
+            
             # إنشاء جلسة محلية
-            self.SessionLocal = sessionmaker(
+            self._session_local = sessionmaker(
                 autocommit=False,
                 autoflush=False,
-                bind=self.engine
+                bind=self._engine
+            )
+            self.writes.attach(self._session_local)
+            
+            # محرك القراءة فقط (query_only): للصفحات والتقارير التي لا تكتب
+            self._read_engine = create_engine(
+                Config.DATABASE_URL,
+                connect_args={"check_same_thread": False, **query_recorder.connect_args()},
+                echo=False,
+                pool_pre_ping=True
+            )
+            event.listen(self._read_engine, "connect", self._on_read_connect)
+            query_recorder.attach(self._read_engine)
+            self._read_session_local = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False,
+                bind=self._read_engine
             )
             
             print("✅ تم تهيئة محرك قاعدة البيانات بنجاح")
@@ -50,19 +315,60 @@ class DatabaseManager:
             traceback.print_exc()
             raise
     
-    def _create_tables(self):
+    def _ensure_schema(self) -> bool:
+        """إنشاء الجداول فقط إذا تغيرت بصمة المخطط؛ يُرجع True إذا تم الإنشاء"""
+        fingerprint = schema_fingerprint()
+        with self._engine.connect() as conn:
+            current = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        
+        if current == fingerprint:
+            print("✅ مخطط قاعدة البيانات محدث")
+            return False
+        
+        self.apply_schema(self._engine)
+        return True
+    
+    def apply_schema(self, engine):
+        """إنشاء الجداول الناقصة ثم تطبيق الترحيلات المعلقة وتسجيل بصمة المخطط
+
+        يُرجع نتائج الترحيلات (زمن كل خطوة).
+        """
+        self._create_tables(engine)
+        # الفهارس والأعمدة والبيانات المشتقة الناقصة من الجداول القائمة
+        results = run_migrations(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version={schema_fingerprint()}")
+        return results
+    
+    def migration_engine(self):
+        """محرك مستقل بإعدادات ملف الاتصال دون تهيئة المخطط (لـ migrate.py)
+
+        self.engine يطبق الترحيلات المعلقة ضمناً عند أول استخدام، فلا يرى
+        من يستخدمه أي ترحيل معلق؛ هذا المحرك يترك قاعدة البيانات كما هي.
+        """
+        Config.DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        engine = create_engine(Config.DATABASE_URL, connect_args={"check_same_thread": False})
+        event.listen(engine, "connect", self._on_connect)
+        return engine
+    
+    def _create_tables(self, engine=None):
         """إنشاء جميع الجداول"""
+        engine = engine or self._engine
         try:
             # استيراد جميع النماذج أولاً
             from database.models import get_all_models
             
             # إنشاء جميع الجداول
-            Base.metadata.create_all(bind=self.engine)
+            Base.metadata.create_all(bind=engine)
             print(f"✅ تم إنشاء {len(get_all_models())} جدول بنجاح")
             
+            # فهارس البحث النصي (تُعبأ من الجداول عند إنشائها لأول مرة)
+            for index_name in ensure_search_indexes(engine):
+                print(f"🔍 تم إنشاء فهرس البحث: {index_name}")
+            
             # عرض الجداول المنشأة
             from sqlalchemy import inspect
-            inspector = inspect(self.engine)
+            inspector = inspect(engine)
             tables = inspector.get_table_names()
             print(f"📋 الجداول المنشأة ({len(tables)}):")
             for table in sorted(tables):
@@ -74,6 +380,15 @@ class DatabaseManager:
             traceback.print_exc()
             raise
     
+    def _on_connect(self, dbapi_connection, connection_record):
+        """تهيئة كل اتصال جديد بقاعدة البيانات"""
+        apply_connection_profile(dbapi_connection, self.profile)
+    
+    def _on_read_connect(self, dbapi_connection, connection_record):
+        """تهيئة اتصال القراءة: نفس الإعدادات مع منع أي كتابة"""
+        self._on_connect(dbapi_connection, connection_record)
+        dbapi_connection.execute("PRAGMA query_only=ON")
+    
     def test_connection(self):
         """اختبار الاتصال بقاعدة البيانات"""
         try:
@@ -94,11 +409,15 @@ class DatabaseManager:
         """الحصول على جلسة قاعدة البيانات"""
         return self.SessionLocal()
     
+    def get_read_session(self):
+        """جلسة قراءة فقط (لا flush ولا commit)"""
+        return self.ReadSessionLocal()
+    
     def get_engine(self):
         """الحصول على محرك قاعدة البيانات"""
         return self.engine
 
-# إنشاء نسخة عامة
+# نسخة عامة (لا اتصال حتى أول استخدام)
 db_manager = DatabaseManager()
 
 # database/session.py - أضف في النهاية
@@ -114,8 +433,58 @@ def session_scope():
         session.commit()
     except Exception as e:
         session.rollback()
+        if is_busy_error(e):
+            db_manager.writes.record_busy()
+            raise DatabaseBusyError(
+                "قاعدة البيانات مشغولة حالياً، حاول مرة أخرى", retryable=True
+            ) from e
         raise e
     finally:
-        session.close()    
+        session.close()
+
+
+@contextmanager
+def read_session_scope(snapshot: bool = False):
+    """جلسة قراءة فقط للصفحات والتقارير
+
+    - الاتصال بـ query_only فأي محاولة كتابة تفشل فوراً بدلاً من أخذ قفل الكتابة
+    - لا commit عند الخروج (لا يوجد ما يُثبت)
+    - snapshot=True: كل الاستعلامات داخل المحيط ترى نفس نسخة البيانات (لقطة WAL)
+      حتى لو حُفظت تعديلات أثناء تنفيذها، مناسب للإحصائيات متعددة الاستعلامات
+    """
+    session = db_manager.get_read_session()
+    try:
+        if snapshot:
+            # معاملة قراءة صريحة؛ اللقطة تبدأ مع أول استعلام وتستمر حتى نهاية المحيط
+            session.connection().exec_driver_sql("BEGIN")
+        yield session
+    finally:
+        # close تُنهي معاملة القراءة دون إبطال الكائنات المحملة
+        session.close()
+
+
+def run_in_transaction(work, max_retries: int = None):
+    """تنفيذ work(session) في معاملة مع إعادة المحاولة عند SQLITE_BUSY
+
+    work قد يُنفذ أكثر من مرة، فيجب ألا يكون له أثر خارج الجلسة قبل نجاحه.
+    انتهاء مهلة انتظار الدور لا يُعاد (الانتظار محدود أصلاً).
+    """
+    writes = db_manager.writes
+    max_retries = writes.max_retries if max_retries is None else max_retries
+
+    for attempt in range(max_retries + 1):
+        try:
+            with session_scope() as session:
+                return work(session)
+        except DatabaseBusyError as e:
+            if not e.retryable or attempt == max_retries:
+                raise
+            writes.record_retry()
+            time.sleep(writes.backoff(attempt))
+
+
+def get_write_stats() -> dict:
+    """إحصائيات منسق الكتابة (الطابور وزمن الانتظار)"""
+    return db_manager.writes.stats()    
 
 
@@ -0,0 +1,453 @@
+# database/stats.py - خدمات الإحصائيات المجمعة
+"""
+حساب مؤشرات لوحة التحكم وإحصائيات الأنشطة والتبرعات بأقل عدد من الاستعلامات
+
+بدلاً من تنفيذ استعلام COUNT منفصل لكل بطاقة، يتم حساب جميع العدادات
+باستخدام التجميع الشرطي (SUM(CASE ...)) في استعلام واحد يمر على كل جدول مرة واحدة.
+عدادات الأنشطة والتبرعات تُقرأ من جداول التجميع اليومي (database.rollups).
+النتائج لقطات ثابتة (dataclass) يمكن تخزينها مؤقتاً عبر database.cache.
+
+كل دالة تقبل user_data اختيارياً: من نطاقه all يقرأ جداول التجميع (وهي تجيب
+عن "الكل" فقط)، ومن نطاقه department أو own تُحسب أرقامه باستعلامات مباشرة
+مقيدة بـ database.scoping.scope_clause، وتُخزن لقطته بمفتاح نطاقه.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select, func, case, and_, true
+
+from auth.permissions import Resource
+from database.cache import stats_cache
+from database.models import (
+    Activity, ActivityBeneficiary, Beneficiary, Donation, Donor, Family,
+    DailyActivityRollup, DailyDonationRollup, ActivityStatus, DonationStatus
+)
+from database.rollups import activity_status_counts, donation_totals, donation_type_breakdown
+from database.scoping import row_scope, scope_clause
+from utils.helpers import month_bounds, week_bounds
+
+# الجداول التي تعتمد عليها كل لقطة (لإبطال الذاكرة المؤقتة عند تعديلها)
+DASHBOARD_TABLES = ('activities', 'beneficiaries', 'families', 'donations')
+ACTIVITY_STATISTICS_TABLES = ('activities', 'activity_beneficiaries')
+DONATION_STATISTICS_TABLES = ('donations', 'donors')
+_DASHBOARD_RESOURCES = (
+    Resource.ACTIVITIES, Resource.DONATIONS, Resource.BENEFICIARIES, Resource.FAMILIES,
+)
+
+
+def _count_if(condition, value=1):
+    """عدّ الصفوف (أو جمع قيمة) التي تحقق شرطاً معيناً (تجميع شرطي)"""
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def _row_filter(user_data: Optional[dict], resource: Resource):
+    """شرط نطاق المستخدم على المورد، أو None إذا كان يرى كل السجلات
+
+    None يعني أن جداول التجميع صالحة للإجابة؛ user_data=None للاستخدام
+    الداخلي (السكربتات والاختبارات) ويعني كل السجلات أيضاً.
+    """
+    if user_data is None or row_scope(user_data, resource) == "all":
+        return None
+    return scope_clause(user_data, resource)
+
+
+def _where(query, condition):
+    """إضافة شرط النطاق إلى الاستعلام إن وُجد"""
+    return query if condition is None else query.where(condition)
+
+
+def _recent_activity(row) -> "RecentActivity":
+    return RecentActivity(
+        title=row.title,
+        start_date=row.start_date,
+        status=row.status.value if row.status is not None else None,
+        location=row.location,
+    )
+
+
+@dataclass(frozen=True)
+class RecentActivity:
+    """نشاط حديث لعرضه في لوحة التحكم"""
+    title: str
+    start_date: Optional[date]
+    status: Optional[str]
+    location: Optional[str]
+
+
+# عدادات حالات الأنشطة في لوحة التحكم
+_ACTIVITY_STATUS_COUNTERS = (
+    (ActivityStatus.PLANNED, "planned_activities"),
+    (ActivityStatus.IN_PROGRESS, "active_activities"),
+    (ActivityStatus.COMPLETED, "completed_activities"),
+    (ActivityStatus.CANCELLED, "cancelled_activities"),
+)
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """لقطة لمؤشرات لوحة التحكم"""
+    # المستفيدون والأسر
+    total_beneficiaries: int = 0
+    new_beneficiaries: int = 0
+    male_beneficiaries: int = 0
+    female_beneficiaries: int = 0
+    total_families: int = 0
+
+    # الأنشطة حسب الحالة
+    total_activities: int = 0
+    planned_activities: int = 0
+    active_activities: int = 0
+    completed_activities: int = 0
+    cancelled_activities: int = 0
+
+    # التبرعات المؤكدة
+    total_donations: int = 0
+    monthly_donations: int = 0
+
+    recent_activities: Tuple[RecentActivity, ...] = ()
+    period_start: Optional[date] = None
+    generated_at: datetime = field(default_factory=datetime.now)
+
+
+def get_dashboard_snapshot(session, today: date = None, recent_limit: int = 5,
+                           user_data: Optional[dict] = None) -> DashboardSnapshot:
+    """حساب مؤشرات لوحة التحكم في استعلامين فقط (ضمن نطاق المستخدم)"""
+    today = today or date.today()
+    start_of_month = today.replace(day=1)
+
+    activity_filter = _row_filter(user_data, Resource.ACTIVITIES)
+    donation_filter = _row_filter(user_data, Resource.DONATIONS)
+
+    # الأنشطة والتبرعات تُقرأ من جداول التجميع اليومي عندما يرى المستخدم الكل
+    if activity_filter is None:
+        status, weight = DailyActivityRollup.status, DailyActivityRollup.activity_count
+        activities = select(func.coalesce(func.sum(weight), 0).label("total_activities"))
+    else:
+        status, weight = Activity.status, 1
+        activities = select(func.count(Activity.id).label("total_activities")).where(activity_filter)
+    activities = activities.add_columns(*(
+        # جدول التجميع يخزن قيمة الحالة النصية، وعمود النشاط يقارن بعضو الـ Enum
+        _count_if(status == (member.value if activity_filter is None else member), weight).label(label)
+        for member, label in _ACTIVITY_STATUS_COUNTERS
+    )).subquery("activity_counts")
+
+    beneficiaries = select(
+        func.count(Beneficiary.id).label("total_beneficiaries"),
+        _count_if(Beneficiary.registration_date >= start_of_month).label("new_beneficiaries"),
+        # توزيع النوع يقتصر على المستفيدين المحددة مدينتهم (كما في الرسم البياني)
+        _count_if(and_(Beneficiary.city.isnot(None), Beneficiary.gender == 'M')).label("male_beneficiaries"),
+        _count_if(and_(Beneficiary.city.isnot(None), Beneficiary.gender == 'F')).label("female_beneficiaries"),
+    )
+    beneficiaries = _where(
+        beneficiaries, _row_filter(user_data, Resource.BENEFICIARIES)
+    ).subquery("beneficiary_counts")
+
+    families = _where(
+        select(func.count(Family.id).label("total_families")),
+        _row_filter(user_data, Resource.FAMILIES),
+    ).subquery("family_counts")
+
+    if donation_filter is None:
+        donations = select(
+            func.coalesce(func.sum(DailyDonationRollup.donation_count), 0).label("total_donations"),
+            _count_if(DailyDonationRollup.day >= start_of_month,
+                      DailyDonationRollup.donation_count).label("monthly_donations"),
+        ).where(
+            DailyDonationRollup.status == DonationStatus.VERIFIED.value
+        )
+    else:
+        donations = select(
+            func.count(Donation.id).label("total_donations"),
+            _count_if(Donation.donation_date >= start_of_month).label("monthly_donations"),
+        ).where(Donation.status == DonationStatus.VERIFIED, donation_filter)
+    donations = donations.subquery("donation_counts")
+
+    # كل جدول يُمسح مرة واحدة، والنتائج تُدمج في صف واحد
+    counters_query = select(
+        *activities.c, *beneficiaries.c, *families.c, *donations.c
+    ).select_from(
+        activities
+        .join(beneficiaries, true())
+        .join(families, true())
+        .join(donations, true())
+    )
+
+    counters = session.execute(counters_query).mappings().one()
+
+    recent_rows = session.execute(
+        _where(
+            select(Activity.title, Activity.start_date, Activity.status, Activity.location),
+            activity_filter,
+        )
+        .order_by(Activity.created_at.desc())
+        .limit(recent_limit)
+    ).all()
+
+    return DashboardSnapshot(
+        **{key: int(value or 0) for key, value in counters.items()},
+        recent_activities=tuple(_recent_activity(row) for row in recent_rows),
+        period_start=start_of_month,
+    )
+
+
+# ============== إحصائيات الأنشطة ==============
+
+@dataclass(frozen=True)
+class ActivityStatistics:
+    """لقطة لإحصائيات الأنشطة"""
+    total_activities: int = 0
+    completed_activities: int = 0
+    total_participants: int = 0
+    status_counts: Tuple[Tuple[str, int], ...] = ()
+    monthly_activities: Tuple[RecentActivity, ...] = ()
+    generated_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def completion_rate(self) -> float:
+        """نسبة الأنشطة المكتملة"""
+        if not self.total_activities:
+            return 0.0
+        return self.completed_activities / self.total_activities * 100
+
+
+def get_activity_statistics(session, today: date = None,
+                            user_data: Optional[dict] = None) -> ActivityStatistics:
+    """حساب إحصائيات الأنشطة (ضمن نطاق المستخدم)"""
+    today = today or date.today()
+    first_day, last_day = month_bounds(today)
+    activity_filter = _row_filter(user_data, Resource.ACTIVITIES)
+
+    if activity_filter is None:
+        status_counts = tuple(activity_status_counts(session))
+        participants = select(func.count(ActivityBeneficiary.id))
+    else:
+        status_counts = tuple(
+            (status.value, count)
+            for status, count in session.execute(
+                select(Activity.status, func.count(Activity.id))
+                .where(activity_filter, Activity.status.isnot(None))
+                .group_by(Activity.status)
+            ).all()
+        )
+        participants = select(func.count(ActivityBeneficiary.id)).where(
+            ActivityBeneficiary.activity_id.in_(select(Activity.id).where(activity_filter))
+        )
+
+    total_participants = session.execute(participants).scalar() or 0
+
+    monthly_rows = session.execute(
+        _where(
+            select(Activity.title, Activity.start_date, Activity.status, Activity.location)
+            .where(Activity.start_date.between(first_day, last_day)),
+            activity_filter,
+        )
+    ).all()
+
+    return ActivityStatistics(
+        total_activities=sum(count for _, count in status_counts),
+        completed_activities=dict(status_counts).get(ActivityStatus.COMPLETED.value, 0),
+        total_participants=total_participants,
+        status_counts=status_counts,
+        monthly_activities=tuple(_recent_activity(row) for row in monthly_rows),
+    )
+
+
+# ============== إحصائيات التبرعات ==============
+
+@dataclass(frozen=True)
+class RecentDonation:
+    """تبرع حديث"""
+    donation_date: Optional[date]
+    donor_name: Optional[str]
+    donation_type: str
+    amount: float
+    status: Optional[str]
+
+
+@dataclass(frozen=True)
+class DonationStatistics:
+    """لقطة لإحصائيات التبرعات"""
+    total_amount: float = 0.0
+    donations_count: int = 0
+    active_donors: int = 0
+    type_breakdown: Tuple[Tuple[str, int, float], ...] = ()  # (النوع، العدد، الإجمالي)
+    recent_donations: Tuple[RecentDonation, ...] = ()
+    top_donors: Tuple[Tuple[str, float, int], ...] = ()  # (الاسم، الإجمالي، العدد)
+    
+    # التبرعات المحصلة في الشهر والأسبوع الحاليين
+    month_count: int = 0
+    month_amount: float = 0.0
+    week_count: int = 0
+    week_amount: float = 0.0
+    generated_at: datetime = field(default_factory=datetime.now)
+
+
+def _scoped_donation_type_breakdown(session, donation_filter, collected_statuses):
+    """مثل donation_type_breakdown لكن من جدول التبرعات مقيداً بالنطاق"""
+    amount = func.coalesce(Donation.amount, 0)
+    collected = Donation.status.in_(collected_statuses)
+    return session.execute(
+        select(
+            Donation.donation_type,
+            func.count(Donation.id),
+            func.sum(amount),
+            func.sum(case((collected, amount), else_=0)),
+        )
+        .where(donation_filter)
+        .group_by(Donation.donation_type)
+    ).all()
+
+
+def _scoped_donation_totals(session, donation_filter, start: date, end: date, statuses):
+    """مثل donation_totals لكن من جدول التبرعات مقيداً بالنطاق"""
+    count, amount = session.execute(
+        select(func.count(Donation.id), func.coalesce(func.sum(Donation.amount), 0))
+        .where(donation_filter, Donation.donation_date.between(start, end),
+               Donation.status.in_(statuses))
+    ).one()
+    return int(count), float(amount)
+
+
+def get_donation_statistics(session, today: date = None, recent_limit: int = 10,
+                            top_limit: int = 5, user_data: Optional[dict] = None) -> DonationStatistics:
+    """حساب إحصائيات التبرعات (ضمن نطاق المستخدم)"""
+    today = today or date.today()
+    collected = (DonationStatus.RECEIVED, DonationStatus.VERIFIED)
+    donation_filter = _row_filter(user_data, Resource.DONATIONS)
+
+    if donation_filter is None:
+        # التوزيع حسب النوع والأرقام الشهرية/الأسبوعية من جدول التجميع اليومي
+        type_rows = donation_type_breakdown(session, collected)
+        month_count, month_amount = donation_totals(session, *month_bounds(today), statuses=collected)
+        week_count, week_amount = donation_totals(session, *week_bounds(today), statuses=collected)
+    else:
+        # جدول التجميع لا يعرف منشئ التبرع، فالنطاق الضيق يُحسب مباشرة
+        type_rows = _scoped_donation_type_breakdown(session, donation_filter, collected)
+        month_count, month_amount = _scoped_donation_totals(
+            session, donation_filter, *month_bounds(today), collected)
+        week_count, week_amount = _scoped_donation_totals(
+            session, donation_filter, *week_bounds(today), collected)
+
+    active_donors = session.execute(
+        _where(
+            select(func.count(Donor.id)).where(Donor.status == 'active'),
+            _row_filter(user_data, Resource.DONORS),
+        )
+    ).scalar() or 0
+
+    recent_rows = session.execute(
+        _where(
+            select(
+                Donation.donation_date, Donor.full_name, Donation.donation_type,
+                Donation.amount, Donation.status
+            )
+            .outerjoin(Donor, Donation.donor_id == Donor.id),
+            donation_filter,
+        )
+        .order_by(Donation.donation_date.desc())
+        .limit(recent_limit)
+    ).all()
+
+    top_rows = session.execute(
+        _where(
+            select(
+                Donor.full_name, Donor.company_name,
+                func.sum(Donation.amount), func.count(Donation.id)
+            )
+            .join(Donation, Donation.donor_id == Donor.id),
+            donation_filter,
+        )
+        .group_by(Donor.id)
+        .order_by(func.sum(Donation.amount).desc())
+        .limit(top_limit)
+    ).all()
+
+    return DonationStatistics(
+        total_amount=float(sum(row[3] or 0 for row in type_rows)),
+        donations_count=int(sum(row[1] for row in type_rows)),
+        active_donors=active_donors,
+        type_breakdown=tuple(
+            (row[0], int(row[1]), float(row[2] or 0)) for row in type_rows
+        ),
+        recent_donations=tuple(
+            RecentDonation(
+                donation_date=row.donation_date,
+                donor_name=row.full_name,
+                donation_type=row.donation_type,
+                amount=float(row.amount or 0),
+                status=row.status.value if row.status is not None else None,
+            )
+            for row in recent_rows
+        ),
+        top_donors=tuple(
+            (row[0] or row[1], float(row[2] or 0), row[3]) for row in top_rows
+        ),
+        month_count=month_count,
+        month_amount=month_amount,
+        week_count=week_count,
+        week_amount=week_amount,
+    )
+
+
+# ============== الوصول عبر الذاكرة المؤقتة ==============
+
+def _compute_with_session(compute, **kwargs):
+    """تنفيذ دالة إحصائية داخل جلسة قراءة مستقلة (كل الاستعلامات من لقطة واحدة)"""
+    from database.session import read_session_scope
+
+    with read_session_scope(snapshot=True) as session:
+        return compute(session, **kwargs)
+
+
+def _scope_key(user_data: Optional[dict], resources) -> Optional[tuple]:
+    """مفتاح الذاكرة المؤقتة لنطاق المستخدم على الموارد
+
+    من يرى الكل يشترك في عنصر واحد (None)؛ غيره يُخزن بنطاقه وقسمه أو رقمه.
+    """
+    if user_data is None:
+        return None
+    scopes = tuple(row_scope(user_data, resource) for resource in resources)
+    if all(scope == "all" for scope in scopes):
+        return None
+    return (
+        scopes,
+        user_data.get("department") if "department" in scopes else None,
+        user_data.get("user_id") if "own" in scopes else None,
+    )
+
+
+def _cache_options(user_data: Optional[dict], tables, resources) -> dict:
+    """مفتاح النطاق والجداول المعتمد عليها لعنصر الذاكرة المؤقتة"""
+    scope = _scope_key(user_data, resources)
+    # اللقطة المقيدة تعتمد أيضاً على أقسام المستخدمين (نطاق department)
+    depends_on = tables if scope is None else tables + ('users',)
+    return {"depends_on": depends_on, "scope": scope}
+
+
+def load_dashboard_snapshot(user_data: Optional[dict] = None) -> DashboardSnapshot:
+    """لقطة لوحة التحكم من الذاكرة المؤقتة أو من قاعدة البيانات"""
+    return stats_cache.get_or_compute(
+        "dashboard",
+        lambda: _compute_with_session(get_dashboard_snapshot, user_data=user_data),
+        **_cache_options(user_data, DASHBOARD_TABLES, _DASHBOARD_RESOURCES),
+    )
+
+
+def load_activity_statistics(user_data: Optional[dict] = None) -> ActivityStatistics:
+    """إحصائيات الأنشطة من الذاكرة المؤقتة أو من قاعدة البيانات"""
+    return stats_cache.get_or_compute(
+        "activity_statistics",
+        lambda: _compute_with_session(get_activity_statistics, user_data=user_data),
+        **_cache_options(user_data, ACTIVITY_STATISTICS_TABLES, (Resource.ACTIVITIES,)),
+    )
+
+
+def load_donation_statistics(user_data: Optional[dict] = None) -> DonationStatistics:
+    """إحصائيات التبرعات من الذاكرة المؤقتة أو من قاعدة البيانات"""
+    return stats_cache.get_or_compute(
+        "donation_statistics",
+        lambda: _compute_with_session(get_donation_statistics, user_data=user_data),
+        **_cache_options(user_data, DONATION_STATISTICS_TABLES, (Resource.DONATIONS, Resource.DONORS)),
+    )
@@ -0,0 +1,792 @@
+# generate_test_data.py
+"""
+مولد بيانات تجريبية بأحجام الإنتاج (لإعادة إنتاج مشاكل الأداء محلياً)
+
+الاستخدام:
+    python generate_test_data.py                        # الحجم small والبذرة 42
+    python generate_test_data.py --scale large
+    python generate_test_data.py --scale medium --factor 2.5 --seed 7
+    python generate_test_data.py --list                 # عرض الأحجام المتاحة
+
+- حتمي: نفس البذرة والحجم وتاريخ النهاية (--end) تعطي نفس البيانات على قاعدة فارغة
+  (لكل جدول مولد عشوائي مستقل، فتغيير عدد جدول لا يغير بيانات الجداول الأخرى)
+- الإدخال جماعي عبر Core (executemany) على دفعات، كل دفعة في معاملة مستقلة،
+  وبملف الاتصال bulk_load افتراضياً
+- توزيعات منحرفة كما في الإنتاج: قلة من المتبرعين تقدم أغلب التبرعات (Zipf)،
+  المبالغ log-normal، أغلب البيانات يدخلها عدد قليل من الموظفين، والتواريخ
+  تزداد كثافتها كلما اقتربت من تاريخ النهاية
+- أرقام التبرعات والإيصالات تُحجز من جدول العدادات داخل معاملة كل دفعة
+  (بدون فجوات)، فتستمر الواجهة في الترقيم بعد البيانات المولدة
+- بعد الإدخال: إعادة بناء التجميع اليومي وتواريخ المتبرعين ثم ANALYZE
+  (فهارس البحث تحدثها triggers أثناء الإدخال)
+- المعرفات تبدأ بعد أكبر معرف موجود، فيمكن التشغيل على قاعدة بها بيانات
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import func, insert, select
+
+from database.session import db_manager, session_scope
+from database.models import (
+    User, UserLog, SystemLog, Notification,
+    Family, Beneficiary,
+    ActivityCategory, ActivityType, CustomField, Activity,
+    ActivityBeneficiary, FieldValue,
+    Donor, Donation, DonationItem, DonationAllocation,
+    ActivityStatus, DonationStatus, UserRole
+)
+from database.migrations import run_analyze
+from database.rollups import rebuild_rollups
+from database.search import rebuild_search_indexes
+from database.sequences import DONATION_PREFIX, RECEIPT_PREFIX, allocate, format_number
+
+# ============== الأحجام ==============
+
+# عدد الصفوف الأساسية لكل حجم؛ بقية الجداول مشتقة منها
+# (المستفيدون ~4.5 لكل أسرة، الأصناف للتبرعات العينية، المشاركون لكل نشاط ...)
+SCALES = {
+    "tiny":   {"users": 5,   "families": 200,     "donors": 300,       "donations": 2_000,
+               "activities": 50,      "user_logs": 2_000,      "system_logs": 200,     "notifications": 500},
+    "small":  {"users": 20,  "families": 2_000,   "donors": 5_000,     "donations": 50_000,
+               "activities": 500,     "user_logs": 50_000,     "system_logs": 5_000,   "notifications": 10_000},
+    "medium": {"users": 50,  "families": 20_000,  "donors": 50_000,    "donations": 500_000,
+               "activities": 5_000,   "user_logs": 500_000,    "system_logs": 50_000,  "notifications": 100_000},
+    "large":  {"users": 200, "families": 100_000, "donors": 250_000,   "donations": 2_000_000,
+               "activities": 20_000,  "user_logs": 2_000_000,  "system_logs": 200_000, "notifications": 500_000},
+    "xlarge": {"users": 500, "families": 300_000, "donors": 1_000_000, "donations": 10_000_000,
+               "activities": 100_000, "user_logs": 10_000_000, "system_logs": 500_000, "notifications": 2_000_000},
+}
+
+DEFAULT_BATCH_SIZE = 10_000
+
+# ============== القوائم ==============
+
+MALE_NAMES = [
+    "محمد", "أحمد", "محمود", "مصطفى", "علي", "حسن", "حسين", "إبراهيم", "يوسف", "عمر",
+    "خالد", "عبدالله", "عبدالرحمن", "سيد", "طارق", "ياسر", "هشام", "وليد", "كريم", "أيمن",
+    "سامي", "عادل", "جمال", "صلاح", "رضا", "عماد", "شريف", "أشرف", "مجدي", "نبيل",
+    "سعيد", "فتحي", "رمضان", "عبدالعزيز", "إسماعيل", "زياد", "حمزة", "آدم", "مالك", "سليم",
+]
+
+FEMALE_NAMES = [
+    "فاطمة", "مريم", "عائشة", "زينب", "خديجة", "نور", "هدى", "سارة", "منى", "أمل",
+    "سعاد", "نادية", "هبة", "إيمان", "رحاب", "دعاء", "أسماء", "ياسمين", "شيماء", "سلمى",
+    "رانيا", "نجلاء", "سمر", "آية", "حنان", "وفاء", "ليلى", "جميلة", "رقية", "ملك",
+]
+
+FAMILY_NAMES = [
+    "عبدالسلام", "الشافعي", "المصري", "حسانين", "عبدالحميد", "الجمال", "البنا", "النجار",
+    "الشربيني", "السيد", "عبدالفتاح", "منصور", "سليمان", "الخولي", "عثمان", "عبدالمنعم",
+    "القاضي", "بدوي", "الحداد", "رزق", "شاهين", "عيسى", "مرسي", "يونس", "زكي",
+    "الفقي", "عبدالرازق", "العطار", "غنيم", "حجازي", "سالم", "درويش", "الصياد", "هيكل",
+]
+
+# المدن بأوزانها (أغلب الحالات في المدن الكبرى)
+CITIES = {
+    "القاهرة": ("القاهرة", 30), "الجيزة": ("الجيزة", 18), "الإسكندرية": ("الإسكندرية", 14),
+    "المنصورة": ("الدقهلية", 6), "طنطا": ("الغربية", 5), "الزقازيق": ("الشرقية", 5),
+    "أسيوط": ("أسيوط", 4), "سوهاج": ("سوهاج", 4), "المنيا": ("المنيا", 4),
+    "بني سويف": ("بني سويف", 3), "الفيوم": ("الفيوم", 3), "قنا": ("قنا", 2),
+    "أسوان": ("أسوان", 1), "دمياط": ("دمياط", 1),
+}
+
+STREETS = ["شارع النصر", "شارع الجمهورية", "شارع التحرير", "شارع الجلاء", "شارع السلام",
+           "شارع المدارس", "شارع المحطة", "شارع البحر", "حارة الشيخ", "عزبة النخل"]
+
+COMPANY_WORDS = ["مؤسسة", "شركة", "مجموعة", "مصنع", "مكتب"]
+COMPANY_NAMES = ["النور", "الأمل", "الخير", "الرحمة", "البركة", "الفجر", "الوفاء", "الإحسان",
+                 "الهدى", "المستقبل", "الصفا", "السلام", "الأندلس", "النيل", "الدلتا"]
+
+OCCUPATIONS = ["عامل", "موظف", "سائق", "حرفي", "مزارع", "بائع", "بدون عمل", "ربة منزل",
+               "طالب", "متقاعد", "مدرس", "محاسب", "مهندس", "طبيب", "تاجر"]
+
+EDUCATION_LEVELS = ["أمي", "يقرأ ويكتب", "ابتدائي", "إعدادي", "ثانوي", "دبلوم", "جامعي"]
+
+# فئات وأنواع الأنشطة (تُضاف فقط إذا لم يكن الكود موجوداً)
+ACTIVITY_CATALOG = [
+    ("مساعدات عينية", "In-Kind Assistance", "#FF6B6B", [
+        ("توزيع سلال غذائية", "FOOD01"), ("توزيع ملابس", "CLOTH01"), ("توزيع لحوم الأضاحي", "MEAT01")]),
+    ("مساعدات مالية", "Financial Assistance", "#4ECDC4", [
+        ("مساعدات مالية شهرية", "FIN01"), ("مساعدات طارئة", "EMERG01"), ("كفالة يتيم", "ORPHAN01")]),
+    ("أنشطة ثقافية", "Cultural Activities", "#45B7D1", [
+        ("رحلات ترفيهية", "TRIP01"), ("حفلات أعياد", "PARTY01")]),
+    ("أنشطة تعليمية", "Educational Activities", "#96CEB4", [
+        ("دورات تقوية", "EDU01"), ("ورش عمل", "WORKSHOP01"), ("محو أمية", "LITERACY01")]),
+    ("أنشطة صحية", "Health Activities", "#FFEAA7", [
+        ("كشف طبي مجاني", "MED01"), ("توعية صحية", "HEALTH01"), ("قوافل طبية", "CARAVAN01")]),
+]
+
+# الحقول المخصصة لكل نوع نشاط: (الاسم، النوع، التسمية، الخيارات)
+FIELD_TEMPLATES = [
+    ("target_count", "number", "العدد المستهدف", None),
+    ("supervisor_notes", "text", "ملاحظات المشرف", None),
+    ("follow_up_date", "date", "تاريخ المتابعة", None),
+    ("needs_transport", "boolean", "يحتاج نقل", None),
+    ("funding_source", "select", "مصدر التمويل", ["ذاتي", "تبرعات", "زكاة", "منحة"]),
+]
+
+# أصناف التبرعات العينية: (الاسم، الفئة، الوحدة، أقل سعر، أعلى سعر)
+DONATION_ITEMS = [
+    ("أرز", "مواد غذائية", "كيلو", 25, 40), ("سكر", "مواد غذائية", "كيلو", 30, 45),
+    ("زيت", "مواد غذائية", "لتر", 60, 90), ("مكرونة", "مواد غذائية", "كيس", 15, 25),
+    ("سلة غذائية", "مواد غذائية", "سلة", 300, 600), ("لحوم", "مواد غذائية", "كيلو", 350, 450),
+    ("بطاطين", "ملابس وأغطية", "قطعة", 250, 600), ("ملابس أطفال", "ملابس وأغطية", "قطعة", 100, 300),
+    ("أدوات مدرسية", "تعليم", "حقيبة", 150, 400), ("أدوية", "صحة", "علبة", 40, 250),
+    ("كرسي متحرك", "صحة", "قطعة", 2500, 6000), ("ثلاجة", "أجهزة", "قطعة", 9000, 18000),
+]
+
+USER_ACTIONS = {"login": 35, "logout": 20, "view": 20, "create": 12, "update": 10, "delete": 2, "export": 1}
+MODULES = ["beneficiaries", "activities", "donations", "reports", "families", "dashboard"]
+
+
+# ============== أدوات التوزيع ==============
+
+class SkewedPicker:
+    """اختيار معرفات بتوزيع Zipf: القليل منها يتكرر كثيراً والأغلب نادراً
+
+    المعرفات تُخلط أولاً حتى لا تكون الأكثر تكراراً هي الأقدم دائماً
+    """
+
+    def __init__(self, ids, rng: random.Random, exponent: float = 1.0):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.rng = rng
+        self.cum_weights = []
+        total = 0.0
+        for rank in range(1, len(self.ids) + 1):
+            total += 1.0 / rank ** exponent
+            self.cum_weights.append(total)
+
+    def pick(self, k: int = 1) -> List[int]:
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+    def one(self) -> int:
+        return self.pick()[0]
+
+
+def _weighted(rng: random.Random, weights: Dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _money(value: float) -> Decimal:
+    return Decimal(f"{value:.2f}")
+
+
+def _phone(rng: random.Random) -> str:
+    return f"01{rng.choice('0125')}{rng.randrange(10**8):08d}"
+
+
+def _recent_day(rng: random.Random, end: date, span_days: int) -> date:
+    """تاريخ في الفترة [end - span, end] تزداد كثافته قرب النهاية"""
+    return end - timedelta(days=int(span_days - rng.triangular(0, span_days, span_days)))
+
+
+def _at(rng: random.Random, day: date) -> datetime:
+    """وقت عشوائي خلال ساعات العمل في اليوم"""
+    return datetime.combine(day, datetime.min.time()) + timedelta(
+        hours=rng.randint(8, 20), minutes=rng.randint(0, 59), seconds=rng.randint(0, 59)
+    )
+
+
+# ============== المولد ==============
+
+class TestDataGenerator:
+    """توليد البيانات جدولاً بعد جدول وإدخالها على دفعات"""
+
+    def __init__(self, engine, counts: Dict[str, int], seed: int = 42,
+                 end: date = None, years: int = 3, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.engine = engine
+        self.counts = counts
+        self.seed = seed
+        self.end = end or date.today()
+        self.span_days = years * 365
+        self.batch_size = batch_size
+        self.inserted: Dict[str, int] = {}
+
+        # المعرفات المولدة في هذا التشغيل (نطاقات متصلة)
+        self.user_ids: range = range(0)
+        self.family_ids: range = range(0)
+        self.beneficiary_ids: range = range(0)
+        self.donor_ids: range = range(0)
+        self.activity_ids: range = range(0)
+        self.type_ids: List[int] = []
+        self.fields_by_type: Dict[int, list] = {}
+
+    def _rng(self, name: str) -> random.Random:
+        """مولد مستقل لكل جدول (البذرة + اسم الجدول)"""
+        return random.Random(f"{self.seed}:{name}")
+
+    def _next_id(self, model) -> int:
+        with self.engine.connect() as connection:
+            return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def _write(self, rows_by_model: Dict, before=None):
+        """إدخال دفعة (جدول أو أكثر) في معاملة واحدة
+
+        before: دالة تستقبل الاتصال وتُنفذ أولاً داخل نفس المعاملة
+        """
+        with self.engine.begin() as connection:
+            if before:
+                before(connection)
+            for model, rows in rows_by_model.items():
+                if rows:
+                    connection.execute(insert(model.__table__), rows)
+                    name = model.__tablename__
+                    self.inserted[name] = self.inserted.get(name, 0) + len(rows)
+
+    def _step(self, title: str, work, *tables: str):
+        started = time.perf_counter()
+        before = sum(self.inserted.get(table, 0) for table in tables)
+        work()
+        elapsed = time.perf_counter() - started
+        rows = sum(self.inserted.get(table, 0) for table in tables) - before
+        rate = rows / elapsed if elapsed else 0
+        print(f"✅ {title}: {rows:,} صف في {elapsed:.1f} ثانية ({rate:,.0f} صف/ثانية)")
+
+    def run(self) -> Dict[str, int]:
+        """توليد كل الجداول بالترتيب (الجداول المرجعية أولاً)"""
+        self._step("المستخدمون", self.generate_users, "users")
+        self._step("فئات وأنواع الأنشطة والحقول المخصصة", self.generate_catalog,
+                   "activity_categories", "activity_types", "custom_fields")
+        self._step("الأسر والمستفيدون", self.generate_families, "families", "beneficiaries")
+        self._step("المتبرعون", self.generate_donors, "donors")
+        self._step("الأنشطة والمشاركون وقيم الحقول", self.generate_activities,
+                   "activities", "activity_beneficiaries", "field_values")
+        self._step("التبرعات والأصناف والتخصيصات", self.generate_donations,
+                   "donations", "donation_items", "donation_allocations")
+        self._step("سجلات المستخدمين والنظام", self.generate_logs, "user_logs", "system_logs")
+        self._step("الإشعارات", self.generate_notifications, "notifications")
+        return self.inserted
+
+    # ---------- المستخدمون ----------
+
+    def generate_users(self):
+        rng = self._rng("users")
+        first = self._next_id(User)
+        roles = {UserRole.ADMIN: 2, UserRole.SUPERVISOR: 10, UserRole.EMPLOYEE: 70, UserRole.VIEWER: 18}
+        departments = ["الإدارة", "الإشراف", "المتابعة", "الحسابات", "الأنشطة", "التبرعات"]
+
+        rows = []
+        for user_id in range(first, first + self.counts["users"]):
+            gender_names = MALE_NAMES if rng.random() < 0.6 else FEMALE_NAMES
+            joined = _recent_day(rng, self.end, self.span_days)
+            rows.append({
+                "id": user_id,
+                "username": f"emp{user_id:05d}",
+                "email": f"emp{user_id:05d}@charity.org",
+                "password_hash": "test123",  # نفس نظام كلمات المرور الحالي (نص عادي)
+                "full_name": f"{rng.choice(gender_names)} {rng.choice(MALE_NAMES)} {rng.choice(FAMILY_NAMES)}",
+                "phone": _phone(rng),
+                "role": _weighted(rng, roles).value,
+                "status": "active" if rng.random() < 0.92 else "inactive",
+                "department": rng.choice(departments),
+                "position": "موظف",
+                "employee_id": f"EMP-{user_id:05d}",
+                "last_login": _at(rng, self.end - timedelta(days=rng.randint(0, 30))),
+                "created_at": _at(rng, joined),
+            })
+        self._write({User: rows})
+        self.user_ids = range(first, first + len(rows))
+        # أغلب الإدخال يقوم به عدد قليل من الموظفين
+        self.staff = SkewedPicker(self.user_ids, self._rng("staff"), exponent=1.1)
+
+    # ---------- الأنشطة: الفئات والأنواع والحقول ----------
+
+    def generate_catalog(self):
+        with self.engine.connect() as connection:
+            categories = dict(connection.execute(select(ActivityCategory.name, ActivityCategory.id)).all())
+            type_codes = dict(connection.execute(select(ActivityType.code, ActivityType.id)).all())
+            typed_fields = set(connection.execute(select(CustomField.activity_type_id)).scalars())
+
+        new_categories = [
+            {"name": name, "name_en": name_en, "color": color, "is_active": True, "sort_order": order}
+            for order, (name, name_en, color, _) in enumerate(ACTIVITY_CATALOG)
+            if name not in categories
+        ]
+        self._write({ActivityCategory: new_categories})
+
+        with self.engine.connect() as connection:
+            categories = dict(connection.execute(select(ActivityCategory.name, ActivityCategory.id)).all())
+        new_types = [
+            {"name": type_name, "code": code, "category_id": categories[name], "is_active": True}
+            for name, _, _, types in ACTIVITY_CATALOG
+            for type_name, code in types
+            if code not in type_codes
+        ]
+        self._write({ActivityType: new_types})
+
+        with self.engine.connect() as connection:
+            self.type_ids = list(connection.execute(select(ActivityType.id).order_by(ActivityType.id)).scalars())
+        new_fields = [
+            {"activity_type_id": type_id, "field_name": field_name, "field_type": field_type,
+             "field_label_ar": label, "options": options, "sort_order": order}
+            for type_id in self.type_ids if type_id not in typed_fields
+            for order, (field_name, field_type, label, options) in enumerate(FIELD_TEMPLATES)
+        ]
+        self._write({CustomField: new_fields})
+
+        with self.engine.connect() as connection:
+            for field in connection.execute(select(
+                CustomField.id, CustomField.activity_type_id, CustomField.field_type, CustomField.options
+            )):
+                self.fields_by_type.setdefault(field.activity_type_id, []).append(field)
+
+    # ---------- الأسر والمستفيدون ----------
+
+    def _person(self, rng, gender, father_name, grandfather_name, family_name, birth_date, person_id):
+        first_name = rng.choice(MALE_NAMES if gender == "M" else FEMALE_NAMES)
+        century = "2" if birth_date.year < 2000 else "3"
+        return {
+            "id": person_id,
+            # 14 رقماً: القرن + تاريخ الميلاد + رقم متسلسل (فريد لكل معرف)
+            "national_id": f"{century}{birth_date:%y%m%d}{person_id % 10**7:07d}",
+            "first_name": first_name,
+            "father_name": father_name,
+            "grandfather_name": grandfather_name,
+            "family_name": family_name,
+            "full_name_ar": " ".join((first_name, father_name, grandfather_name, family_name)),
+            "gender": gender,
+            "birth_date": birth_date,
+        }
+
+    def generate_families(self):
+        rng = self._rng("families")
+        cities = list(CITIES)
+        city_weights = [weight for _, weight in CITIES.values()]
+        statuses = {"فقيرة": 55, "فقيرة جداً": 25, "متوسطة": 18, "ميسورة": 2}
+        housing = {"إيجار": 55, "ملك": 30, "مشاركة": 15}
+        ben_status = {"active": 88, "inactive": 8, "suspended": 3, "deceased": 1}
+
+        family_id = first_family = self._next_id(Family)
+        person_id = first_person = self._next_id(Beneficiary)
+        last_family = first_family + self.counts["families"]
+
+        while family_id < last_family:
+            families, members = [], []
+            for family_id in range(family_id, min(family_id + self.batch_size, last_family)):
+                city = rng.choices(cities, weights=city_weights)[0]
+                region = CITIES[city][0]
+                surname = rng.choice(FAMILY_NAMES)
+                registered = _recent_day(rng, self.end, self.span_days)
+                address = f"{rng.randint(1, 200)} {rng.choice(STREETS)}، {city}"
+                phone = _phone(rng)
+                size = min(1 + int(rng.expovariate(1 / 3.5)), 12)  # أغلب الأسر 2-6 أفراد
+                income = rng.lognormvariate(7.6, 0.5)
+
+                families.append({
+                    "id": family_id,
+                    "family_code": f"FAM-{family_id:07d}",
+                    "family_name": f"أسرة {surname}",
+                    "address": address,
+                    "city": city,
+                    "region": region,
+                    "phone": phone,
+                    "family_status": _weighted(rng, statuses),
+                    "housing_type": _weighted(rng, housing),
+                    "rooms_count": rng.randint(1, 4),
+                    "dependents_count": size - 1,
+                    "total_monthly_income": _money(income),
+                    "income_source": rng.choice(["عمل يومي", "معاش", "راتب", "بدون دخل", "معاش تكافل وكرامة"]),
+                    "registration_date": registered,
+                    "created_by": self.staff.one(),
+                    "created_at": _at(rng, registered),
+                })
+
+                # رب الأسرة ثم الزوجة ثم الأبناء (الأبناء يحملون اسم الأب والجد)
+                head_gender = "M" if rng.random() < 0.75 else "F"
+                head_birth = self.end - timedelta(days=rng.randint(25 * 365, 70 * 365))
+                father, grandfather = rng.choice(MALE_NAMES), rng.choice(MALE_NAMES)
+                head = self._person(rng, head_gender, father, grandfather, surname, head_birth, person_id)
+                people = [(head, True)]
+                if size > 1 and head_gender == "M":
+                    spouse_birth = head_birth + timedelta(days=rng.randint(0, 10 * 365))
+                    people.append((self._person(
+                        rng, "F", rng.choice(MALE_NAMES), rng.choice(MALE_NAMES),
+                        rng.choice(FAMILY_NAMES), spouse_birth, person_id + 1), False))
+                for _ in range(size - len(people)):
+                    birth = self.end - timedelta(days=rng.randint(0, 22 * 365))
+                    child_id = person_id + len(people)
+                    people.append((self._person(
+                        rng, rng.choice("MF"), head["first_name"], father, surname, birth, child_id), False))
+
+                for person, is_head in people:
+                    adult = (self.end - person["birth_date"]).days > 18 * 365
+                    person.update({
+                        "family_id": family_id,
+                        "is_family_head": is_head,
+                        "marital_status": (rng.choice(["married", "widowed", "divorced"]) if is_head
+                                           else "married" if adult and rng.random() < 0.6 else "single"),
+                        "children_count": size - 2 if is_head and size > 2 else 0,
+                        "education_level": rng.choice(EDUCATION_LEVELS),
+                        "occupation": rng.choice(OCCUPATIONS) if adult else "طالب",
+                        "monthly_income": _money(income) if is_head else None,
+                        "health_status": "جيدة" if rng.random() < 0.8 else rng.choice(["مرض مزمن", "إعاقة", "كبار سن"]),
+                        "has_disabilities": rng.random() < 0.05,
+                        "phone": phone if is_head else None,
+                        "address": address,
+                        "city": city,
+                        "region": region,
+                        "status": _weighted(rng, ben_status),
+                        "registration_date": registered,
+                        "last_visit_date": _recent_day(rng, self.end, 365) if rng.random() < 0.6 else None,
+                        "created_at": _at(rng, registered),
+                    })
+                    members.append(person)
+                person_id += len(people)
+
+            self._write({Family: families, Beneficiary: members})
+            family_id += 1
+
+        self.family_ids = range(first_family, last_family)
+        self.beneficiary_ids = range(first_person, person_id)
+
+    # ---------- المتبرعون ----------
+
+    def generate_donors(self):
+        rng = self._rng("donors")
+        types = {"individual": 85, "company": 10, "organization": 5}
+        first = donor_id = self._next_id(Donor)
+        last = first + self.counts["donors"]
+
+        while donor_id < last:
+            rows = []
+            for donor_id in range(donor_id, min(donor_id + self.batch_size, last)):
+                donor_type = _weighted(rng, types)
+                contact = f"{rng.choice(MALE_NAMES)} {rng.choice(MALE_NAMES)} {rng.choice(FAMILY_NAMES)}"
+                company = (f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_NAMES)} {rng.choice(FAMILY_NAMES)}"
+                           if donor_type != "individual" else None)
+                birth = self.end - timedelta(days=rng.randint(22 * 365, 75 * 365))
+                rows.append({
+                    "id": donor_id,
+                    "donor_type": donor_type,
+                    "donor_code": f"DNR-{donor_id:07d}",
+                    "full_name": company or contact,
+                    "national_id": (f"{'2' if birth.year < 2000 else '3'}{birth:%y%m%d}{donor_id % 10**7:07d}"
+                                    if donor_type == "individual" and rng.random() < 0.7 else None),
+                    "company_name": company,
+                    "commercial_registration": f"{rng.randrange(10**6):06d}" if company else None,
+                    "phone": _phone(rng),
+                    "email": f"donor{donor_id}@example.com" if rng.random() < 0.4 else None,
+                    "city": rng.choices(list(CITIES), weights=[w for _, w in CITIES.values()])[0],
+                    "occupation": rng.choice(OCCUPATIONS) if not company else None,
+                    "contact_preference": rng.choice(["phone", "phone", "email"]),
+                    "status": "active" if rng.random() < 0.95 else "inactive",
+                    "created_at": _at(rng, _recent_day(rng, self.end, self.span_days)),
+                })
+            self._write({Donor: rows})
+            donor_id += 1
+
+        self.donor_ids = range(first, last)
+
+    # ---------- الأنشطة ----------
+
+    def _field_value(self, rng, field, activity_id, start):
+        value = {"activity_id": activity_id, "custom_field_id": field.id, "text_value": None,
+                 "number_value": None, "date_value": None, "boolean_value": None}
+        if field.field_type == "number":
+            value["number_value"] = _money(rng.randint(10, 500))
+        elif field.field_type == "date":
+            value["date_value"] = start + timedelta(days=rng.randint(7, 60))
+        elif field.field_type == "boolean":
+            value["boolean_value"] = rng.random() < 0.3
+        elif field.field_type == "select" and field.options:
+            value["text_value"] = rng.choice(field.options)
+        else:
+            value["text_value"] = rng.choice(["تم التنفيذ حسب الخطة", "يحتاج متابعة", "إقبال كبير", "تأخر التوريد"])
+        return value
+
+    def generate_activities(self):
+        rng = self._rng("activities")
+        types = SkewedPicker(self.type_ids, self._rng("activity_types"), exponent=0.8)
+        # بعض المستفيدين يشاركون في أنشطة كثيرة
+        participants = SkewedPicker(self.beneficiary_ids, self._rng("participants"), exponent=0.7)
+        roles = {"مستفيد رئيسي": 60, "مشارك": 30, "متطوع": 7, "منظم": 3}
+        first = activity_id = self._next_id(Activity)
+        last = first + self.counts["activities"]
+
+        while activity_id < last:
+            activities, members, values = [], [], []
+            for activity_id in range(activity_id, min(activity_id + self.batch_size, last)):
+                type_id = types.one()
+                # حتى 90 يوماً في المستقبل للأنشطة المخطط لها
+                start = _recent_day(rng, self.end + timedelta(days=90), self.span_days + 90)
+                duration = rng.choice([1, 1, 1, 2, 3, 7, 30])
+                if start > self.end:
+                    status = ActivityStatus.PLANNED
+                elif start + timedelta(days=duration) > self.end:
+                    status = ActivityStatus.IN_PROGRESS
+                else:
+                    status = ActivityStatus.COMPLETED if rng.random() < 0.92 else ActivityStatus.CANCELLED
+                estimated = rng.lognormvariate(9, 1.1)
+                city = rng.choices(list(CITIES), weights=[w for _, w in CITIES.values()])[0]
+
+                activities.append({
+                    "id": activity_id,
+                    "activity_type_id": type_id,
+                    "title": f"نشاط {activity_id} - {city}",
+                    "description": "نشاط مولد للاختبار",
+                    "start_date": start,
+                    "end_date": start + timedelta(days=duration),
+                    "duration_days": duration,
+                    "location": f"مقر الجمعية - {city}",
+                    "city": city,
+                    "region": CITIES[city][0],
+                    "estimated_cost": _money(estimated),
+                    "actual_cost": (_money(estimated * rng.uniform(0.7, 1.3))
+                                    if status == ActivityStatus.COMPLETED else None),
+                    "currency": "EGP",
+                    "status": status,
+                    "priority": rng.choice(["low", "medium", "medium", "high", "urgent"]),
+                    "responsible_person": f"{rng.choice(MALE_NAMES)} {rng.choice(FAMILY_NAMES)}",
+                    "created_by": self.staff.one(),
+                    "created_at": _at(rng, min(start, self.end)),
+                })
+
+                if self.beneficiary_ids and status != ActivityStatus.CANCELLED:
+                    count = min(int(rng.lognormvariate(2.5, 0.9)) + 1, 300)
+                    for beneficiary_id in set(participants.pick(count)):
+                        members.append({
+                            "activity_id": activity_id,
+                            "beneficiary_id": beneficiary_id,
+                            "role": _weighted(rng, roles),
+                            "start_date": start,
+                            "status": "completed" if status == ActivityStatus.COMPLETED else "active",
+                        })
+
+                for field in self.fields_by_type.get(type_id, ()):
+                    if rng.random() < 0.8:
+                        values.append(self._field_value(rng, field, activity_id, start))
+
+            self._write({Activity: activities, ActivityBeneficiary: members, FieldValue: values})
+            activity_id += 1
+
+        self.activity_ids = range(first, last)
+
+    # ---------- التبرعات ----------
+
+    def generate_donations(self):
+        rng = self._rng("donations")
+        # قلة من المتبرعين تقدم أغلب التبرعات
+        donors = SkewedPicker(self.donor_ids, self._rng("donation_donors"), exponent=1.05)
+        statuses = {DonationStatus.VERIFIED: 55, DonationStatus.RECEIVED: 25,
+                    DonationStatus.PENDING: 15, DonationStatus.CANCELLED: 5}
+        types = {"cash": 75, "in_kind": 20, "service": 5}
+        methods = {"cash": 50, "bank_transfer": 30, "check": 8, "mobile_wallet": 12}
+        first = donation_id = self._next_id(Donation)
+        last = first + self.counts["donations"]
+
+        while donation_id < last:
+            donations, items, allocations = [], [], []
+            for donation_id in range(donation_id, min(donation_id + self.batch_size, last)):
+                day = _recent_day(rng, self.end, self.span_days)
+                donation_type = _weighted(rng, types)
+                status = _weighted(rng, statuses)
+                collected = status in (DonationStatus.RECEIVED, DonationStatus.VERIFIED)
+
+                donation_items = []
+                if donation_type == "in_kind":
+                    for name, category, unit, low, high in rng.sample(DONATION_ITEMS, rng.randint(1, 4)):
+                        quantity = rng.randint(1, 50) if high < 1000 else 1
+                        unit_value = rng.uniform(low, high)
+                        donation_items.append({
+                            "donation_id": donation_id, "item_name": name, "category": category,
+                            "quantity": Decimal(quantity), "unit": unit, "unit_value": _money(unit_value),
+                            "total_value": _money(quantity * unit_value),
+                            "condition": "new" if rng.random() < 0.8 else "used_good",
+                        })
+                    amount = sum(item["total_value"] for item in donation_items)
+                else:
+                    amount = _money(round(rng.lognormvariate(6.3, 1.3), -1) or 10)
+                items.extend(donation_items)
+
+                donations.append({
+                    "id": donation_id,
+                    "donor_id": donors.one() if rng.random() < 0.93 else None,  # تبرعات مجهولة
+                    "donation_number": None,  # يُرقم عند الإدخال (_number_donations)
+                    "donation_type": donation_type,
+                    "donation_date": day,
+                    "receipt_date": day + timedelta(days=rng.randint(0, 3)) if collected else None,
+                    "amount": amount,
+                    "currency": "EGP" if rng.random() < 0.97 else "USD",
+                    "payment_method": _weighted(rng, methods) if donation_type == "cash" else None,
+                    "status": status,
+                    "purpose": rng.choice(["عام", "كفالة أيتام", "إطعام", "علاج", "تعليم", "زكاة المال"]),
+                    "is_zakat": rng.random() < 0.3,
+                    "is_sadaqah": rng.random() < 0.4,
+                    "receipt_number": None,
+                    "receipt_issued": collected,
+                    "created_by": self.staff.one(),
+                    "created_at": _at(rng, day),
+                })
+
+                if collected and self.beneficiary_ids and rng.random() < 0.35:
+                    targets = {rng.choice(self.beneficiary_ids) for _ in range(rng.randint(1, 3))}
+                    share = _money(float(amount) / len(targets))
+                    distributed = day < self.end - timedelta(days=14) and rng.random() < 0.8
+                    for beneficiary_id in targets:
+                        allocations.append({
+                            "donation_id": donation_id,
+                            "beneficiary_id": beneficiary_id,
+                            "activity_id": (rng.choice(self.activity_ids)
+                                            if self.activity_ids and rng.random() < 0.3 else None),
+                            "allocated_amount": share,
+                            "allocation_date": day,
+                            "status": "distributed" if distributed else "allocated",
+                            "distribution_date": day + timedelta(days=rng.randint(1, 14)) if distributed else None,
+                            "distributed_by": self.staff.one() if distributed else None,
+                            "purpose": donations[-1]["purpose"],
+                        })
+
+            self._write(
+                {Donation: donations, DonationItem: items, DonationAllocation: allocations},
+                before=lambda connection, rows=donations: self._number_donations(connection, rows),
+            )
+            donation_id += 1
+
+    @staticmethod
+    def _number_donations(connection, donations):
+        """حجز أرقام التبرعات والإيصالات للدفعة (عدد مرة واحدة لكل بادئة وسنة)"""
+        targets = {}
+        for row in donations:
+            year = row["donation_date"].year
+            targets.setdefault((DONATION_PREFIX, year), []).append((row, "donation_number"))
+            if row["receipt_issued"]:
+                targets.setdefault((RECEIPT_PREFIX, year), []).append((row, "receipt_number"))
+
+        for (prefix, year), rows in targets.items():
+            start, _ = allocate(connection, prefix, year, len(rows))
+            for offset, (row, column) in enumerate(rows):
+                row[column] = format_number(prefix, year, start + offset)
+
+    # ---------- السجلات والإشعارات ----------
+
+    def generate_logs(self):
+        rng = self._rng("user_logs")
+        last = self.counts["user_logs"]
+        for offset in range(0, last, self.batch_size):
+            rows = []
+            for _ in range(min(self.batch_size, last - offset)):
+                action = _weighted(rng, USER_ACTIONS)
+                module = rng.choice(MODULES)
+                rows.append({
+                    "user_id": self.staff.one(),
+                    "action": action,
+                    "module": module,
+                    "record_id": rng.randint(1, 10_000) if action in ("create", "update", "delete") else None,
+                    "description": f"{action} {module}",
+                    "ip_address": f"192.168.{rng.randint(0, 20)}.{rng.randint(1, 254)}",
+                    "created_at": _at(rng, _recent_day(rng, self.end, self.span_days)),
+                })
+            self._write({UserLog: rows})
+
+        rng = self._rng("system_logs")
+        levels = {"info": 80, "warning": 15, "error": 4, "critical": 1}
+        last = self.counts["system_logs"]
+        for offset in range(0, last, self.batch_size):
+            rows = []
+            for _ in range(min(self.batch_size, last - offset)):
+                level = _weighted(rng, levels)
+                rows.append({
+                    "user_id": self.staff.one() if rng.random() < 0.5 else None,
+                    "log_level": level,
+                    "log_type": rng.choice(["system", "backup", "security", "audit"]),
+                    "message": f"رسالة نظام ({level})",
+                    "created_at": _at(rng, _recent_day(rng, self.end, self.span_days)),
+                })
+            self._write({SystemLog: rows})
+
+    def generate_notifications(self):
+        rng = self._rng("notifications")
+        kinds = {"info": 50, "reminder": 35, "alert": 15}
+        last = self.counts["notifications"]
+        for offset in range(0, last, self.batch_size):
+            rows = []
+            for _ in range(min(self.batch_size, last - offset)):
+                created = _at(rng, _recent_day(rng, self.end, self.span_days))
+                age = (self.end - created.date()).days
+                # الإشعارات القديمة مقروءة غالباً
+                status = "read" if age > 14 and rng.random() < 0.9 else rng.choice(["pending", "sent", "read"])
+                rows.append({
+                    "user_id": self.staff.one(),
+                    "notification_type": _weighted(rng, kinds),
+                    "title": "تذكير بمتابعة" if status != "read" else "إشعار",
+                    "message": "إشعار مولد للاختبار",
+                    "related_table": rng.choice(["donations", "activities", "beneficiaries"]),
+                    "related_id": rng.randint(1, 10_000),
+                    "created_at": created,
+                    "sent_at": created if status != "pending" else None,
+                    "read_at": created + timedelta(hours=rng.randint(1, 72)) if status == "read" else None,
+                    "status": status,
+                    "priority": rng.choice(["low", "medium", "medium", "high"]),
+                })
+            self._write({Notification: rows})
+
+
+# ============== التشغيل ==============
+
+def scaled_counts(scale: str, factor: float = 1.0) -> Dict[str, int]:
+    """أعداد الصفوف لحجم معين مضروبة في factor (لا يقل المستخدمون عن 1)"""
+    if scale not in SCALES:
+        raise ValueError(f"حجم غير معروف: {scale} (المتاح: {', '.join(SCALES)})")
+    counts = {table: int(count * factor) for table, count in SCALES[scale].items()}
+    counts["users"] = max(counts["users"], 1)
+    return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="توليد بيانات تجريبية بأحجام الإنتاج")
+    parser.add_argument("--scale", default="small", choices=list(SCALES))
+    parser.add_argument("--factor", type=float, default=1.0, help="مضاعف لأعداد الحجم المختار")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(),
+                        help="تاريخ آخر يوم في البيانات (YYYY-MM-DD) - ثبته للحصول على نفس البيانات")
+    parser.add_argument("--years", type=int, default=3, help="عدد السنوات قبل تاريخ النهاية")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--profile", default="bulk_load", help="ملف اتصال قاعدة البيانات")
+    parser.add_argument("--list", action="store_true", help="عرض الأحجام المتاحة فقط")
+    return parser.parse_args()
+
+
+def main():
+    """توليد البيانات ثم إعادة بناء التجميع و ANALYZE"""
+    args = parse_args()
+
+    if args.list:
+        for name, counts in SCALES.items():
+            print(f"   {name}: " + "، ".join(f"{table} {count:,}" for table, count in counts.items()))
+        return
+
+    counts = scaled_counts(args.scale, args.factor)
+    print(f"🚀 توليد بيانات تجريبية (الحجم {args.scale} × {args.factor}، البذرة {args.seed})...")
+    started = time.perf_counter()
+
+    db_manager.configure(args.profile)
+    generator = TestDataGenerator(
+        db_manager.engine, counts, seed=args.seed, end=args.end,
+        years=args.years, batch_size=args.batch_size
+    )
+    inserted = generator.run()
+
+    print("🔄 إعادة بناء التجميع اليومي وتواريخ المتبرعين وفهارس البحث...")
+    with session_scope() as session:
+        rebuild_rollups(session)
+        rebuild_search_indexes(session)
+    run_analyze(db_manager.engine)
+
+    elapsed = time.perf_counter() - started
+    print(f"🎉 تم إدخال {sum(inserted.values()):,} صف في {elapsed:.1f} ثانية")
+    for table, count in inserted.items():
+        print(f"   - {table}: {count:,}")
+    print("🔑 كلمة مرور المستخدمين المولدين: test123")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# migrate.py
+"""
+تطبيق ترحيلات المخطط على قاعدة بيانات قائمة
+
+الاستخدام:
+    python migrate.py            # تطبيق الترحيلات المعلقة ثم ANALYZE
+    python migrate.py --status   # عرض الترحيلات المطبقة والمعلقة فقط
+    python migrate.py --analyze  # تشغيل ANALYZE فقط
+
+يعمل على محرك مستقل (db_manager.migration_engine) لأن db_manager.engine
+يطبق الترحيلات المعلقة تلقائياً عند أول استخدام.
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from database.session import db_manager
+from database.migrations import MIGRATIONS, pending_migrations, run_analyze
+
+def show_status(engine):
+    """عرض حالة كل ترحيل"""
+    pending = {migration.version for migration in pending_migrations(engine)}
+    for migration in MIGRATIONS:
+        state = "⏳ معلق" if migration.version in pending else "✅ مطبق"
+        print(f"   {migration.version:>3} {migration.name}: {state}")
+
+def main():
+    """تطبيق الترحيلات مع عرض زمن كل خطوة"""
+    engine = db_manager.migration_engine()
+    
+    if "--status" in sys.argv:
+        show_status(engine)
+        return
+    
+    if "--analyze" in sys.argv:
+        run_analyze(engine)
+        return
+    
+    print("🔄 جاري تطبيق الترحيلات...")
+    started = time.perf_counter()
+    results = db_manager.apply_schema(engine)
+    
+    if not results:
+        print("✅ لا توجد ترحيلات معلقة")
+        return
+    
+    elapsed = time.perf_counter() - started
+    print(f"✅ تم تطبيق {len([r for r in results if r.version is not None])} ترحيل في {elapsed:.2f} ثانية")
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,20 @@ from sqlalchemy import func  # ⬅️ المهم!
 from database.session import session_scope
 from database.models import (
     Activity, ActivityType, ActivityCategory, 
-    ActivityBeneficiary, Beneficiary, User
+    ActivityBeneficiary, Beneficiary, Family, User
 )
+from database.enrolment import (
+    count_by_filter, count_participants, enrol_beneficiaries, enrol_by_filter, enrol_family,
+    get_participants
+)
+from database.listings import get_family_cities
+from database.rollups import count_activities
+from database.scoping import ROW_SCOPE_LABELS, row_scope, scope_clause
+from database.search import load_ranked, search_beneficiary_ids
+from database.stats import load_activity_statistics
+from auth.permissions import PermissionLevel, Resource
+from modules.exports import show_export_panel
+from utils.helpers import month_bounds, week_bounds
 
 # إعدادات النظام
 SYSTEM_CURRENCY = "EGP"  # جنيه مصري
@@ -394,6 +406,7 @@ def show_activities(user_data=None):
     الواجهة الرئيسية للأنشطة
     """
     st.title("📅 إدارة الأنشطة والفعاليات")
+    show_export_panel(["activities"], user_data, key="activities_export")
     
     # التحقق من حالات التعديل
     if 'edit_activity_id' in st.session_state:
@@ -466,27 +479,46 @@ def _show_activities_list(user_data=None):
     
     try:
         with session_scope() as session:
-            # بناء الاستعلام
+            # بناء الاستعلام (الأنشطة التي يراها المستخدم فقط)
             query = session.query(Activity)
+            scope = "all"
+            if user_data:
+                scope = row_scope(user_data, Resource.ACTIVITIES)
+                query = query.filter(scope_clause(user_data, Resource.ACTIVITIES))
             
             # تطبيق الفلترة
             if status_filter != "الكل":
                 query = query.filter(Activity.status == status_filter)
             
+            period_start, period_end = None, None
             if date_filter != "الكل":
                 today = date.today()
                 if date_filter == "هذا الشهر":
-                    first_day = date(today.year, today.month, 1)
-                    last_day = date(today.year, today.month + 1, 1) - timedelta(days=1)
-                    query = query.filter(Activity.start_date.between(first_day, last_day))
+                    period_start, period_end = month_bounds(today)
                 elif date_filter == "الأسبوع الحالي":
-                    start_week = today - timedelta(days=today.weekday())
-                    end_week = start_week + timedelta(days=6)
-                    query = query.filter(Activity.start_date.between(start_week, end_week))
+                    period_start, period_end = week_bounds(today)
                 elif date_filter == "المستقبلية":
-                    query = query.filter(Activity.start_date >= today)
+                    period_start = today
                 elif date_filter == "الماضية":
-                    query = query.filter(Activity.start_date < today)
+                    period_end = today - timedelta(days=1)
+                
+                if period_start:
+                    query = query.filter(Activity.start_date >= period_start)
+                if period_end:
+                    query = query.filter(Activity.start_date <= period_end)
+            
+            # العدد الإجمالي للفترة من جداول التجميع (بدون مسح جدول الأنشطة)
+            # جداول التجميع لكل الأنشطة، فالنطاق الأضيق يُعد من فهرس created_by
+            if not search_query and scope != "all":
+                st.caption(f"📊 عدد الأنشطة المطابقة: {query.count():,}")
+            elif not search_query:
+                total_matching = count_activities(
+                    session,
+                    status=status_filter if status_filter != "الكل" else None,
+                    start=period_start,
+                    end=period_end
+                )
+                st.caption(f"📊 عدد الأنشطة المطابقة: {total_matching:,}")
             
             if search_query:
                 query = query.filter(Activity.title.ilike(f"%{search_query}%"))
@@ -498,15 +530,22 @@ def _show_activities_list(user_data=None):
                 st.info("📭 لا توجد أنشطة مطابقة للبحث")
                 return
             
+            # عدد المشاركين لكل الأنشطة المعروضة في استعلام واحد
+            participant_counts = count_participants(session, [a.id for a in activities])
+            
             # عرض البيانات
             for activity in activities:
                 with st.expander(f"**{activity.title}** - {_get_status_ar(activity.status)}"):
-                    _display_activity_details(activity, session, user_data)
+                    _display_activity_details(
+                        activity, session, user_data,
+                        participants_count=participant_counts.get(activity.id, 0)
+                    )
     
     except Exception as e:
         st.error(f"حدث خطأ في جلب البيانات: {str(e)}")
 
-def _display_activity_details(activity: Activity, session, user_data=None):
+def _display_activity_details(activity: Activity, session, user_data=None,
+                              participants_count: int = 0):
     """
     عرض تفاصيل النشاط
     """
@@ -531,10 +570,7 @@ def _display_activity_details(activity: Activity, session, user_data=None):
         st.write(f"**المسؤول:** {activity.responsible_person or 'غير محدد'}")
         st.write(f"**فريق العمل:** {activity.team_members or 'غير محدد'}")
         
-        # عدد المشاركين
-        participants_count = session.query(ActivityBeneficiary).filter(
-            ActivityBeneficiary.activity_id == activity.id
-        ).count()
+        # عدد المشاركين (محسوب مسبقاً لكل الصفحة)
         st.write(f"**عدد المشاركين:** {participants_count}")
     
     # عرض الوصف
@@ -705,7 +741,11 @@ def _manage_participants(user_data=None):
     # اختيار النشاط
     try:
         with session_scope() as session:
-            activities = session.query(Activity).order_by(Activity.start_date.desc()).limit(50).all()
+            # الأنشطة التي يملك المستخدم تعديلها فقط
+            query = session.query(Activity)
+            if user_data:
+                query = query.filter(scope_clause(user_data, Resource.ACTIVITIES, PermissionLevel.EDIT))
+            activities = query.order_by(Activity.start_date.desc()).limit(50).all()
             
             if not activities:
                 st.info("📭 لا توجد أنشطة")
@@ -756,16 +796,14 @@ def _manage_activity_participants(activity_id: int, session, user_data=None):
     # ========== عرض المشاركين الحاليين ==========
     st.subheader("👥 المشاركين الحاليين")
     
-    participants = session.query(ActivityBeneficiary).filter(
-        ActivityBeneficiary.activity_id == activity_id
-    ).all()
+    # المشاركون مع بيانات المستفيدين في استعلام واحد
+    participants = get_participants(session, activity_id)
+    
+    # معرفات المضافين بالفعل (للتحقق من التكرار دون استعلامات إضافية)
+    existing_ids = {beneficiary.id for _, beneficiary in participants}
     
     if participants:
-        for p in participants:
-            beneficiary = session.query(Beneficiary).filter(
-                Beneficiary.id == p.beneficiary_id
-            ).first()
-            
+        for p, beneficiary in participants:
             if beneficiary:
                 col1, col2, col3 = st.columns([3, 2, 1])
                 with col1:
@@ -799,10 +837,9 @@ def _manage_activity_participants(activity_id: int, session, user_data=None):
     
     # عرض نتائج البحث
     if search_query:
-        beneficiaries = session.query(Beneficiary).filter(
-            (Beneficiary.full_name_ar.ilike(f"%{search_query}%")) |
-            (Beneficiary.national_id.ilike(f"%{search_query}%"))
-        ).limit(20).all()
+        # البحث عبر فهرس FTS بدلاً من مسح الجدول بـ LIKE
+        beneficiary_ids = search_beneficiary_ids(session, search_query, limit=20)
+        beneficiaries = load_ranked(session, Beneficiary, beneficiary_ids)
         
         if beneficiaries:
             st.write(f"**النتائج ({len(beneficiaries)})**")
@@ -826,12 +863,7 @@ def _manage_activity_participants(activity_id: int, session, user_data=None):
                                     st.caption(f"📞 {beneficiary.phone}")
                                 
                                 # التحقق إذا كان مضافاً
-                                existing = session.query(ActivityBeneficiary).filter(
-                                    ActivityBeneficiary.activity_id == activity_id,
-                                    ActivityBeneficiary.beneficiary_id == beneficiary.id
-                                ).first()
-                                
-                                if existing:
+                                if beneficiary.id in existing_ids:
                                     st.warning("⚠️ مضاف بالفعل")
                                 else:
                                     # زر الاختيار
@@ -900,6 +932,9 @@ def _manage_activity_participants(activity_id: int, session, user_data=None):
                     except Exception as e:
                         session.rollback()
                         st.error(f"❌ حدث خطأ: {str(e)}")
+    # ========== التسجيل الجماعي ==========
+    _bulk_enrol_participants(activity_id, session)
+    
     # # في نهاية الدالة، أضف زر العودة أيضاً
     # st.markdown("---")
     # if st.button("⬅️ العودة لقائمة الأنشطة", use_container_width=True, type="secondary"):
@@ -911,6 +946,101 @@ def _manage_activity_participants(activity_id: int, session, user_data=None):
 
 
 
+def _bulk_enrol_participants(activity_id: int, session):
+    """
+    تسجيل جماعي للمشاركين: أسرة كاملة، أو فلتر مدينة وحالة، أو قائمة معرفات
+    """
+    result_key = f"bulk_enrol_result_{activity_id}"
+    last_result = st.session_state.pop(result_key, None)
+    
+    with st.expander("📥 تسجيل جماعي للمشاركين", expanded=last_result is not None):
+        if last_result:
+            st.success(last_result)
+        
+        mode = st.radio(
+            "طريقة الاختيار",
+            ["family", "filter", "ids"],
+            format_func=lambda x: {
+                "family": "🏠 أسرة كاملة",
+                "filter": "🏙️ حسب المدينة والحالة",
+                "ids": "🔢 قائمة معرفات",
+            }[x],
+            horizontal=True,
+            key=f"bulk_enrol_mode_{activity_id}"
+        )
+        
+        with st.form(f"bulk_enrol_{activity_id}"):
+            if mode == "family":
+                # بالكود بدلاً من قائمة بكل الأسر (فهرس uq_family_code)
+                family_code = st.text_input("كود الأسرة")
+            elif mode == "filter":
+                cities = get_family_cities(session)
+                city = st.selectbox("المدينة", ["الكل"] + cities)
+                beneficiary_status = st.selectbox(
+                    "حالة المستفيد",
+                    ["active", "inactive", "suspended", "الكل"],
+                    format_func=lambda x: {
+                        "active": "نشط", "inactive": "غير نشط",
+                        "suspended": "موقوف", "الكل": "الكل"
+                    }[x]
+                )
+                confirm_all = st.checkbox(
+                    f"تأكيد تسجيل كل المستفيدين ({count_by_filter(session, beneficiary_status=None):,}) "
+                    "عند اختيار الكل في المدينة والحالة"
+                )
+            else:
+                ids_text = st.text_area("معرفات المستفيدين (مفصولة بفواصل أو أسطر)")
+            
+            role = st.text_input("الدور في النشاط", value="مشارك", key=f"bulk_role_{activity_id}")
+            submitted = st.form_submit_button("📥 تسجيل", type="primary")
+        
+        if not submitted:
+            return
+        
+        try:
+            if mode == "family":
+                family_id = session.query(Family.id).filter(
+                    Family.family_code == family_code.strip()
+                ).scalar() if family_code.strip() else None
+                if family_id is None:
+                    st.warning("⚠️ لا توجد أسرة بهذا الكود")
+                    return
+                result = enrol_family(session, activity_id, family_id, role=role or None)
+            elif mode == "filter":
+                if city == "الكل" and beneficiary_status == "الكل" and not confirm_all:
+                    st.warning("⚠️ اختر مدينة أو حالة، أو أكد تسجيل كل المستفيدين")
+                    return
+                result = enrol_by_filter(
+                    session, activity_id,
+                    city=None if city == "الكل" else city,
+                    beneficiary_status=None if beneficiary_status == "الكل" else beneficiary_status,
+                    role=role or None
+                )
+            else:
+                tokens = ids_text.replace(",", " ").split()
+                invalid = [token for token in tokens if not token.isdigit()]
+                if invalid:
+                    st.error(f"❌ معرفات غير صالحة: {', '.join(invalid[:10])}")
+                    return
+                result = enrol_beneficiaries(
+                    session, activity_id, [int(token) for token in tokens], role=role or None
+                )
+            
+            session.commit()
+            
+            # عرض النتيجة بعد إعادة التحميل (لتحديث قائمة المشاركين)
+            st.session_state[result_key] = (
+                f"✅ تمت إضافة {result.inserted:,} مشارك "
+                f"(تم تجاهل {result.skipped:,} مسجلين مسبقاً أو غير موجودين) "
+                f"في {result.elapsed:.2f} ثانية"
+            )
+            st.rerun()
+        
+        except Exception as e:
+            session.rollback()
+            st.error(f"❌ حدث خطأ: {str(e)}")
+
+
 def _edit_activity_form(activity_id: int, user_data=None):
     """
     تعديل نشاط
@@ -999,89 +1129,69 @@ def _show_statistics(user_data=None):
     """
     st.subheader("📊 إحصائيات الأنشطة")
     
+    # الأرقام ضمن نطاق المستخدم (all من جداول التجميع، وغيره باستعلام مقيد)
+    scope = row_scope(user_data, Resource.ACTIVITIES) if user_data else "all"
+    if scope is None:
+        st.warning("⚠️ ليس لديك صلاحية عرض إحصائيات الأنشطة")
+        return
+    if scope in ROW_SCOPE_LABELS:
+        st.caption(f"📌 الإحصائيات تشمل {ROW_SCOPE_LABELS[scope]} فقط")
+    
     try:
-        with session_scope() as session:
-            # إحصائيات أساسية
-            total_activities = session.query(Activity).count()
-            completed_activities = session.query(Activity).filter(
-                Activity.status == 'completed'
-            ).count()
-            
-            # عدد المشاركين الإجمالي
-            total_participants = session.query(ActivityBeneficiary).count()
-            
-            # مؤشرات الأداء
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric("إجمالي الأنشطة", total_activities)
-            
-            with col2:
-                st.metric("الأنشطة المكتملة", completed_activities)
-            
-            with col3:
-                completion_rate = (completed_activities / total_activities * 100) if total_activities > 0 else 0
-                st.metric("نسبة الإكمال", f"{completion_rate:.1f}%")
-            
-            with col4:
-                st.metric("إجمالي المشاركات", total_participants)
-            
-            st.markdown("---")
-            
-            # توزيع الأنشطة حسب الحالة
-            st.subheader("📈 توزيع الأنشطة حسب الحالة")
-            
-            status_counts = session.query(
-                Activity.status,
-                func.count(Activity.id)
-            ).group_by(Activity.status).all()
-            
-            if status_counts:
-                status_labels = {
-                    'planned': 'مخطط',
-                    'in_progress': 'قيد التنفيذ',
-                    'completed': 'مكتمل',
-                    'cancelled': 'ملغي'
-                }
-                
-                labels = [status_labels.get(s[0], s[0]) for s in status_counts]
-                values = [s[1] for s in status_counts]
-                
-                fig_status = px.pie(
-                    names=labels,
-                    values=values,
-                    title="توزيع الأنشطة حسب الحالة"
-                )
-                st.plotly_chart(fig_status, use_container_width=True)
-            
-            # أنشطة الشهر الحالي
-            st.subheader("📅 أنشطة الشهر الحالي")
-            
-            today = date.today()
-            first_day = date(today.year, today.month, 1)
-            last_day = date(today.year, today.month + 1, 1) - timedelta(days=1)
+        # الإحصائيات من الذاكرة المؤقتة (تُحدّث تلقائياً عند تعديل الأنشطة)
+        stats = load_activity_statistics(user_data)
+        
+        # مؤشرات الأداء
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("إجمالي الأنشطة", stats.total_activities)
+        
+        with col2:
+            st.metric("الأنشطة المكتملة", stats.completed_activities)
+        
+        with col3:
+            st.metric("نسبة الإكمال", f"{stats.completion_rate:.1f}%")
+        
+        with col4:
+            st.metric("إجمالي المشاركات", stats.total_participants)
+        
+        st.markdown("---")
+        
+        # توزيع الأنشطة حسب الحالة
+        st.subheader("📈 توزيع الأنشطة حسب الحالة")
+        
+        if stats.status_counts:
+            labels = [_get_status_ar(status) for status, _ in stats.status_counts]
+            values = [count for _, count in stats.status_counts]
             
-            monthly_activities = session.query(Activity).filter(
-                Activity.start_date.between(first_day, last_day)
-            ).all()
+            fig_status = px.pie(
+                names=labels,
+                values=values,
+                title="توزيع الأنشطة حسب الحالة"
+            )
+            st.plotly_chart(fig_status, use_container_width=True)
+        
+        # أنشطة الشهر الحالي
+        st.subheader("📅 أنشطة الشهر الحالي")
+        
+        if stats.monthly_activities:
+            activities_data = []
+            for activity in stats.monthly_activities:
+                activities_data.append({
+                    "النشاط": activity.title,
+                    "التاريخ": activity.start_date.strftime("%Y-%m-%d"),
+                    "الحالة": _get_status_ar(activity.status),
+                    "المكان": activity.location or "غير محدد"
+                })
             
-            if monthly_activities:
-                activities_data = []
-                for activity in monthly_activities:
-                    activities_data.append({
-                        "النشاط": activity.title,
-                        "التاريخ": activity.start_date.strftime("%Y-%m-%d"),
-                        "الحالة": _get_status_ar(activity.status),
-                        "المكان": activity.location or "غير محدد"
-                    })
-                
-                st.dataframe(
-                    pd.DataFrame(activities_data),
-                    use_container_width=True,
-                    hide_index=True
-                )
-            else:
-                st.info("لا توجد أنشطة هذا الشهر")
+            st.dataframe(
+                pd.DataFrame(activities_data),
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("لا توجد أنشطة هذا الشهر")
     
     except Exception as e:
         st.error(f"حدث خطأ في جلب الإحصائيات: {str(e)}")
@@ -8,49 +8,107 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime, date
 from sqlalchemy import func
-from database.session import session_scope
+from database.session import read_session_scope, session_scope
 from database.models import Family, Beneficiary
+from database.listings import get_families_page, get_family_cities
+from database.scoping import scope_clause
+from database.search import load_ranked, search_beneficiary_ids
+from modules.exports import show_export_panel
+from auth.permissions import PermissionLevel, Resource, permission_manager
+from utils.importer import (
+    BENEFICIARY_COLUMNS, FAMILY_COLUMNS, ImportFormatError,
+    import_beneficiaries, import_families, template_csv
+)
 
 # ==================== دوال الأسرة ====================
 
-def show_families_simple():
-    """عرض الأسر - مبسط"""
+FAMILY_STATUSES = ["فقيرة", "متوسطة", "ميسورة", "متعسرة"]
+FAMILIES_PAGE_SIZE = 25
+
+def show_families_simple(user_data=None):
+    """عرض الأسر - مقسمة إلى صفحات مع فلترة بالمدينة والحالة (في نطاق صلاحية المستخدم)"""
     st.subheader("🏠 قائمة الأسر")
     
-    with session_scope() as session:
-        families = session.query(Family).all()
-        
-        if not families:
-            st.info("لا توجد أسر")
-            return
-        
-        for family in families:
-            with st.expander(f"{family.family_name} 📞 {family.phone or 'بدون هاتف'}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**الكود:** {family.family_code}")
-                    st.write(f"**العنوان:** {family.address or 'بدون عنوان'}")
-                    st.write(f"**المدينة:** {family.city or 'بدون مدينة'}")
-                
-                with col2:
-                    st.write(f"**عدد المستفيدين:** {len(family.beneficiaries)}")
-                    st.write(f"**الحالة:** {family.family_status or 'غير محدد'}")
-                    st.write(f"**تاريخ التسجيل:** {family.registration_date}")
-                
-                # زر التعديل السريع
-                if st.button(f"✏️ تعديل {family.family_name}", key=f"edit_{family.id}"):
-                    st.session_state.edit_family_id = family.id
-                    st.rerun()
+    with read_session_scope() as session:
+        cities = get_family_cities(session, user_data=user_data)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        city = st.selectbox("المدينة", ["الكل"] + cities, key="families_city_filter")
+    with col2:
+        family_status = st.selectbox("حالة الأسرة", ["الكل"] + FAMILY_STATUSES, key="families_status_filter")
+    
+    city = None if city == "الكل" else city
+    family_status = None if family_status == "الكل" else family_status
+    
+    # مفاتيح الصفحات السابقة (تُعاد عند تغيير الفلاتر)
+    filters_key = (city, family_status)
+    if st.session_state.get('families_filters_key') != filters_key:
+        st.session_state.families_filters_key = filters_key
+        st.session_state.families_cursors = [None]
+    
+    cursors = st.session_state.families_cursors
+    
+    with read_session_scope() as session:
+        page = get_families_page(
+            session,
+            city=city,
+            family_status=family_status,
+            after=cursors[-1],
+            page_size=FAMILIES_PAGE_SIZE,
+            user_data=user_data
+        )
+    
+    if not page.rows:
+        st.info("لا توجد أسر")
+        return
+    
+    for family in page.rows:
+        with st.expander(f"{family.family_name} 📞 {family.phone or 'بدون هاتف'}"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**الكود:** {family.family_code}")
+                st.write(f"**العنوان:** {family.address or 'بدون عنوان'}")
+                st.write(f"**المدينة:** {family.city or 'بدون مدينة'}")
+            
+            with col2:
+                st.write(f"**عدد المستفيدين:** {family.beneficiaries_count}")
+                st.write(f"**الحالة:** {family.family_status or 'غير محدد'}")
+                st.write(f"**تاريخ التسجيل:** {family.registration_date}")
+            
+            # زر التعديل السريع (للأسر داخل نطاق التعديل فقط)
+            if family.editable and st.button(f"✏️ تعديل {family.family_name}", key=f"edit_{family.id}"):
+                st.session_state.edit_family_id = family.id
+                st.rerun()
+    
+    # التنقل بين الصفحات
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(cursors) > 1 and st.button("➡️ السابق", key="families_prev", use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"الصفحة {len(cursors)}")
+    with col_next:
+        if page.has_more and st.button("التالي ⬅️", key="families_next", use_container_width=True):
+            cursors.append(page.next_cursor)
+            st.rerun()
 
-def edit_family_simple(family_id: int):
-    """تعديل أسرة - فعال"""
+def edit_family_simple(family_id: int, user_data=None):
+    """تعديل أسرة - فعال (داخل نطاق صلاحية التعديل للمستخدم)"""
     st.subheader("✏️ تعديل أسرة")
     
     with session_scope() as session:
-        family = session.query(Family).filter(Family.id == family_id).first()
+        query = session.query(Family).filter(Family.id == family_id)
+        if user_data:
+            query = query.filter(scope_clause(user_data, Resource.FAMILIES, PermissionLevel.EDIT))
+        family = query.first()
         
         if not family:
-            st.error("الأسرة غير موجودة")
+            st.error("الأسرة غير موجودة أو لا تملك صلاحية تعديلها")
+            if st.button("⬅️ العودة", key="edit_family_back"):
+                del st.session_state.edit_family_id
+                st.rerun()
             return
         
         # النموذج
@@ -106,7 +164,7 @@ def edit_family_simple(family_id: int):
                 except Exception as e:
                     st.error(f"خطأ: {str(e)}")
 
-def add_family_simple():
+def add_family_simple(user_data=None):
     """إضافة أسرة جديدة - مبسطة"""
     st.subheader("➕ إضافة أسرة جديدة")
     
@@ -145,7 +203,8 @@ def add_family_simple():
                         address=address,
                         city=city or None,
                         family_status=status if status else None,
-                        registration_date=date.today()
+                        registration_date=date.today(),
+                        created_by=(user_data or {}).get("user_id")
                     )
                     
                     session.add(new_family)
@@ -163,17 +222,26 @@ def show_beneficiaries_simple():
     """عرض المستفيدين - مبسط"""
     st.subheader("👥 قائمة المستفيدين")
     
+    search_query = st.text_input(
+        "🔍 ابحث بالاسم أو الرقم القومي أو الهاتف", key="beneficiaries_search"
+    )
+    
     with session_scope() as session:
-        beneficiaries = session.query(Beneficiary).limit(50).all()
+        if search_query:
+            # النتائج مرتبة حسب الصلة من فهرس البحث
+            beneficiary_ids = search_beneficiary_ids(session, search_query, limit=50)
+            beneficiaries = load_ranked(session, Beneficiary, beneficiary_ids)
+        else:
+            beneficiaries = session.query(Beneficiary).limit(50).all()
         
         if not beneficiaries:
-            st.info("لا توجد مستفيدين")
+            st.info("لا توجد نتائج" if search_query else "لا توجد مستفيدين")
             return
         
         for beneficiary in beneficiaries:
             st.write(f"**{beneficiary.full_name_ar}** - 📞 {beneficiary.phone or 'بدون'}")
 
-def add_beneficiary_simple():
+def add_beneficiary_simple(user_data=None):
     """إضافة مستفيد - مبسط"""
     st.subheader("👤 إضافة مستفيد جديد")
     
@@ -209,7 +277,8 @@ def add_beneficiary_simple():
                         phone=phone or None,
                         family_id=family_id,
                         registration_date=date.today(),
-                        status='active'
+                        status='active',
+                        created_by=(user_data or {}).get("user_id")
                     )
                     
                     session.add(new_beneficiary)
@@ -223,36 +292,118 @@ def add_beneficiary_simple():
 
 # ==================== الواجهة الرئيسية ====================
 
+# ==================== الاستيراد الجماعي ====================
+
+def import_data_simple(user_data=None):
+    """استيراد الأسر أو المستفيدين من ملف Excel/CSV"""
+    st.subheader("📥 استيراد من Excel / CSV")
+    
+    kind = st.radio(
+        "نوع البيانات",
+        ["families", "beneficiaries"],
+        format_func=lambda x: {"families": "🏠 الأسر", "beneficiaries": "👥 المستفيدين"}[x],
+        horizontal=True,
+        key="import_kind"
+    )
+    columns = FAMILY_COLUMNS if kind == "families" else BENEFICIARY_COLUMNS
+    
+    # الاستيراد إضافة سجلات: يحتاج صلاحية الإنشاء (ولو على سجلات المستخدم فقط)
+    resource = Resource.FAMILIES if kind == "families" else Resource.BENEFICIARIES
+    if not permission_manager.for_user(user_data).can_create(resource, "own"):
+        st.warning("⚠️ ليس لديك صلاحية استيراد هذه البيانات")
+        return
+    
+    st.caption("الأعمدة المطلوبة: " + "، ".join(c.label for c in columns if c.required))
+    st.download_button(
+        "📄 تحميل قالب CSV",
+        data=template_csv(columns),
+        file_name=f"{kind}_template.csv",
+        mime="text/csv"
+    )
+    
+    uploaded = st.file_uploader("اختر الملف", type=["xlsx", "csv"], key=f"import_file_{kind}")
+    if not uploaded or not st.button("📥 بدء الاستيراد", type="primary"):
+        return
+    
+    progress = st.empty()
+    
+    def show_progress(report):
+        progress.info(
+            f"⏳ تمت معالجة {report.total_rows:,} صف "
+            f"({report.rows_per_second:,.0f} صف/ثانية)"
+        )
+    
+    importer = import_families if kind == "families" else import_beneficiaries
+    try:
+        report = importer(
+            uploaded, uploaded.name,
+            created_by=(user_data or {}).get("user_id"),
+            on_progress=show_progress
+        )
+    except ImportFormatError as e:
+        progress.empty()
+        st.error(f"❌ {e}")
+        return
+    
+    progress.empty()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("إجمالي الصفوف", f"{report.total_rows:,}")
+    col2.metric("تمت الإضافة", f"{report.inserted:,}")
+    col3.metric("مرفوض", f"{report.failed:,}")
+    col4.metric("صف/ثانية", f"{report.rows_per_second:,.0f}")
+    
+    if report.errors:
+        st.warning(f"⚠️ أول {len(report.errors)} خطأ (التقرير الكامل في الملف)")
+        st.dataframe(
+            pd.DataFrame(report.errors, columns=["رقم الصف", "الحقل", "الخطأ"]),
+            use_container_width=True,
+            hide_index=True
+        )
+    if report.error_report_path:
+        st.download_button(
+            "📄 تحميل تقرير الأخطاء",
+            data=report.error_report_path.read_bytes(),
+            file_name=report.error_report_path.name,
+            mime="text/csv"
+        )
+    elif report.inserted:
+        st.success(f"✅ تم استيراد {report.inserted:,} سجل بنجاح")
+
 def show_beneficiaries(user_data=None):
     """
     الواجهة الرئيسية - النسخة النهائية المبسطة
     """
     st.title("👨‍👩‍👧‍👦 إدارة المستفيدين والأسر")
+    show_export_panel(["beneficiaries", "families"], user_data, key="beneficiaries_export")
     
     # التحقق من حالة التعديل
     if 'edit_family_id' in st.session_state:
-        edit_family_simple(st.session_state.edit_family_id)
+        edit_family_simple(st.session_state.edit_family_id, user_data)
         return
     
     # علامات التبويب الرئيسية
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "🏠 الأسر",
         "👥 المستفيدين", 
         "➕ أسرة جديدة",
-        "👤 مستفيد جديد"
+        "👤 مستفيد جديد",
+        "📥 استيراد"
     ])
     
     with tab1:
-        show_families_simple()
+        show_families_simple(user_data)
     
     with tab2:
         show_beneficiaries_simple()
     
     with tab3:
-        add_family_simple()
+        add_family_simple(user_data)
     
     with tab4:
-        add_beneficiary_simple()
+        add_beneficiary_simple(user_data)
+    
+    with tab5:
+        import_data_simple(user_data)
 
 # ==================== التشغيل المباشر ====================
 
@@ -4,59 +4,45 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
-from database.session import session_scope
-from database.models import (
-    User, Activity, Beneficiary, Donation, Family,
-    ActivityStatus, DonationStatus
+from database.session import read_session_scope
+from database.models import User
+from database.cache import stats_cache
+from database.scoping import ROW_SCOPE_LABELS, row_scope
+from database.stats import load_dashboard_snapshot
+from auth.permissions import Resource
+
+# الموارد التي تظهر أرقامها في لوحة التحكم
+_DASHBOARD_RESOURCES = (
+    Resource.BENEFICIARIES, Resource.ACTIVITIES, Resource.DONATIONS, Resource.FAMILIES,
 )
-from auth.authentication import get_current_user
 
-def show_dashboard():
+def show_dashboard(user_data=None):
     """عرض لوحة التحكم"""
     
-    user = get_current_user()
+    user = user_data or {}
     
     # ========== الإحصائيات السريعة ==========
     
     st.markdown("### 📊 نظرة عامة على النظام")
     
-    # الحصول على الإحصائيات
-    with session_scope() as session:
-        # إجمالي المستفيدين
-        total_beneficiaries = session.query(Beneficiary).count()
-        
-        # إجمالي الأنشطة
-        total_activities = session.query(Activity).count()
-        
-        # إجمالي التبرعات
-        total_donations = session.query(Donation).filter(
-            Donation.status == DonationStatus.VERIFIED
-        ).count()
-        
-        # إجمالي الأسر
-        total_families = session.query(Family).count()
-        
-        # الأنشطة النشطة
-        active_activities = session.query(Activity).filter(
-            Activity.status == ActivityStatus.IN_PROGRESS
-        ).count()
-        
-        # التبرعات الشهرية
-        start_of_month = date.today().replace(day=1)
-        monthly_donations = session.query(Donation).filter(
-            Donation.donation_date >= start_of_month,
-            Donation.status == DonationStatus.VERIFIED
-        ).count()
-        
-        # المستفيدين الجدد هذا الشهر
-        new_beneficiaries = session.query(Beneficiary).filter(
-            Beneficiary.registration_date >= start_of_month
-        ).count()
-        
-        # الأنشطة المكتملة
-        completed_activities = session.query(Activity).filter(
-            Activity.status == ActivityStatus.COMPLETED
-        ).count()
+    # تنبيه عندما تكون بعض الأرقام مقيدة بنطاق المستخدم
+    if user_data:
+        narrowed = {row_scope(user_data, resource) for resource in _DASHBOARD_RESOURCES}
+        labels = [ROW_SCOPE_LABELS[scope] for scope in ("department", "own") if scope in narrowed]
+        if labels:
+            st.caption(f"📌 بعض الأرقام تشمل {' و'.join(labels)} فقط")
+    
+    # الحصول على الإحصائيات ضمن نطاق المستخدم (استعلام مجمع واحد، مع تخزين مؤقت)
+    snapshot = load_dashboard_snapshot(user_data)
+    
+    total_beneficiaries = snapshot.total_beneficiaries
+    total_activities = snapshot.total_activities
+    total_donations = snapshot.total_donations
+    total_families = snapshot.total_families
+    active_activities = snapshot.active_activities
+    monthly_donations = snapshot.monthly_donations
+    new_beneficiaries = snapshot.new_beneficiaries
+    completed_activities = snapshot.completed_activities
     
     # عرض البطاقات
     col1, col2, col3, col4 = st.columns(4)
@@ -106,10 +92,10 @@ def show_dashboard():
         activity_data = {
             'الحالة': ['مخطط', 'جاري التنفيذ', 'مكتمل', 'ملغي'],
             'العدد': [
-                session.query(Activity).filter_by(status=ActivityStatus.PLANNED).count(),
-                session.query(Activity).filter_by(status=ActivityStatus.IN_PROGRESS).count(),
-                session.query(Activity).filter_by(status=ActivityStatus.COMPLETED).count(),
-                session.query(Activity).filter_by(status=ActivityStatus.CANCELLED).count()
+                snapshot.planned_activities,
+                snapshot.active_activities,
+                snapshot.completed_activities,
+                snapshot.cancelled_activities
             ]
         }
         
@@ -139,24 +125,11 @@ def show_dashboard():
     with col2:
         st.markdown("#### 📊 توزيع المستفيدين")
         
-        # بيانات المستفيدين حسب المدينة
-        with session_scope() as session:
-            beneficiaries_by_city = session.query(
-                Beneficiary.city,
-                Beneficiary.gender
-            ).filter(Beneficiary.city.isnot(None)).all()
-        
-        if beneficiaries_by_city:
-            cities = [b[0] for b in beneficiaries_by_city if b[0]]
-            gender_counts = {'M': 0, 'F': 0}
-            
-            for _, gender in beneficiaries_by_city:
-                if gender in gender_counts:
-                    gender_counts[gender] += 1
-            
+        # بيانات المستفيدين حسب النوع (محسوبة مسبقاً في اللقطة)
+        if snapshot.male_beneficiaries or snapshot.female_beneficiaries:
             gender_data = {
                 'النوع': ['ذكور', 'إناث'],
-                'العدد': [gender_counts['M'], gender_counts['F']]
+                'العدد': [snapshot.male_beneficiaries, snapshot.female_beneficiaries]
             }
             
             df_gender = pd.DataFrame(gender_data)
@@ -186,10 +159,7 @@ def show_dashboard():
     
     st.markdown("#### 📝 آخر الأنشطة")
     
-    with session_scope() as session:
-        recent_activities = session.query(Activity).order_by(
-            Activity.created_at.desc()
-        ).limit(5).all()
+    recent_activities = snapshot.recent_activities
     
     if recent_activities:
         activities_data = []
@@ -199,11 +169,11 @@ def show_dashboard():
                 'in_progress': 'جاري التنفيذ',
                 'completed': 'مكتمل',
                 'cancelled': 'ملغي'
-            }.get(activity.status.value, activity.status.value)
+            }.get(activity.status, activity.status)
             
             activities_data.append({
                 'النشاط': activity.title,
-                'التاريخ': activity.start_date.strftime('%Y-%m-%d'),
+                'التاريخ': activity.start_date.strftime('%Y-%m-%d') if activity.start_date else '',
                 'الحالة': status_ar,
                 'الموقع': activity.location[:30] + '...' if activity.location and len(activity.location) > 30 else activity.location or 'غير محدد'
             })
@@ -247,13 +217,13 @@ def show_dashboard():
         
         with col1:
             st.markdown("**معلومات المستخدم:**")
-            st.write(f"- **الاسم:** {user['full_name']}")
-            st.write(f"- **الدور:** {user['role']}")
-            st.write(f"- **اسم المستخدم:** {user['username']}")
+            st.write(f"- **الاسم:** {user.get('full_name', '')}")
+            st.write(f"- **الدور:** {user.get('role', '')}")
+            st.write(f"- **اسم المستخدم:** {user.get('username', '')}")
             
             # آخر دخول
-            with session_scope() as session:
-                user_obj = session.query(User).filter_by(id=user['id']).first()
+            with read_session_scope() as session:
+                user_obj = session.query(User).filter_by(id=user.get('user_id')).first()
                 if user_obj and user_obj.last_login:
                     st.write(f"- **آخر دخول:** {user_obj.last_login.strftime('%Y-%m-%d %H:%M')}")
         
@@ -262,4 +232,12 @@ def show_dashboard():
             st.write(f"- **عدد الجداول:** 18 جدول")
             st.write(f"- **إصدار النظام:** 1.0.0")
             st.write(f"- **تاريخ التشغيل:** {datetime.now().strftime('%Y-%m-%d')}")
-            st.write(f"- **الوقت الحالي:** {datetime.now().strftime('%H:%M:%S')}")
\ No newline at end of file
+            st.write(f"- **الوقت الحالي:** {datetime.now().strftime('%H:%M:%S')}")
+            st.write(f"- **آخر تحديث للإحصائيات:** {snapshot.generated_at.strftime('%H:%M:%S')}")
+            
+            if user.get('role') == 'admin':
+                cache_stats = stats_cache.stats()
+                st.write(
+                    f"- **الذاكرة المؤقتة:** {cache_stats['hits']} إصابة / "
+                    f"{cache_stats['misses']} إخفاق ({cache_stats['hit_rate']:.0%})"
+                )
\ No newline at end of file
@@ -6,17 +6,26 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date
-from sqlalchemy import func
-from database.session import session_scope
+from database.session import read_session_scope, session_scope
 from database.models import Donation, Donor, DonationItem, Beneficiary, DonationAllocation
+from database.listings import DONOR_SORTS, get_donors_page
+from database.scoping import ROW_SCOPE_LABELS, row_scope, scope_clause
+from database.search import load_ranked, search_donor_ids
+from database.sequences import assign_receipt_number, next_donation_number
+from database.stats import load_donation_statistics
+from modules.exports import show_export_panel
+from auth.permissions import Resource
 
 # إعدادات النظام
 SYSTEM_CURRENCY = "EGP"  # جنيه مصري
 CURRENCY_NAME = "جنيه"   # اسم العملة بالعربية
+DONOR_SEARCH_LIMIT = 20  # الحد الأقصى لنتائج البحث عن المتبرعين
+DONORS_PAGE_SIZE = 25    # عدد المتبرعين في صفحة القائمة
 
 def show_donations(user_data=None):
     """الواجهة الرئيسية للتبرعات"""
     st.title("💰 إدارة التبرعات")
+    show_export_panel(["donations", "donors", "allocations"], user_data, key="donations_export")
     
     tab1, tab2, tab3, tab4 = st.tabs([
         "📋 قائمة التبرعات",
@@ -80,8 +89,10 @@ def _show_donations_list(user_data=None):
     
     try:
         with session_scope() as session:
-            # بناء الاستعلام
+            # بناء الاستعلام (التبرعات التي يراها المستخدم فقط)
             query = session.query(Donation)
+            if user_data:
+                query = query.filter(scope_clause(user_data, Resource.DONATIONS))
             
             # تطبيق الفلاتر
             if type_filter != "الكل":
@@ -124,6 +135,8 @@ def _display_donation_details(donation: Donation, session, user_data=None):
     
     with col1:
         st.write(f"**رقم التبرع:** {donation.donation_number}")
+        if donation.receipt_number:
+            st.write(f"**رقم الإيصال:** {donation.receipt_number}")
         st.write(f"**المتبرع:** {donation.donor.full_name if donation.donor else 'غير محدد'}")
         st.write(f"**النوع:** {_get_donation_type_ar(donation.donation_type)}")
         st.write(f"**التاريخ:** {donation.donation_date.strftime('%Y-%m-%d')}")
@@ -175,6 +188,19 @@ def _add_new_donation(user_data=None):
     """إضافة تبرع جديد"""
     st.subheader("➕ تبرع جديد")
     
+    # البحث عن المتبرع (خارج النموذج حتى تتحدث النتائج مع كل بحث)
+    donor_query = st.text_input(
+        "🔍 ابحث عن المتبرع (الاسم، الشركة، الهاتف، الكود)",
+        key="donor_search"
+    )
+    with session_scope() as session:
+        donor_ids = search_donor_ids(session, donor_query, limit=DONOR_SEARCH_LIMIT)
+        donor_labels = {
+            d.id: _donor_label(d) for d in load_ranked(session, Donor, donor_ids)
+        }
+    if donor_query and not donor_labels:
+        st.caption("⚠️ لا يوجد متبرع نشط مطابق")
+    
     with st.form("add_donation_form"):
         col1, col2 = st.columns(2)
         
@@ -198,16 +224,13 @@ def _add_new_donation(user_data=None):
                 key="donation_amount"
             )
             
-            # اختيار المتبرع
-            with session_scope() as session:
-                donors = session.query(Donor).filter(Donor.status == 'active').all()
-                donor_options = ["جديد"] + [f"{d.full_name or d.company_name} ({d.phone or 'بدون هاتف'})" for d in donors]
-                
-                selected_donor = st.selectbox(
-                    "المتبرع *",
-                    donor_options,
-                    key="select_donor"
-                )
+            # اختيار المتبرع من نتائج البحث (القيمة هي معرف المتبرع)
+            selected_donor_id = st.selectbox(
+                "المتبرع *",
+                [None] + list(donor_labels),
+                format_func=lambda x: "جديد / متبرع عام" if x is None else donor_labels[x],
+                key="select_donor"
+            )
             
         with col2:
             payment_method = st.selectbox(
@@ -271,24 +294,14 @@ def _add_new_donation(user_data=None):
             try:
                 with session_scope() as session:
                     # معالجة المتبرع
-                    donor_id = None
+                    donor_id = selected_donor_id
                     
-                    if selected_donor != "جديد":
-                        # البحث عن المتبرع المختار
-                        donor_name = selected_donor.split("(")[0].strip()
-                        donor = session.query(Donor).filter(
-                            (Donor.full_name == donor_name) | 
-                            (Donor.company_name == donor_name)
-                        ).first()
-                        
-                        if donor:
-                            donor_id = donor.id
-                    else:
+                    if donor_id is None:
                         # إضافة متبرع جديد
                         st.info("سيتم إضافة المتبرع كمتبرع عام")
                     
-                    # إنشاء رقم تبرع تلقائي
-                    donation_number = f"DON-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+                    # رقم تبرع تسلسلي (محجوز ذرياً من جدول العدادات)
+                    donation_number = next_donation_number(session)
                     
                     # إنشاء التبرع
                     new_donation = Donation(
@@ -306,6 +319,8 @@ def _add_new_donation(user_data=None):
                         created_by=user_data.get('user_id') if user_data else None
                     )
                     
+                    assign_receipt_number(session, new_donation)
+                    
                     session.add(new_donation)
                     session.flush()
                     
@@ -333,6 +348,7 @@ def _add_new_donation(user_data=None):
                     with st.expander("عرض بيانات التبرع المضافة"):
                         st.json({
                             "رقم التبرع": donation_number,
+                            "رقم الإيصال": new_donation.receipt_number or "لم يصدر",
                             "النوع": donation_type,
                             "المبلغ": f"{amount:,.2f} {CURRENCY_NAME}" if amount > 0 else "غير محدد",
                             "التاريخ": date.today().strftime("%Y-%m-%d"),
@@ -344,6 +360,83 @@ def _add_new_donation(user_data=None):
                 import traceback
                 st.error(traceback.format_exc())
 
+def _donor_label(donor: Donor) -> str:
+    """نص عرض المتبرع في قائمة الاختيار"""
+    label = donor.full_name or donor.company_name or f"متبرع #{donor.id}"
+    details = [value for value in (donor.phone, donor.donor_code) if value]
+    return f"{label} ({' - '.join(details)})" if details else label
+
+def _show_donors_list():
+    """قائمة المتبرعين - مقسمة إلى صفحات مع ملخص التبرعات من استعلام واحد"""
+    sort = st.selectbox(
+        "الترتيب حسب",
+        list(DONOR_SORTS),
+        format_func=lambda x: DONOR_SORTS[x],
+        key="donors_sort"
+    )
+    
+    # مفاتيح الصفحات السابقة (تُعاد عند تغيير الترتيب)
+    if st.session_state.get('donors_sort_key') != sort:
+        st.session_state.donors_sort_key = sort
+        st.session_state.donors_cursors = [None]
+    
+    cursors = st.session_state.donors_cursors
+    
+    with read_session_scope() as session:
+        page = get_donors_page(session, sort=sort, after=cursors[-1], page_size=DONORS_PAGE_SIZE)
+    
+    if not page.rows:
+        st.info("📭 لا توجد متبرعين")
+        return
+    
+    for donor in page.rows:
+        with st.expander(f"{'👤' if donor.donor_type == 'individual' else '🏢'} {donor.display_name}"):
+            col1, col2, col3 = st.columns([3, 1, 1])
+            
+            with col1:
+                st.write(f"**النوع:** {_get_donor_type_ar(donor.donor_type)}")
+                st.write(f"**الكود:** {donor.donor_code or 'بدون'}")
+                st.write(f"**الهاتف:** {donor.phone or 'غير متوفر'}")
+                st.write(f"**البريد:** {donor.email or 'غير متوفر'}")
+                st.write(f"**المدينة:** {donor.city or 'غير محدد'}")
+                st.write(f"**الحالة:** {donor.status}")
+            
+            with col2:
+                if st.button(f"✏️", key=f"edit_donor_{donor.id}", help="تعديل"):
+                    st.session_state.edit_donor_id = donor.id
+                    st.rerun()
+            
+            with col3:
+                if st.button(f"🗑️", key=f"delete_donor_{donor.id}", type="secondary", help="حذف"):
+                    # استخدام timestamp لمفتاح فريد
+                    import time
+                    confirm_suffix = str(int(time.time()))
+                    
+                    with session_scope() as session:
+                        deleted = _delete_donor_with_confirm(donor.id, session, confirm_suffix)
+                    if deleted:
+                        st.rerun()
+            st.markdown("---")
+            
+            st.write(f"**عدد التبرعات:** {donor.donations_count}")
+            if donor.donations_count > 0:
+                st.write(f"**إجمالي التبرعات:** {donor.total_amount:,.2f} {CURRENCY_NAME}")
+                st.write(f"**أول تبرع:** {donor.first_donation_date or '-'}")
+                st.write(f"**آخر تبرع:** {donor.last_donation_date or '-'}")
+    
+    # التنقل بين الصفحات
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(cursors) > 1 and st.button("➡️ السابق", key="donors_prev", use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"الصفحة {len(cursors)}")
+    with col_next:
+        if page.has_more and st.button("التالي ⬅️", key="donors_next", use_container_width=True):
+            cursors.append(page.next_cursor)
+            st.rerun()
+
 def _manage_donors(user_data=None):
     """إدارة المتبرعين"""
     st.subheader("👤 إدارة المتبرعين")
@@ -356,56 +449,7 @@ def _manage_donors(user_data=None):
     
     with tab1:
         try:
-            with session_scope() as session:
-                donors = session.query(Donor).order_by(Donor.created_at.desc()).limit(100).all()
-                
-                if not donors:
-                    st.info("📭 لا توجد متبرعين")
-                    return
-                
-                for donor in donors:
-                    with st.expander(f"{'👤' if donor.donor_type == 'individual' else '🏢'} {donor.full_name or donor.company_name}"):
-                        col1, col2, col3 = st.columns([3, 1, 1])
-                        
-                        with col1:
-                            st.write(f"**النوع:** {_get_donor_type_ar(donor.donor_type)}")
-                            st.write(f"**الكود:** {donor.donor_code or 'بدون'}")
-                            st.write(f"**الهاتف:** {donor.phone or 'غير متوفر'}")
-                            st.write(f"**البريد:** {donor.email or 'غير متوفر'}")
-                            st.write(f"**المدينة:** {donor.city or 'غير محدد'}")
-                            st.write(f"**الحالة:** {donor.status}")
-                        
-                        with col2:
-                            if st.button(f"✏️", key=f"edit_donor_{donor.id}", help="تعديل"):
-                                st.session_state.edit_donor_id = donor.id
-                                st.rerun()
-
-                        with col3:
-                            if st.button(f"🗑️", key=f"delete_donor_{donor.id}", type="secondary", help="حذف"):
-                                # استخدام timestamp لمفتاح فريد
-                                import time
-                                confirm_suffix = str(int(time.time()))
-                                
-                                if _delete_donor_with_confirm(donor.id, session, confirm_suffix):
-                                    st.rerun()
-                        st.markdown("---")
-                                    
-                        # عدد تبرعات المتبرع
-                        donations_count = session.query(Donation).filter(
-                            Donation.donor_id == donor.id
-                        ).count()
-                        
-                        st.write(f"**عدد التبرعات:** {donations_count}")
-                        
-                        if donations_count > 0:
-                            # إجمالي تبرعات المتبرع
-                            total_donated = session.query(func.sum(Donation.amount)).filter(
-                                Donation.donor_id == donor.id,
-                                Donation.status.in_(['received', 'verified'])
-                            ).scalar() or 0
-                            
-                            st.write(f"**إجمالي التبرعات:** {total_donated:,.2f} {CURRENCY_NAME}")
-        
+            _show_donors_list()
         except Exception as e:
             st.error(f"حدث خطأ: {str(e)}")
     
@@ -822,6 +866,7 @@ def _edit_donation_form(donation_id: int, user_data=None):
                             donation.amount = new_amount if new_amount > 0 else None
                         
                         donation.updated_at = datetime.now()
+                        assign_receipt_number(session, donation)
                         
                         session.commit()
                         st.success("✅ تم تحديث التبرع!")
@@ -841,106 +886,106 @@ def _show_donation_statistics(user_data=None):
     """عرض إحصائيات التبرعات"""
     st.subheader("📊 إحصائيات التبرعات")
     
+    # الأرقام ضمن نطاق المستخدم (all من جداول التجميع، وغيره باستعلام مقيد)
+    scope = row_scope(user_data, Resource.DONATIONS) if user_data else "all"
+    if scope is None:
+        st.warning("⚠️ ليس لديك صلاحية عرض إحصائيات التبرعات")
+        return
+    if scope in ROW_SCOPE_LABELS:
+        st.caption(f"📌 الإحصائيات تشمل {ROW_SCOPE_LABELS[scope]} فقط")
+    
     try:
-        with session_scope() as session:
-            # إحصائيات أساسية
-            total_donations = session.query(func.sum(Donation.amount)).filter(
-                Donation.status.in_(['received', 'verified'])
-            ).scalar() or 0
-            
-            donations_count = session.query(Donation).count()
-            donors_count = session.query(Donor).filter(Donor.status == 'active').count()
-            
-            # مؤشرات الأداء
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric(f"إجمالي التبرعات ({CURRENCY_NAME})", f"{total_donations:,.2f}")
-            
-            with col2:
-                st.metric("عدد التبرعات", donations_count)
+        # الإحصائيات من الذاكرة المؤقتة (تُحدّث تلقائياً عند تعديل التبرعات)
+        stats = load_donation_statistics(user_data)
+        
+        # مؤشرات الأداء
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric(f"إجمالي التبرعات ({CURRENCY_NAME})", f"{stats.total_amount:,.2f}")
+        
+        with col2:
+            st.metric("عدد التبرعات", stats.donations_count)
+        
+        with col3:
+            st.metric("عدد المتبرعين النشطين", stats.active_donors)
+        
+        # التبرعات المحصلة في الفترة الحالية (من جداول التجميع اليومي)
+        col4, col5 = st.columns(2)
+        
+        with col4:
+            st.metric(
+                f"تبرعات هذا الشهر ({CURRENCY_NAME})",
+                f"{stats.month_amount:,.2f}",
+                delta=f"{stats.month_count} تبرع",
+                delta_color="off"
+            )
+        
+        with col5:
+            st.metric(
+                f"تبرعات هذا الأسبوع ({CURRENCY_NAME})",
+                f"{stats.week_amount:,.2f}",
+                delta=f"{stats.week_count} تبرع",
+                delta_color="off"
+            )
+        
+        st.markdown("---")
+        
+        # توزيع التبرعات حسب النوع
+        st.subheader("📈 توزيع التبرعات حسب النوع")
+        
+        if stats.type_breakdown:
+            type_data = []
+            for donation_type, count, total in stats.type_breakdown:
+                type_data.append({
+                    "النوع": _get_donation_type_ar(donation_type),
+                    "العدد": count,
+                    f"الإجمالي ({CURRENCY_NAME})": f"{total:,.2f}"
+                })
             
-            with col3:
-                st.metric("عدد المتبرعين النشطين", donors_count)
+            st.dataframe(
+                pd.DataFrame(type_data),
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        # أحدث التبرعات
+        st.subheader("🆕 أحدث التبرعات")
+        
+        if stats.recent_donations:
+            recent_data = []
+            for donation in stats.recent_donations:
+                recent_data.append({
+                    "التاريخ": donation.donation_date.strftime("%Y-%m-%d"),
+                    "المتبرع": donation.donor_name or "غير محدد",
+                    "النوع": _get_donation_type_ar(donation.donation_type),
+                    f"المبلغ ({CURRENCY_NAME})": f"{donation.amount:,.2f}",
+                    "الحالة": _get_donation_status_ar(donation.status)
+                })
             
-            st.markdown("---")
+            st.dataframe(
+                pd.DataFrame(recent_data),
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        # أهم المتبرعين
+        st.subheader("🏆 أهم المتبرعين")
+        
+        if stats.top_donors:
+            donor_data = []
+            for donor_name, total, count in stats.top_donors:
+                donor_data.append({
+                    "المتبرع": donor_name or "غير محدد",
+                    f"إجمالي التبرعات ({CURRENCY_NAME})": f"{total:,.2f}",
+                    "عدد التبرعات": count
+                })
             
-            # توزيع التبرعات حسب النوع
-            st.subheader("📈 توزيع التبرعات حسب النوع")
-            
-            type_counts = session.query(
-                Donation.donation_type,
-                func.count(Donation.id),
-                func.sum(Donation.amount)
-            ).group_by(Donation.donation_type).all()
-            
-            if type_counts:
-                type_data = []
-                for tc in type_counts:
-                    type_data.append({
-                        "النوع": _get_donation_type_ar(tc[0]),
-                        "العدد": tc[1],
-                        f"الإجمالي ({CURRENCY_NAME})": f"{tc[2] or 0:,.2f}"
-                    })
-                
-                st.dataframe(
-                    pd.DataFrame(type_data),
-                    use_container_width=True,
-                    hide_index=True
-                )
-            
-            # أحدث التبرعات
-            st.subheader("🆕 أحدث التبرعات")
-            
-            recent_donations = session.query(Donation).order_by(
-                Donation.donation_date.desc()
-            ).limit(10).all()
-            
-            if recent_donations:
-                recent_data = []
-                for donation in recent_donations:
-                    donor_name = donation.donor.full_name if donation.donor else "غير محدد"
-                    recent_data.append({
-                        "التاريخ": donation.donation_date.strftime("%Y-%m-%d"),
-                        "المتبرع": donor_name,
-                        "النوع": _get_donation_type_ar(donation.donation_type),
-                        f"المبلغ ({CURRENCY_NAME})": f"{donation.amount or 0:,.2f}",
-                        "الحالة": _get_donation_status_ar(donation.status)
-                    })
-                
-                st.dataframe(
-                    pd.DataFrame(recent_data),
-                    use_container_width=True,
-                    hide_index=True
-                )
-            
-            # أهم المتبرعين
-            st.subheader("🏆 أهم المتبرعين")
-            
-            top_donors = session.query(
-                Donor.full_name,
-                Donor.company_name,
-                func.sum(Donation.amount),
-                func.count(Donation.id)
-            ).join(Donation).group_by(Donor.id).order_by(
-                func.sum(Donation.amount).desc()
-            ).limit(5).all()
-            
-            if top_donors:
-                donor_data = []
-                for donor in top_donors:
-                    donor_name = donor[0] or donor[1] or "غير محدد"
-                    donor_data.append({
-                        "المتبرع": donor_name,
-                        f"إجمالي التبرعات ({CURRENCY_NAME})": f"{donor[2] or 0:,.2f}",
-                        "عدد التبرعات": donor[3]
-                    })
-                
-                st.dataframe(
-                    pd.DataFrame(donor_data),
-                    use_container_width=True,
-                    hide_index=True
-                )
+            st.dataframe(
+                pd.DataFrame(donor_data),
+                use_container_width=True,
+                hide_index=True
+            )
     
     except Exception as e:
         st.error(f"حدث خطأ في جلب الإحصائيات: {str(e)}")
@@ -0,0 +1,70 @@
+# modules/exports.py
+"""
+واجهة تصدير القوائم إلى Excel/CSV (مشتركة بين الصفحات)
+"""
+
+import streamlit as st
+from config import Config
+from utils.exporter import EXPORTS, export_scope, export_to_file
+
+
+def show_export_panel(export_names, user_data=None, key="export"):
+    """
+    لوحة تصدير لقائمة أو أكثر (حسب صلاحيات المستخدم)
+    """
+    allowed = [
+        name for name in export_names
+        if export_scope(user_data, EXPORTS[name].resource)
+    ]
+    if not allowed:
+        return
+
+    with st.expander("📤 تصدير البيانات"):
+        col1, col2 = st.columns(2)
+        with col1:
+            name = st.selectbox(
+                "البيانات",
+                allowed,
+                format_func=lambda x: EXPORTS[x].title,
+                key=f"{key}_name"
+            )
+        with col2:
+            file_format = st.radio(
+                "الصيغة",
+                ["xlsx", "csv"],
+                format_func=lambda x: {"xlsx": "Excel", "csv": "CSV"}[x],
+                horizontal=True,
+                key=f"{key}_format"
+            )
+
+        scope = export_scope(user_data, EXPORTS[name].resource)
+        if scope == "limited":
+            st.caption(f"ℹ️ صلاحيتك تسمح بتصدير أول {Config.EXPORT_LIMITED_ROWS:,} سجل فقط")
+        elif scope == "department":
+            st.caption("ℹ️ سيتم تصدير سجلات قسمك فقط")
+        elif scope == "own":
+            st.caption("ℹ️ سيتم تصدير السجلات التي أنشأتها فقط")
+
+        result_key = f"{key}_result"
+        if st.button("⚙️ تجهيز الملف", key=f"{key}_prepare"):
+            try:
+                with st.spinner("جاري التصدير..."):
+                    st.session_state[result_key] = export_to_file(name, user_data, file_format)
+            except PermissionError as e:
+                st.error(f"⚠️ {e}")
+                return
+            except Exception as e:
+                st.error(f"❌ فشل التصدير: {str(e)}")
+                return
+
+        result = st.session_state.get(result_key)
+        if result and result.path.exists():
+            st.caption(f"✅ {result.rows:,} صف في {result.elapsed:.2f} ثانية")
+            with open(result.path, "rb") as exported:
+                st.download_button(
+                    f"⬇️ تحميل {result.file_name}",
+                    data=exported,
+                    file_name=result.file_name,
+                    mime=result.mime,
+                    key=f"{key}_download"
+                )
@@ -0,0 +1,152 @@
+# modules/settings.py
+"""
+صفحة الإعدادات (للمدير فقط) - لوحة أداء قاعدة البيانات
+"""
+
+import streamlit as st
+import pandas as pd
+from auth.authentication import session_cache, session_flusher
+from database.cache import stats_cache
+from database.instrumentation import query_recorder
+from database.session import db_manager, get_write_stats
+
+PAGE_NAMES = {
+    "login": "تسجيل الدخول",
+    "dashboard": "لوحة التحكم",
+    "beneficiaries": "المستفيدون",
+    "activities": "الأنشطة",
+    "donations": "التبرعات",
+    "reports": "التقارير",
+    "employees": "الموظفون",
+    "families": "إدارة الأسر",
+    "settings": "الإعدادات",
+}
+
+
+def show_settings(user_data=None):
+    """الواجهة الرئيسية للإعدادات"""
+    st.title("⚙️ الإعدادات")
+
+    if not user_data or user_data.get('role') != 'admin':
+        st.error("⚠️ هذه الصفحة متاحة لمدير النظام فقط")
+        return
+
+    tab1, = st.tabs(["📈 أداء قاعدة البيانات"])
+
+    with tab1:
+        show_performance_panel()
+
+
+def show_performance_panel():
+    """إحصائيات الاستعلامات لكل صفحة وأبطأ الجمل"""
+    summary = query_recorder.summary()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("عدد الاستعلامات", f"{summary['queries']:,}")
+    with col2:
+        st.metric("إجمالي زمن SQL", f"{summary['total_time']:.2f} ث")
+    with col3:
+        st.metric("متوسط الاستعلام", f"{summary['avg_time'] * 1000:.2f} م.ث")
+    with col4:
+        st.metric(
+            "استعلامات بطيئة",
+            f"{summary['slow_queries']:,}",
+            help=f"أبطأ من {summary['slow_query_ms']:.0f} ملي ثانية (مسجلة في logs/slow_queries.log)"
+        )
+
+    if not query_recorder.enabled:
+        st.info("ℹ️ قياس الاستعلامات معطل (QUERY_STATS=0)")
+
+    # ========== لكل صفحة ==========
+    st.markdown("### 📄 الاستعلامات لكل صفحة")
+    pages = query_recorder.page_stats()
+    if pages:
+        st.dataframe(pd.DataFrame([{
+            "الصفحة": PAGE_NAMES.get(page.page, page.page),
+            "مرات التشغيل": page.reruns,
+            "متوسط الاستعلامات": round(page.avg_queries, 1),
+            "أقصى استعلامات": page.max_queries,
+            "متوسط زمن SQL (م.ث)": round(page.sql_time / page.reruns * 1000, 1),
+            "متوسط زمن الصفحة (م.ث)": round(page.elapsed / page.reruns * 1000, 1),
+            "تشغيلات بها N+1": page.n_plus_one,
+        } for page in pages]), use_container_width=True, hide_index=True)
+    else:
+        st.info("لا توجد بيانات بعد")
+
+    # ========== أبطأ الجمل ==========
+    st.markdown("### 🐢 الجمل الأعلى في الزمن الإجمالي")
+    statements = query_recorder.top_statements(limit=20)
+    if statements:
+        st.dataframe(pd.DataFrame([{
+            "الجملة": stmt.statement[:300],
+            "المصدر": stmt.call_site,
+            "مرات التنفيذ": stmt.count,
+            "الإجمالي (م.ث)": round(stmt.total * 1000, 1),
+            "المتوسط (م.ث)": round(stmt.avg * 1000, 2),
+            "الأقصى (م.ث)": round(stmt.max * 1000, 1),
+            "الصفوف المتأثرة": stmt.rows,
+        } for stmt in statements]), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### ⏱️ توزيع زمن الاستعلامات")
+        histogram = query_recorder.histogram()
+        st.bar_chart(pd.Series(histogram, name="عدد الجمل"))
+
+    with col2:
+        st.markdown("### 🔁 آخر مرات التشغيل")
+        reruns = query_recorder.recent_reruns()[:15]
+        if reruns:
+            st.dataframe(pd.DataFrame([{
+                "الصفحة": PAGE_NAMES.get(rerun.page, rerun.page),
+                "الاستعلامات": rerun.queries,
+                "زمن SQL (م.ث)": round(rerun.sql_time * 1000, 1),
+                "زمن الصفحة (م.ث)": round(rerun.elapsed * 1000, 1),
+            } for rerun in reruns]), use_container_width=True, hide_index=True)
+
+    # ========== الكتابة والتهيئة والذاكرة المؤقتة ==========
+    with st.expander("🔒 الكتابة والتهيئة والذاكرة المؤقتة"):
+        writes = get_write_stats()
+        st.write(
+            f"- **عمليات الكتابة:** {writes['writes']:,} "
+            f"(في الانتظار الآن: {writes['waiting']}، أقصى طابور: {writes['max_waiting']})"
+        )
+        st.write(
+            f"- **زمن انتظار الكتابة:** متوسط {writes['avg_wait'] * 1000:.1f} م.ث، "
+            f"أقصى {writes['max_wait'] * 1000:.1f} م.ث"
+        )
+        st.write(
+            f"- **انشغال قاعدة البيانات:** {writes['busy_errors']} خطأ، "
+            f"{writes['retries']} إعادة محاولة، {writes['timeouts']} انتهاء مهلة"
+        )
+
+        timings = db_manager.init_timings
+        if timings:
+            st.write(
+                f"- **تهيئة قاعدة البيانات:** {timings['total'] * 1000:.0f} م.ث "
+                f"(المخطط: {timings['schema'] * 1000:.0f} م.ث)"
+            )
+        st.write(f"- **ملف الاتصال:** {db_manager.profile_name}")
+
+        cache = stats_cache.stats()
+        st.write(
+            f"- **ذاكرة الإحصائيات:** {cache['hits']} إصابة / "
+            f"{cache['misses']} إخفاق ({cache['hit_rate']:.0%})"
+        )
+        
+        sessions = session_cache.stats()
+        st.write(
+            f"- **ذاكرة الجلسات:** {sessions['hits']} إصابة / {sessions['misses']} إخفاق "
+            f"({sessions['hit_rate']:.0%})، {sessions['activity_writes']} تحديث لآخر نشاط"
+        )
+        
+        flusher = session_flusher.stats()
+        st.write(
+            f"- **الكتابة المؤجلة للجلسات:** {flusher['rows_written']} صف في {flusher['flushes']} دفعة، "
+            f"وفرت {flusher['saved_writes']} كتابة (معلق: {flusher['pending']}، فشل: {flusher['failures']})"
+        )
+
+    if st.button("🔄 تصفير الإحصائيات", key="reset_query_stats"):
+        query_recorder.reset()
+        st.rerun()
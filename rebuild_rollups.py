@@ -0,0 +1,31 @@
+# rebuild_rollups.py
+"""
+إعادة بناء جداول التجميع اليومي للتبرعات والأنشطة
+
+يُستخدم مرة واحدة لقواعد البيانات القائمة، أو بعد أي استيراد جماعي
+لا يمر عبر جلسات ORM.
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from database.session import session_scope
+from database.rollups import rebuild_rollups
+
+def main():
+    """إعادة البناء مع عرض عدد الصفوف والوقت المستغرق"""
+    print("🔄 جاري إعادة بناء جداول التجميع اليومي...")
+    started = time.perf_counter()
+    
+    with session_scope() as session:
+        counts = rebuild_rollups(session)
+    
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"   - {table}: {count} صف")
+    print(f"✅ تمت إعادة البناء في {elapsed:.2f} ثانية")
+
+if __name__ == "__main__":
+    main()
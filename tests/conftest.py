@@ -0,0 +1,21 @@
+# tests/conftest.py
+"""
+إعداد الاختبارات: قاعدة بيانات مؤقتة لكل جلسة اختبار
+
+DATABASE_PATH يُضبط قبل استيراد config، فلا تُلمس قاعدة البيانات الحقيقية.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_TMP = Path(tempfile.mkdtemp(prefix="charity_tests_"))
+os.environ["DATABASE_PATH"] = str(_TMP / "test.db")
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from config import Config  # noqa: E402
+
+Config.DATA_DIR = _TMP
+Config.LOGS_DIR = _TMP / "logs"
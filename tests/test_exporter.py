@@ -0,0 +1,68 @@
+# tests/test_exporter.py
+"""اختبارات نطاق التصدير (utils/exporter.py)"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from auth.permissions import permission_manager
+from config import Config
+from database.models import Donation, DonationStatus, Donor, User
+from database.session import read_session_scope, session_scope
+from utils.exporter import EXPORTS, export_scope, scoped_export_query
+
+
+@pytest.fixture(scope="module")
+def department_rows():
+    """موظف وزميل في نفس القسم وموظف في قسم آخر، ولكل منهم تبرع"""
+    with session_scope() as session:
+        users = [
+            User(username=name, email=f"{name}@example.com", password_hash="x",
+                 full_name=name, role="employee", department=department)
+            for name, department in (
+                ("export_dept", "التبرعات"), ("export_peer", "التبرعات"), ("export_other", "الأنشطة"),
+            )
+        ]
+        donors = [Donor(donor_type="individual", full_name=f"متبرع التصدير {i}") for i in range(3)]
+        session.add_all([*users, *donors])
+        session.flush()
+        session.add_all([
+            Donation(donor_id=donor.id, donation_number=f"EXP-{user.username}",
+                     donation_type="cash", donation_date=date.today(), amount=Decimal("10"),
+                     status=DonationStatus.VERIFIED, created_by=user.id)
+            for user, donor in zip(users, donors)
+        ])
+        return {"user_id": users[0].id, "username": "export_dept",
+                "role": "employee", "department": "التبرعات"}
+
+
+@pytest.fixture
+def department_exporter(department_rows, monkeypatch):
+    """الموظف الأول يصدر تبرعات قسمه ومتبرعيه فقط"""
+    monkeypatch.setattr(Config, "USER_PERMISSION_OVERRIDES", {
+        "export_dept": ["-export:*", "+export:donations:department", "+export:donors:department"],
+    })
+    permission_manager.invalidate_user()
+    yield department_rows
+    permission_manager.invalidate_user()
+
+
+def test_department_scope_exports_the_department_rows(department_exporter):
+    assert export_scope(department_exporter, EXPORTS["donations"].resource) == "department"
+
+    with read_session_scope() as session:
+        numbers = {row[0] for row in session.execute(
+            scoped_export_query(EXPORTS["donations"], department_exporter)
+        )}
+        donors = {row[2] for row in session.execute(
+            scoped_export_query(EXPORTS["donors"], department_exporter)
+        )}
+
+    assert numbers == {"EXP-export_dept", "EXP-export_peer"}
+    assert donors == {"متبرع التصدير 0", "متبرع التصدير 1"}
+
+
+def test_missing_export_permission_is_refused(department_exporter):
+    with pytest.raises(PermissionError):
+        scoped_export_query(EXPORTS["activities"], department_exporter)
@@ -0,0 +1,114 @@
+# tests/test_importer.py
+"""اختبارات الاستيراد الجماعي (utils/importer.py)"""
+
+import io
+import sqlite3
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+import utils.importer as importer
+from database.models import Beneficiary, Family, User
+from database.search import search_beneficiary_ids
+from database.session import read_session_scope, session_scope
+
+
+def _csv(*lines) -> io.BytesIO:
+    return io.BytesIO(("﻿" + "\n".join(lines) + "\n").encode("utf-8"))
+
+
+def _fail_once(monkeypatch):
+    """أول دفعة ترفع SQLITE_BUSY بعد الإدخال (فتُعاد المعاملة كاملة)"""
+    calls = []
+    original = importer.mark_tables_changed
+
+    def busy_then_ok(session, *tables):
+        calls.append(tables)
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+        return original(session, *tables)
+
+    monkeypatch.setattr(importer, "mark_tables_changed", busy_then_ok)
+    return calls
+
+
+def _user(username: str) -> int:
+    """إنشاء مستخدم حقيقي ليكون منشئ السجلات المستوردة"""
+    with session_scope() as session:
+        user = User(username=username, email=f"{username}@example.com",
+                    password_hash="x", full_name="مستخدم الاستيراد", role="employee")
+        session.add(user)
+        session.flush()
+        return user.id
+
+
+def test_families_import_survives_busy_retry(monkeypatch):
+    owner = _user("importer_families")
+    assert owner is not None
+
+    calls = _fail_once(monkeypatch)
+    report = importer.import_families(_csv(
+        "كود الأسرة,اسم الأسرة,العنوان",
+        "RETRY-F1,أسرة أ,شارع 1",
+        "RETRY-F2,أسرة ب,شارع 2",
+    ), "families.csv", created_by=owner)
+
+    assert len(calls) == 2
+    assert (report.inserted, report.failed) == (2, 0), report.errors
+    with read_session_scope() as session:
+        owners = session.execute(
+            select(Family.created_by).where(Family.family_code.like("RETRY-F%"))
+        ).scalars().all()
+    assert owners == [owner, owner]
+
+
+def test_beneficiaries_import_survives_busy_retry(monkeypatch):
+    importer.import_families(_csv(
+        "كود الأسرة,اسم الأسرة,العنوان",
+        "RETRY-B,أسرة ج,شارع 3",
+    ), "families.csv")
+    owner = _user("importer_beneficiaries")
+
+    calls = _fail_once(monkeypatch)
+    report = importer.import_beneficiaries(_csv(
+        "كود الأسرة,الاسم بالعربية",
+        "RETRY-B,محمد أحمد",
+        "RETRY-B,سارة أحمد",
+    ), "beneficiaries.csv", created_by=owner)
+
+    assert len(calls) == 2
+    assert (report.inserted, report.failed) == (2, 0), report.errors
+    with read_session_scope() as session:
+        owners = session.execute(
+            select(Beneficiary.created_by)
+            .join(Family, Family.id == Beneficiary.family_id)
+            .where(Family.family_code == "RETRY-B")
+        ).scalars().all()
+    assert owners == [owner, owner]
+
+
+def test_non_finite_number_rejects_only_its_row():
+    report = importer.import_families(_csv(
+        "كود الأسرة,اسم الأسرة,العنوان,عدد الغرف",
+        "NAN-1,أسرة د,شارع 4,2",
+        "NAN-2,أسرة هـ,شارع 5,NaN",
+        "NAN-3,أسرة و,شارع 6,inf",
+    ), "families.csv")
+
+    assert (report.inserted, report.failed) == (1, 2)
+    assert {field for _, field, _ in report.errors} == {"عدد الغرف"}
+
+
+def test_imported_beneficiaries_are_searchable():
+    importer.import_families(_csv(
+        "كود الأسرة,اسم الأسرة,العنوان",
+        "FTS-IMP,أسرة ز,شارع 7",
+    ), "families.csv")
+    report = importer.import_beneficiaries(_csv(
+        "كود الأسرة,الاسم بالعربية",
+        "FTS-IMP,عبدالرحمن المستورد",
+    ), "beneficiaries.csv")
+
+    assert report.inserted == 1
+    with read_session_scope() as session:
+        assert len(search_beneficiary_ids(session, "المستورد")) == 1
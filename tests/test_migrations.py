@@ -0,0 +1,25 @@
+# tests/test_migrations.py
+"""اختبارات الترحيلات (database/migrations.py و migrate.py)"""
+
+from sqlalchemy import delete
+
+from database.migrations import pending_migrations
+from database.models import SchemaMigration
+from database.session import db_manager
+
+
+def test_migration_engine_sees_pending_migrations():
+    db_manager.initialize()
+    engine = db_manager.migration_engine()
+    try:
+        with engine.begin() as connection:
+            connection.execute(delete(SchemaMigration).where(SchemaMigration.version == 3))
+
+        # المحرك المستقل لا يطبق الترحيلات ضمناً، فيظهر الترحيل معلقاً
+        assert [m.version for m in pending_migrations(engine)] == [3]
+
+        results = db_manager.apply_schema(engine)
+        assert [r.version for r in results if r.version is not None] == [3]
+        assert pending_migrations(engine) == []
+    finally:
+        engine.dispose()
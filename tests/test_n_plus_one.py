@@ -0,0 +1,99 @@
+# tests/test_n_plus_one.py
+"""اختبارات كشف N+1 (database/instrumentation.py) على القوائم المعاد كتابتها"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from database.enrolment import count_participants, enrol_beneficiaries, get_participants
+from database.instrumentation import NPlusOneError, assert_no_n_plus_one
+from database.listings import DONOR_SORTS, get_donors_page
+from database.models import (
+    Activity, ActivityCategory, ActivityType, Beneficiary, Donation, DonationStatus, Donor, Family
+)
+from database.session import read_session_scope, session_scope
+
+ROWS = 12
+
+
+@pytest.fixture(scope="module")
+def activities():
+    """نشاطان: الأول به ROWS مشاركاً والثاني بدون مشاركين"""
+    with session_scope() as session:
+        category = ActivityCategory(name="فئة N+1")
+        session.add(category)
+        session.flush()
+        activity_type = ActivityType(category_id=category.id, name="نوع N+1")
+        session.add(activity_type)
+        session.flush()
+        family = Family(family_code="NPLUS1", family_name="أسرة N+1", address="شارع")
+        session.add(family)
+        session.flush()
+
+        beneficiaries = [
+            Beneficiary(family_id=family.id, full_name_ar=f"مشارك {i}", national_id=f"299{i:011d}")
+            for i in range(ROWS)
+        ]
+        busy = Activity(title="نشاط مزدحم", activity_type_id=activity_type.id, start_date=date.today())
+        empty = Activity(title="نشاط فارغ", activity_type_id=activity_type.id, start_date=date.today())
+        session.add_all([*beneficiaries, busy, empty])
+        session.flush()
+        enrol_beneficiaries(session, busy.id, [b.id for b in beneficiaries])
+        return busy.id, empty.id
+
+
+@pytest.fixture(scope="module")
+def donors():
+    """متبرعون لكل منهم تبرعان"""
+    with session_scope() as session:
+        donors = [Donor(donor_type="individual", full_name=f"متبرع N+1 {i}", status="active")
+                  for i in range(ROWS)]
+        session.add_all(donors)
+        session.flush()
+        session.add_all([
+            Donation(donor_id=donor.id, donation_number=f"NP1-{donor.id}-{n}", donation_type="cash",
+                     donation_date=date(2026, 1, n + 1), amount=Decimal("50"),
+                     status=DonationStatus.VERIFIED)
+            for donor in donors for n in range(2)
+        ])
+        return [donor.id for donor in donors]
+
+
+def test_participants_loader_has_no_n_plus_one(activities):
+    busy_id, empty_id = activities
+    with read_session_scope() as session:
+        with assert_no_n_plus_one(threshold=3):
+            rows = get_participants(session, busy_id)
+            # الحقول التي تعرضها صفحة المشاركين لا تطلق استعلامات إضافية
+            shown = [(b.full_name_ar, b.national_id, p.role, p.status) for p, b in rows]
+            counts = count_participants(session, [busy_id, empty_id])
+
+    assert len(shown) == ROWS
+    assert counts == {busy_id: ROWS}
+
+
+@pytest.mark.parametrize("sort", DONOR_SORTS)
+def test_donors_page_has_no_n_plus_one(donors, sort):
+    with read_session_scope() as session:
+        with assert_no_n_plus_one(threshold=3):
+            page = get_donors_page(session, sort=sort, page_size=5)
+            shown = [(row.display_name, row.donations_count, row.total_amount) for row in page.rows]
+            while page.has_more:
+                page = get_donors_page(session, sort=sort, after=page.next_cursor, page_size=5)
+                shown += [(row.display_name, row.donations_count, row.total_amount) for row in page.rows]
+
+    mine = [row for row in shown if row[0].startswith("متبرع N+1")]
+    assert len(mine) == ROWS
+    assert all(count == 2 for _, count, _ in mine)
+
+
+def test_per_row_loop_is_reported(donors):
+    with read_session_scope() as session:
+        with pytest.raises(NPlusOneError):
+            with assert_no_n_plus_one(threshold=3):
+                for donor_id in donors:
+                    session.execute(
+                        select(Donation.amount).where(Donation.donor_id == donor_id)
+                    ).all()
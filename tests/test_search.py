@@ -0,0 +1,80 @@
+# tests/test_search.py
+"""اختبارات فهارس البحث النصي (database/search.py)"""
+
+import sqlite3
+
+from sqlalchemy import text
+
+from config import Config
+from database.models import Beneficiary, Donor, Family
+from database.search import search_beneficiary_ids, search_donor_ids
+from database.session import read_session_scope, session_scope
+
+
+def _family(session, code: str) -> Family:
+    family = Family(family_code=code, family_name="أسرة البحث", address="شارع البحث")
+    session.add(family)
+    session.flush()
+    return family
+
+
+def test_orm_writes_keep_the_index_in_sync():
+    with session_scope() as session:
+        family = _family(session, "FTS-ORM")
+        beneficiary = Beneficiary(family_id=family.id, full_name_ar="إبراهيم مُصطفى")
+        session.add(beneficiary)
+        session.flush()
+        beneficiary_id = beneficiary.id
+
+    with read_session_scope() as session:
+        # التطبيع: الهمزة والتشكيل
+        assert search_beneficiary_ids(session, "ابراهيم مصطفي") == [beneficiary_id]
+
+    with session_scope() as session:
+        session.get(Beneficiary, beneficiary_id).full_name_ar = "يوسف مصطفى"
+
+    with read_session_scope() as session:
+        assert search_beneficiary_ids(session, "ابراهيم") == []
+        assert search_beneficiary_ids(session, "يوسف") == [beneficiary_id]
+
+    with session_scope() as session:
+        session.delete(session.get(Beneficiary, beneficiary_id))
+
+    with read_session_scope() as session:
+        assert search_beneficiary_ids(session, "يوسف") == []
+
+
+def test_rollback_discards_index_changes():
+    try:
+        with session_scope() as session:
+            session.add(Donor(donor_type="individual", full_name="متبرع ملغي", status="active"))
+            session.flush()
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+
+    with read_session_scope() as session:
+        assert search_donor_ids(session, "ملغي") == []
+        assert session.execute(text("SELECT count(*) FROM donors_fts")).scalar() == \
+            session.execute(text("SELECT count(*) FROM donors")).scalar()
+
+
+def test_writes_without_the_app_do_not_need_app_functions():
+    with session_scope() as session:
+        family_id = _family(session, "FTS-RAW").id
+
+    # اتصال sqlite3 عادي (مثل أداة sqlite3 أو سكربت نسخ احتياطي) بدون دوال التطبيق
+    connection = sqlite3.connect(Config.DATABASE_PATH)
+    try:
+        connection.execute(
+            "INSERT INTO beneficiaries (family_id, full_name_ar) VALUES (?, ?)",
+            (family_id, "مستفيد خارجي"),
+        )
+        connection.execute("UPDATE beneficiaries SET phone = '0100' WHERE family_id = ?", (family_id,))
+        connection.execute("DELETE FROM beneficiaries WHERE family_id = ?", (family_id,))
+        connection.execute(
+            "INSERT INTO donors (donor_type, full_name) VALUES ('individual', 'متبرع خارجي')"
+        )
+        connection.commit()
+    finally:
+        connection.close()
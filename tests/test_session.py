@@ -0,0 +1,38 @@
+# tests/test_session.py
+"""اختبارات إعدادات الاتصال (database/session.py)"""
+
+from datetime import date
+
+from database.models import Activity, ActivityCategory, ActivityType, Attachment
+from database.session import read_session_scope, session_scope
+
+
+def test_default_profile_keeps_foreign_keys_off():
+    with read_session_scope() as session:
+        assert session.connection().exec_driver_sql("PRAGMA foreign_keys").scalar() == 0
+
+
+def test_deleting_an_activity_with_attachments_succeeds():
+    with session_scope() as session:
+        category = ActivityCategory(name="فئة الحذف")
+        session.add(category)
+        session.flush()
+        activity_type = ActivityType(category_id=category.id, name="نوع الحذف")
+        session.add(activity_type)
+        session.flush()
+        activity = Activity(title="نشاط للحذف", activity_type_id=activity_type.id,
+                            start_date=date.today())
+        session.add(activity)
+        session.flush()
+        session.add(Attachment(activity_id=activity.id, file_name="a.pdf", file_path="/tmp/a.pdf"))
+        activity_id, type_id, category_id = activity.id, activity_type.id, category.id
+
+    # الحذف كما في صفحة الأنشطة (المرفقات لا تُحذف معه)
+    with session_scope() as session:
+        session.delete(session.get(Activity, activity_id))
+
+    with session_scope() as session:
+        assert session.get(Activity, activity_id) is None
+        session.query(Attachment).filter(Attachment.activity_id == activity_id).delete()
+        session.query(ActivityType).filter(ActivityType.id == type_id).delete()
+        session.query(ActivityCategory).filter(ActivityCategory.id == category_id).delete()
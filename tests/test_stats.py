@@ -0,0 +1,149 @@
+# tests/test_stats.py
+"""اختبارات الذاكرة المؤقتة (database/cache.py) والإحصائيات حسب النطاق (database/stats.py)"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from auth.permissions import permission_manager
+from config import Config
+from database.cache import SnapshotCache, stats_cache
+from database.models import (
+    Activity, ActivityCategory, ActivityStatus, ActivityType, Donation, DonationStatus, User
+)
+from database.session import session_scope
+from database.stats import load_activity_statistics, load_dashboard_snapshot, load_donation_statistics
+
+
+# ============== SnapshotCache ==============
+
+def test_invalidate_during_compute_skips_the_store():
+    cache = SnapshotCache(ttl_seconds=60)
+
+    def compute():
+        # تعديل الجدول أثناء الحساب: القيمة المحسوبة قد تكون قديمة
+        cache.invalidate("donations")
+        return "stale"
+
+    assert cache.get_or_compute("snapshot", compute, depends_on=("donations",)) == "stale"
+    assert cache.get_or_compute("snapshot", lambda: "fresh", depends_on=("donations",)) == "fresh"
+    assert cache.get_or_compute("snapshot", lambda: "again", depends_on=("donations",)) == "fresh"
+    assert cache.stats()["discarded"] == 1
+
+
+def test_unrelated_invalidation_keeps_the_store():
+    cache = SnapshotCache(ttl_seconds=60)
+
+    def compute():
+        cache.invalidate("families")
+        return "value"
+
+    cache.get_or_compute("snapshot", compute, depends_on=("donations",))
+    assert cache.get_or_compute("snapshot", lambda: "other", depends_on=("donations",)) == "value"
+
+
+def test_clear_during_compute_skips_the_store():
+    cache = SnapshotCache(ttl_seconds=60)
+
+    def compute():
+        cache.clear()
+        return "stale"
+
+    cache.get_or_compute("snapshot", compute)
+    assert cache.get_or_compute("snapshot", lambda: "fresh") == "fresh"
+
+
+# ============== الإحصائيات حسب النطاق ==============
+
+@pytest.fixture
+def scoped_users(monkeypatch):
+    """مستخدمان: مدير، وموظف لا يرى إلا أنشطته وتبرعاته"""
+    monkeypatch.setattr(Config, "USER_PERMISSION_OVERRIDES", {
+        "stats_own": ["-view:*", "+view:activities:own", "+view:donations:own", "+view:donors:own"],
+    })
+    permission_manager.invalidate_user()
+    stats_cache.clear()
+
+    with session_scope() as session:
+        owner = User(username="stats_own", email="stats_own@example.com",
+                     password_hash="x", full_name="موظف الإحصائيات", role="employee")
+        other = User(username="stats_other", email="stats_other@example.com",
+                     password_hash="x", full_name="موظف آخر", role="employee")
+        session.add_all([owner, other])
+        session.flush()
+        owner_id, other_id = owner.id, other.id
+
+        category = ActivityCategory(name="فئة الإحصائيات")
+        session.add(category)
+        session.flush()
+        activity_type = ActivityType(category_id=category.id, name="نوع الإحصائيات")
+        session.add(activity_type)
+        session.flush()
+        type_id = activity_type.id
+
+        today = date.today()
+        session.add_all([
+            Activity(title="نشاط خاص", activity_type_id=type_id, start_date=today,
+                     status=ActivityStatus.COMPLETED, created_by=owner_id),
+            Activity(title="نشاط آخر", activity_type_id=type_id, start_date=today,
+                     status=ActivityStatus.PLANNED, created_by=other_id),
+            Activity(title="نشاط ثالث", activity_type_id=type_id, start_date=today,
+                     status=ActivityStatus.PLANNED, created_by=other_id),
+            Donation(donation_number="STATS-1", donation_type="cash", donation_date=today,
+                     amount=Decimal("100"),
+                     status=DonationStatus.VERIFIED, created_by=owner_id),
+            Donation(donation_number="STATS-2", donation_type="cash", donation_date=today,
+                     amount=Decimal("900"),
+                     status=DonationStatus.VERIFIED, created_by=other_id),
+        ])
+
+    yield (
+        {"user_id": owner_id, "username": "stats_own", "role": "employee"},
+        {"user_id": other_id, "username": "admin", "role": "admin"},
+    )
+
+    permission_manager.invalidate_user()
+    stats_cache.clear()
+    with session_scope() as session:
+        session.query(Donation).filter(Donation.created_by.in_([owner_id, other_id])).delete()
+        session.query(Activity).filter(Activity.created_by.in_([owner_id, other_id])).delete()
+        session.query(ActivityType).filter(ActivityType.id == type_id).delete()
+        session.query(ActivityCategory).filter(ActivityCategory.name == "فئة الإحصائيات").delete()
+        session.query(User).filter(User.id.in_([owner_id, other_id])).delete()
+
+
+def test_statistics_follow_the_user_scope(scoped_users):
+    own_user, admin = scoped_users
+
+    own_activities = load_activity_statistics(own_user)
+    assert own_activities.total_activities == 1
+    assert own_activities.completed_activities == 1
+    assert [a.title for a in own_activities.monthly_activities] == ["نشاط خاص"]
+
+    own_donations = load_donation_statistics(own_user)
+    assert own_donations.donations_count == 1
+    assert own_donations.total_amount == 100.0
+
+    # المدير يقرأ جداول التجميع (الكل) في عنصر ذاكرة مستقل
+    admin_activities = load_activity_statistics(admin)
+    assert admin_activities.total_activities >= 3
+    assert load_donation_statistics(admin).total_amount >= 1000.0
+
+    # إعادة الطلب من الذاكرة المؤقتة لا تخلط النطاقين
+    assert load_activity_statistics(own_user).total_activities == 1
+
+
+def test_dashboard_counts_only_rows_in_scope(scoped_users):
+    own_user, admin = scoped_users
+
+    snapshot = load_dashboard_snapshot(own_user)
+    assert snapshot.total_activities == 1
+    assert snapshot.completed_activities == 1
+    assert snapshot.total_donations == 1
+    assert [a.title for a in snapshot.recent_activities] == ["نشاط خاص"]
+    # لا صلاحية عرض على الأسر والمستفيدين بعد الاستثناءات
+    assert snapshot.total_families == 0
+    assert snapshot.total_beneficiaries == 0
+
+    assert load_dashboard_snapshot(admin).total_activities >= 3
@@ -0,0 +1,22 @@
+# tests/test_validators.py
+"""اختبارات دوال التنظيف (utils/validators.py)"""
+
+from decimal import Decimal
+
+import pytest
+
+from utils.validators import ValidationError, clean_decimal, clean_int
+
+
+@pytest.mark.parametrize("value", ["NaN", "nan", "inf", "-Infinity", "sNaN"])
+def test_non_finite_numbers_are_validation_errors(value):
+    with pytest.raises(ValidationError):
+        clean_decimal(value, "المبلغ", minimum=Decimal(0))
+    with pytest.raises(ValidationError):
+        clean_int(value, "عدد الغرف", minimum=0)
+
+
+def test_numbers_are_cleaned():
+    assert clean_decimal("1,500", "المبلغ") == Decimal(1500)
+    assert clean_int("3", "عدد الغرف", minimum=0) == 3
+    assert clean_int(" ", "عدد الغرف") is None
@@ -0,0 +1,341 @@
+# utils/exporter.py - التصدير إلى Excel/CSV
+"""
+تصدير القوائم (المستفيدون، الأسر، الأنشطة، التبرعات، المتبرعون، التخصيصات)
+
+- الصفوف تُقرأ من قاعدة البيانات على دفعات (yield_per) وتُكتب مباشرة
+  في ملف Excel بوضع write_only أو CSV، دون بناء DataFrame كامل في الذاكرة
+- صلاحية التصدير تُفحص عبر permission_manager.for_user(...).can_export
+  (صلاحيات الدور مع استثناءات المستخدم):
+    all: كل السجلات / department: سجلات قسم المستخدم /
+    own: السجلات التي أنشأها المستخدم فقط /
+    limited: عدد محدود من السجلات (Config.EXPORT_LIMITED_ROWS)
+  شرط department و own هو نفسه شرط القوائم (database.scoping.scope_clause)
+- الملفات تُكتب في Config.DATA_DIR/exports وتُحذف القديمة منها تلقائياً
+"""
+
+import csv
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import select, func, case, cast, String, true, false
+
+from auth.permissions import PermissionLevel, Resource, permission_manager
+from config import Config
+from database.models import (
+    Activity, ActivityBeneficiary, ActivityType, Beneficiary, CustomField,
+    Donation, DonationAllocation, Donor, Family, FieldValue
+)
+from database.scoping import scope_clause
+from database.session import read_session_scope
+
+# ترتيب فحص نطاق صلاحية التصدير (من الأوسع إلى الأضيق)
+_EXPORT_SCOPES = ("all", "department", "own", "limited")
+
+# مدة الاحتفاظ بملفات التصدير بالثواني
+_EXPORT_FILE_TTL = 3600
+
+FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    """تعريف قائمة قابلة للتصدير"""
+    title: str
+    resource: Resource
+    columns: Tuple[Tuple[str, Any], ...]  # (عنوان العمود، التعبير)
+    from_clause: Any
+    order_by: Any
+
+    @property
+    def headers(self) -> Tuple[str, ...]:
+        return tuple(label for label, _ in self.columns)
+
+    def query(self):
+        return select(*(expr for _, expr in self.columns)).select_from(
+            self.from_clause
+        ).order_by(self.order_by)
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    """ملف تصدير جاهز للتحميل"""
+    path: Path
+    file_name: str
+    mime: str
+    rows: int
+    elapsed: float
+
+
+# ============== تعريف القوائم ==============
+
+def _custom_fields_text():
+    """قيم الحقول المخصصة للنشاط في نص واحد: "الحقل: القيمة | ..." """
+    value = func.coalesce(
+        FieldValue.text_value,
+        cast(FieldValue.number_value, String),
+        cast(FieldValue.date_value, String),
+        case(
+            (FieldValue.boolean_value == true(), 'نعم'),
+            (FieldValue.boolean_value == false(), 'لا'),
+        ),
+        '',
+    )
+    return (
+        select(func.group_concat(CustomField.field_label_ar + ': ' + value, ' | '))
+        .select_from(FieldValue)
+        .join(CustomField, CustomField.id == FieldValue.custom_field_id)
+        .where(FieldValue.activity_id == Activity.id)
+        .correlate(Activity)
+        .scalar_subquery()
+    )
+
+
+def _participants_count():
+    return (
+        select(func.count(ActivityBeneficiary.id))
+        .where(ActivityBeneficiary.activity_id == Activity.id)
+        .correlate(Activity)
+        .scalar_subquery()
+    )
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "beneficiaries": ExportSpec(
+        title="المستفيدون",
+        resource=Resource.BENEFICIARIES,
+        columns=(
+            ("المعرف", Beneficiary.id),
+            ("كود الأسرة", Family.family_code),
+            ("الاسم بالعربية", Beneficiary.full_name_ar),
+            ("الاسم بالإنجليزية", Beneficiary.full_name_en),
+            ("الرقم القومي", Beneficiary.national_id),
+            ("تاريخ الميلاد", Beneficiary.birth_date),
+            ("النوع", Beneficiary.gender),
+            ("الحالة الاجتماعية", Beneficiary.marital_status),
+            ("الهاتف", Beneficiary.phone),
+            ("المدينة", func.coalesce(Beneficiary.city, Family.city)),
+            ("المهنة", Beneficiary.occupation),
+            ("الدخل الشهري", Beneficiary.monthly_income),
+            ("الحالة", Beneficiary.status),
+            ("تاريخ التسجيل", Beneficiary.registration_date),
+        ),
+        from_clause=Beneficiary.__table__.outerjoin(Family.__table__, Family.id == Beneficiary.family_id),
+        order_by=Beneficiary.id,
+    ),
+    "families": ExportSpec(
+        title="الأسر",
+        resource=Resource.FAMILIES,
+        columns=(
+            ("كود الأسرة", Family.family_code),
+            ("اسم الأسرة", Family.family_name),
+            ("العنوان", Family.address),
+            ("المدينة", Family.city),
+            ("المنطقة", Family.region),
+            ("الهاتف", Family.phone),
+            ("حالة الأسرة", Family.family_status),
+            ("نوع السكن", Family.housing_type),
+            ("عدد الغرف", Family.rooms_count),
+            ("عدد المعالين", Family.dependents_count),
+            ("الدخل الشهري", Family.total_monthly_income),
+            ("تاريخ التسجيل", Family.registration_date),
+        ),
+        from_clause=Family.__table__,
+        order_by=Family.id,
+    ),
+    "activities": ExportSpec(
+        title="الأنشطة",
+        resource=Resource.ACTIVITIES,
+        columns=(
+            ("المعرف", Activity.id),
+            ("العنوان", Activity.title),
+            ("النوع", ActivityType.name),
+            ("تاريخ البدء", Activity.start_date),
+            ("تاريخ الانتهاء", Activity.end_date),
+            ("المكان", Activity.location),
+            ("المدينة", Activity.city),
+            ("الحالة", Activity.status),
+            ("الأولوية", Activity.priority),
+            ("التكلفة المتوقعة", Activity.estimated_cost),
+            ("التكلفة الفعلية", Activity.actual_cost),
+            ("المسؤول", Activity.responsible_person),
+            ("عدد المشاركين", _participants_count()),
+            ("الحقول المخصصة", _custom_fields_text()),
+        ),
+        from_clause=Activity.__table__.outerjoin(
+            ActivityType.__table__, ActivityType.id == Activity.activity_type_id
+        ),
+        order_by=Activity.id,
+    ),
+    "donations": ExportSpec(
+        title="التبرعات",
+        resource=Resource.DONATIONS,
+        columns=(
+            ("رقم التبرع", Donation.donation_number),
+            ("التاريخ", Donation.donation_date),
+            ("المتبرع", func.coalesce(Donor.full_name, Donor.company_name)),
+            ("النوع", Donation.donation_type),
+            ("المبلغ", Donation.amount),
+            ("العملة", Donation.currency),
+            ("طريقة الدفع", Donation.payment_method),
+            ("الحالة", Donation.status),
+            ("رقم الإيصال", Donation.receipt_number),
+            ("الغرض", Donation.purpose),
+            ("زكاة", Donation.is_zakat),
+            ("صدقة", Donation.is_sadaqah),
+        ),
+        from_clause=Donation.__table__.outerjoin(Donor.__table__, Donor.id == Donation.donor_id),
+        order_by=Donation.id,
+    ),
+    "donors": ExportSpec(
+        title="المتبرعون",
+        resource=Resource.DONORS,
+        columns=(
+            ("كود المتبرع", Donor.donor_code),
+            ("النوع", Donor.donor_type),
+            ("الاسم", Donor.full_name),
+            ("الشركة", Donor.company_name),
+            ("الهاتف", Donor.phone),
+            ("البريد الإلكتروني", Donor.email),
+            ("المدينة", Donor.city),
+            ("الحالة", Donor.status),
+            ("أول تبرع", Donor.first_donation_date),
+            ("آخر تبرع", Donor.last_donation_date),
+        ),
+        from_clause=Donor.__table__,
+        order_by=Donor.id,
+    ),
+    "allocations": ExportSpec(
+        title="تخصيصات التبرعات",
+        resource=Resource.DONATIONS,
+        columns=(
+            ("رقم التبرع", Donation.donation_number),
+            ("المستفيد", Beneficiary.full_name_ar),
+            ("النشاط", Activity.title),
+            ("المبلغ المخصص", DonationAllocation.allocated_amount),
+            ("تاريخ التخصيص", DonationAllocation.allocation_date),
+            ("الحالة", DonationAllocation.status),
+            ("تاريخ التوزيع", DonationAllocation.distribution_date),
+            ("الغرض", DonationAllocation.purpose),
+        ),
+        from_clause=DonationAllocation.__table__
+        .join(Donation.__table__, Donation.id == DonationAllocation.donation_id)
+        .outerjoin(Beneficiary.__table__, Beneficiary.id == DonationAllocation.beneficiary_id)
+        .outerjoin(Activity.__table__, Activity.id == DonationAllocation.activity_id),
+        order_by=DonationAllocation.id,
+    ),
+}
+
+
+# ============== الصلاحيات ==============
+
+def export_scope(user_data: Optional[dict], resource: Resource) -> Optional[str]:
+    """أوسع نطاق تصدير مسموح للمستخدم على المورد (أو None)"""
+    if not (user_data or {}).get("role"):
+        return None
+    permissions = permission_manager.for_user(user_data)
+    for scope in _EXPORT_SCOPES:
+        if permissions.can_export(resource, scope):
+            return scope
+    return None
+
+
+def scoped_export_query(spec: ExportSpec, user_data: Optional[dict]):
+    """استعلام التصدير بعد تطبيق نطاق الصلاحية"""
+    scope = export_scope(user_data, spec.resource)
+    if scope is None:
+        raise PermissionError(f"لا توجد صلاحية لتصدير {spec.title}")
+
+    query = spec.query()
+    if scope == "limited":
+        return query.limit(Config.EXPORT_LIMITED_ROWS)
+    if scope != "all":
+        # نفس شرط القوائم: المستفيد عبر أسرته، والمتبرع عبر تبرعاته
+        query = query.where(scope_clause(user_data, spec.resource, PermissionLevel.EXPORT))
+    return query
+
+
+# ============== الكتابة ==============
+
+def _cell(value):
+    """تحويل القيمة إلى نوع تقبله openpyxl و csv"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _write_xlsx(path: Path, title: str, headers, rows: Iterator[tuple]) -> int:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.sheet_view.rightToLeft = True
+    sheet.append(headers)
+    count = 0
+    for row in rows:
+        sheet.append([_cell(value) for value in row])
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def _write_csv(path: Path, title: str, headers, rows: Iterator[tuple]) -> int:
+    # utf-8-sig حتى يفتح Excel الملف بالعربية بشكل صحيح
+    with open(path, "w", encoding="utf-8-sig", newline="") as stream:
+        writer = csv.writer(stream)
+        writer.writerow(headers)
+        count = 0
+        for row in rows:
+            writer.writerow([_cell(value) for value in row])
+            count += 1
+    return count
+
+
+_WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv}
+
+
+def _exports_dir() -> Path:
+    """مجلد ملفات التصدير (مع حذف الملفات القديمة)"""
+    directory = Config.DATA_DIR / "exports"
+    directory.mkdir(parents=True, exist_ok=True)
+    cutoff = time.time() - _EXPORT_FILE_TTL
+    for old_file in directory.iterdir():
+        try:
+            if old_file.stat().st_mtime < cutoff:
+                old_file.unlink()
+        except OSError:
+            pass
+    return directory
+
+
+def export_to_file(name: str, user_data: Optional[dict], file_format: str = "xlsx",
+                   chunk_size: int = 1000) -> ExportResult:
+    """تصدير قائمة كاملة إلى ملف مع قراءة الصفوف على دفعات"""
+    spec = EXPORTS[name]
+    writer = _WRITERS[file_format]
+    query = scoped_export_query(spec, user_data)
+
+    started = time.perf_counter()
+    file_name = f"{name}_{datetime.now():%Y%m%d_%H%M%S}.{file_format}"
+    path = _exports_dir() / f"{(user_data or {}).get('user_id', 0)}_{file_name}"
+
+    # لقطة واحدة متسقة طوال التصدير، دون أخذ قفل الكتابة
+    with read_session_scope(snapshot=True) as session:
+        rows = session.execute(query.execution_options(yield_per=chunk_size))
+        count = writer(path, spec.title, spec.headers, rows)
+
+    elapsed = time.perf_counter() - started
+    print(f"📤 تصدير {name}: {count:,} صف في {elapsed:.2f} ثانية")
+    return ExportResult(
+        path=path, file_name=file_name, mime=FORMATS[file_format],
+        rows=count, elapsed=elapsed,
+    )
@@ -0,0 +1,57 @@
+# utils/helpers.py - دوال مساعدة عامة
+"""
+دوال مساعدة مشتركة بين وحدات النظام
+"""
+
+import re
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+
+def month_bounds(today: date = None) -> Tuple[date, date]:
+    """أول وآخر يوم في شهر التاريخ المحدد"""
+    today = today or date.today()
+    first_day = today.replace(day=1)
+    if first_day.month == 12:
+        next_month = first_day.replace(year=first_day.year + 1, month=1)
+    else:
+        next_month = first_day.replace(month=first_day.month + 1)
+    return first_day, next_month - timedelta(days=1)
+
+
+def week_bounds(today: date = None) -> Tuple[date, date]:
+    """أول وآخر يوم في أسبوع التاريخ المحدد (يبدأ الأسبوع يوم الإثنين)"""
+    today = today or date.today()
+    start_week = today - timedelta(days=today.weekday())
+    return start_week, start_week + timedelta(days=6)
+
+
+# ============== تطبيع النص العربي ==============
+
+# التشكيل وعلامات القرآن
+_ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]')
+
+_ARABIC_CHAR_MAP = str.maketrans({
+    # أشكال الألف والهمزة
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و', 'ئ': 'ي',
+    # التاء المربوطة والألف المقصورة
+    'ة': 'ه', 'ى': 'ي',
+    # التطويل
+    'ـ': None,
+    # الأرقام العربية الهندية
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+
+
+def normalize_arabic(text: Optional[str]) -> Optional[str]:
+    """تطبيع النص العربي للبحث
+
+    يحذف التشكيل والتطويل، ويوحد أشكال الألف والهمزة والتاء المربوطة
+    والألف المقصورة والأرقام، ويحول الحروف اللاتينية إلى صغيرة.
+    """
+    if not text:
+        return text
+    text = _ARABIC_DIACRITICS.sub('', text)
+    return text.translate(_ARABIC_CHAR_MAP).lower()
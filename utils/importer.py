@@ -0,0 +1,380 @@
+# utils/importer.py - الاستيراد الجماعي من Excel/CSV
+"""
+استيراد الأسر والمستفيدين من ملفات Excel (.xlsx) و CSV كبيرة
+
+- الصفوف تُقرأ تدفقياً (openpyxl في وضع read_only، و csv.reader)
+  وتُعالج على دفعات، فلا يزيد استهلاك الذاكرة مع حجم الملف
+- كل دفعة يتم التحقق منها ثم إدخالها بجملة INSERT واحدة (executemany)
+  في معاملة مستقلة؛ فشل دفعة لا يلغي الدفعات السابقة
+- التكرار (كود الأسرة، الرقم القومي) يُفحص مقابل قاعدة البيانات لكل دفعة
+  وداخل الدفعة نفسها
+- أخطاء الصفوف تُكتب في تقرير CSV (رقم الصف، الحقل، الرسالة)،
+  ويُحتفظ بعينة محدودة منها في الذاكرة للعرض
+"""
+
+import csv
+import io
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+from config import Config
+from database.cache import mark_tables_changed
+from database.models import Beneficiary, Family
+from database.search import sync_search_rows
+from database.session import run_in_transaction
+from utils.helpers import normalize_arabic
+from utils.validators import (
+    ValidationError, clean_date, clean_decimal, clean_gender, clean_int,
+    clean_national_id, clean_phone, clean_text, is_blank
+)
+
+# عدد الأخطاء المحفوظة في الذاكرة للعرض (التقرير الكامل في ملف CSV)
+MAX_ERROR_SAMPLES = 100
+
+
+class ImportFormatError(ValueError):
+    """الملف غير صالح للاستيراد (نوع غير مدعوم أو أعمدة مطلوبة ناقصة)"""
+
+
+@dataclass(frozen=True)
+class ImportColumn:
+    """عمود في ملف الاستيراد"""
+    field: str
+    label: str
+    clean: Callable[[Any, str], Any]
+    required: bool = False
+
+
+@dataclass
+class ImportReport:
+    """نتيجة عملية الاستيراد"""
+    kind: str
+    total_rows: int = 0
+    inserted: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    error_report_path: Optional[Path] = None
+    errors: List[Tuple[int, str, str]] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total_rows / self.elapsed if self.elapsed else 0.0
+
+
+# ============== الأعمدة ==============
+
+FAMILY_COLUMNS = (
+    ImportColumn('family_code', 'كود الأسرة', partial(clean_text, max_length=20, required=True), True),
+    ImportColumn('family_name', 'اسم الأسرة', partial(clean_text, max_length=100, required=True), True),
+    ImportColumn('address', 'العنوان', partial(clean_text, required=True), True),
+    ImportColumn('city', 'المدينة', partial(clean_text, max_length=50)),
+    ImportColumn('region', 'المنطقة', partial(clean_text, max_length=50)),
+    ImportColumn('phone', 'الهاتف', clean_phone),
+    ImportColumn('phone2', 'هاتف آخر', clean_phone),
+    ImportColumn('family_status', 'حالة الأسرة', partial(clean_text, max_length=30)),
+    ImportColumn('housing_type', 'نوع السكن', partial(clean_text, max_length=30)),
+    ImportColumn('rooms_count', 'عدد الغرف', partial(clean_int, minimum=0)),
+    ImportColumn('dependents_count', 'عدد المعالين', partial(clean_int, minimum=0)),
+    ImportColumn('total_monthly_income', 'الدخل الشهري', partial(clean_decimal, minimum=Decimal('0'))),
+    ImportColumn('income_source', 'مصدر الدخل', clean_text),
+    ImportColumn('notes', 'ملاحظات', clean_text),
+)
+
+BENEFICIARY_COLUMNS = (
+    ImportColumn('family_code', 'كود الأسرة', partial(clean_text, max_length=20, required=True), True),
+    ImportColumn('full_name_ar', 'الاسم بالعربية', partial(clean_text, max_length=100, required=True), True),
+    ImportColumn('full_name_en', 'الاسم بالإنجليزية', partial(clean_text, max_length=100)),
+    ImportColumn('first_name', 'الاسم الأول', partial(clean_text, max_length=50)),
+    ImportColumn('father_name', 'اسم الأب', partial(clean_text, max_length=50)),
+    ImportColumn('grandfather_name', 'اسم الجد', partial(clean_text, max_length=50)),
+    ImportColumn('family_name', 'اسم العائلة', partial(clean_text, max_length=50)),
+    ImportColumn('national_id', 'الرقم القومي', clean_national_id),
+    ImportColumn('birth_date', 'تاريخ الميلاد', clean_date),
+    ImportColumn('gender', 'النوع', clean_gender),
+    ImportColumn('marital_status', 'الحالة الاجتماعية', partial(clean_text, max_length=20)),
+    ImportColumn('phone', 'الهاتف', clean_phone),
+    ImportColumn('phone2', 'هاتف آخر', clean_phone),
+    ImportColumn('email', 'البريد الإلكتروني', partial(clean_text, max_length=100)),
+    ImportColumn('address', 'العنوان', clean_text),
+    ImportColumn('city', 'المدينة', partial(clean_text, max_length=50)),
+    ImportColumn('region', 'المنطقة', partial(clean_text, max_length=50)),
+    ImportColumn('occupation', 'المهنة', partial(clean_text, max_length=100)),
+    ImportColumn('monthly_income', 'الدخل الشهري', partial(clean_decimal, minimum=Decimal('0'))),
+    ImportColumn('status', 'الحالة', partial(clean_text, max_length=20)),
+    ImportColumn('registration_date', 'تاريخ التسجيل', clean_date),
+)
+
+
+def template_csv(columns) -> bytes:
+    """ملف CSV فارغ بعناوين الأعمدة (قالب للمستخدم)"""
+    return ("\ufeff" + ",".join(column.label for column in columns) + "\n").encode("utf-8")
+
+
+# ============== قراءة الملفات تدفقياً ==============
+
+def _header_map(header, columns) -> Dict[int, ImportColumn]:
+    """ربط أرقام أعمدة الملف بالحقول (بالاسم العربي أو الإنجليزي)"""
+    by_name = {}
+    for column in columns:
+        by_name[normalize_arabic(column.field)] = column
+        by_name[normalize_arabic(column.label)] = column
+
+    mapping = {}
+    for index, name in enumerate(header):
+        if name is None:
+            continue
+        column = by_name.get(normalize_arabic(str(name).strip()))
+        if column is not None:
+            mapping[index] = column
+
+    found = {column.field for column in mapping.values()}
+    missing = [column.label for column in columns if column.required and column.field not in found]
+    if missing:
+        raise ImportFormatError(f"أعمدة مطلوبة غير موجودة: {'، '.join(missing)}")
+    return mapping
+
+
+def _iter_xlsx(source) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(source) -> Iterator[list]:
+    if hasattr(source, "read"):
+        stream = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+        try:
+            yield from csv.reader(stream)
+        finally:
+            stream.detach()
+    else:
+        with open(source, encoding="utf-8-sig", newline="") as stream:
+            yield from csv.reader(stream)
+
+
+def iter_rows(source, filename: str, columns) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """صفوف الملف كقواميس (رقم الصف، الحقل -> القيمة) دون تحميل الملف كاملاً"""
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".xlsx":
+        rows = _iter_xlsx(source)
+    elif suffix == ".csv":
+        rows = _iter_csv(source)
+    else:
+        raise ImportFormatError("نوع الملف غير مدعوم (xlsx أو csv فقط)")
+
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError("الملف فارغ")
+    mapping = _header_map(header, columns)
+
+    for row_number, row in enumerate(rows, start=2):
+        values = {column.field: row[index] for index, column in mapping.items() if index < len(row)}
+        if all(is_blank(value) for value in values.values()):
+            continue
+        yield row_number, values
+
+
+def _clean_row(raw: Dict[str, Any], columns) -> Tuple[Dict[str, Any], List[ValidationError]]:
+    """تنظيف كل حقول الصف وجمع كل الأخطاء (وليس أول خطأ فقط)"""
+    values, errors = {}, []
+    for column in columns:
+        try:
+            values[column.field] = column.clean(raw.get(column.field), column.label)
+        except ValidationError as e:
+            errors.append(e)
+    return values, errors
+
+
+# ============== تقرير الأخطاء ==============
+
+class _ErrorLog:
+    """كتابة أخطاء الصفوف في ملف CSV مع عينة محدودة في الذاكرة"""
+
+    def __init__(self, report: ImportReport):
+        self.report = report
+        self._file = None
+        self._writer = None
+
+    def add(self, row_number: int, field_label: str, message: str):
+        if self._writer is None:
+            path = Config.LOGS_DIR / "imports" / (
+                f"{self.report.kind}_errors_{datetime.now():%Y%m%d_%H%M%S}.csv"
+            )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "w", encoding="utf-8-sig", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["رقم الصف", "الحقل", "الخطأ"])
+            self.report.error_report_path = path
+
+        self._writer.writerow([row_number, field_label, message])
+        if len(self.report.errors) < MAX_ERROR_SAMPLES:
+            self.report.errors.append((row_number, field_label, message))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+# ============== التنفيذ ==============
+
+class _ChunkErrors(list):
+    """أخطاء دفعة واحدة بنفس واجهة _ErrorLog (تُنقل إلى السجل بعد حفظ الدفعة)"""
+
+    def add(self, row_number: int, field_label: str, message: str):
+        self.append((row_number, field_label, message))
+
+
+def _run_import(kind: str, source, filename: str, columns, table, check_chunk,
+                chunk_size: int, on_progress: Optional[Callable[[ImportReport], None]]) -> ImportReport:
+    """قراءة الملف على دفعات: تحقق، ثم فحص التكرار، ثم إدخال الدفعة في معاملة واحدة"""
+    report = ImportReport(kind=kind)
+    errors = _ErrorLog(report)
+    started = time.perf_counter()
+    rows = iter_rows(source, filename, columns)
+
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            cleaned = []
+            for row_number, raw in chunk:
+                values, row_errors = _clean_row(raw, columns)
+                if row_errors:
+                    report.failed += 1
+                    for error in row_errors:
+                        errors.add(row_number, error.field, error.message)
+                else:
+                    cleaned.append((row_number, values))
+
+            def save_chunk(session):
+                # أخطاء التكرار تُسجل بعد نجاح المعاملة (قد تُعاد عند انشغال قاعدة البيانات)
+                chunk_errors = _ChunkErrors()
+                accepted = check_chunk(session, cleaned, chunk_errors)
+                if accepted:
+                    ids = session.execute(
+                        insert(table).returning(table.c.id), [values for _, values in accepted]
+                    ).scalars().all()
+                    # فهرس البحث يُحدث من التطبيق (لا توجد triggers)
+                    sync_search_rows(session.connection(), table.name, ids)
+                    mark_tables_changed(session, table.name)
+                return accepted, chunk_errors
+
+            try:
+                accepted, chunk_errors = run_in_transaction(save_chunk)
+                for error in chunk_errors:
+                    errors.add(*error)
+                report.inserted += len(accepted)
+                report.failed += len(cleaned) - len(accepted)
+            except Exception as e:
+                # فشل الدفعة كاملة (تم التراجع عنها)
+                report.failed += len(cleaned)
+                for row_number, _ in cleaned:
+                    errors.add(row_number, "-", f"فشل حفظ الدفعة: {e}")
+
+            report.total_rows += len(chunk)
+            report.elapsed = time.perf_counter() - started
+            if on_progress:
+                on_progress(report)
+    finally:
+        errors.close()
+
+    report.elapsed = time.perf_counter() - started
+    print(f"📥 استيراد {kind}: {report.inserted:,} مضاف، {report.failed:,} مرفوض "
+          f"({report.rows_per_second:,.0f} صف/ثانية)")
+    return report
+
+
+# دوال الفحص لا تعدل قواميس cleaned: المعاملة قد تُعاد بنفس الدفعة عند انشغال قاعدة البيانات
+
+def _check_families(created_by, session, cleaned, errors):
+    """استبعاد الأكواد المكررة في الدفعة أو الموجودة مسبقاً"""
+    codes = [values['family_code'] for _, values in cleaned]
+    existing = set(session.execute(
+        select(Family.family_code).where(Family.family_code.in_(codes))
+    ).scalars())
+
+    accepted, seen = [], set()
+    for row_number, values in cleaned:
+        code = values['family_code']
+        if code in existing or code in seen:
+            errors.add(row_number, 'كود الأسرة', f"الكود {code} موجود مسبقاً")
+            continue
+        seen.add(code)
+        accepted.append((row_number, {
+            **values, 'registration_date': date.today(), 'created_by': created_by,
+        }))
+    return accepted
+
+
+def _check_beneficiaries(family_ids: Dict[str, int], created_by, session, cleaned, errors):
+    """ربط كود الأسرة بمعرفها واستبعاد الأرقام القومية المكررة"""
+    # الأكواد الجديدة فقط تُجلب من قاعدة البيانات، والباقي من الذاكرة
+    unknown_codes = {values['family_code'] for _, values in cleaned} - family_ids.keys()
+    if unknown_codes:
+        family_ids.update(session.execute(
+            select(Family.family_code, Family.id).where(Family.family_code.in_(unknown_codes))
+        ).all())
+
+    national_ids = [values['national_id'] for _, values in cleaned if values['national_id']]
+    existing = set(session.execute(
+        select(Beneficiary.national_id).where(Beneficiary.national_id.in_(national_ids))
+    ).scalars()) if national_ids else set()
+
+    accepted, seen = [], set()
+    for row_number, values in cleaned:
+        values = dict(values)
+        code = values.pop('family_code')
+        family_id = family_ids.get(code)
+        if family_id is None:
+            errors.add(row_number, 'كود الأسرة', f"لا توجد أسرة بالكود {code}")
+            continue
+
+        national_id = values['national_id']
+        if national_id and (national_id in existing or national_id in seen):
+            errors.add(row_number, 'الرقم القومي', f"الرقم {national_id} مسجل مسبقاً")
+            continue
+        if national_id:
+            seen.add(national_id)
+
+        values['family_id'] = family_id
+        values['status'] = values['status'] or 'active'
+        values['registration_date'] = values['registration_date'] or date.today()
+        values['created_by'] = created_by
+        accepted.append((row_number, values))
+    return accepted
+
+
+def import_families(source, filename: str, created_by: int = None,
+                    chunk_size: int = None,
+                    on_progress: Callable[[ImportReport], None] = None) -> ImportReport:
+    """استيراد الأسر من ملف xlsx/csv"""
+    return _run_import(
+        "families", source, filename, FAMILY_COLUMNS, Family.__table__,
+        partial(_check_families, created_by),
+        chunk_size or Config.IMPORT_CHUNK_SIZE, on_progress,
+    )
+
+
+def import_beneficiaries(source, filename: str, created_by: int = None,
+                         chunk_size: int = None,
+                         on_progress: Callable[[ImportReport], None] = None) -> ImportReport:
+    """استيراد المستفيدين من ملف xlsx/csv (كل صف مرتبط بكود أسرة موجودة)"""
+    return _run_import(
+        "beneficiaries", source, filename, BENEFICIARY_COLUMNS, Beneficiary.__table__,
+        partial(_check_beneficiaries, {}, created_by),
+        chunk_size or Config.IMPORT_CHUNK_SIZE, on_progress,
+    )
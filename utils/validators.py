@@ -0,0 +1,137 @@
+# utils/validators.py - التحقق من صحة البيانات
+"""
+دوال التحقق من المدخلات وتنظيفها (النماذج والاستيراد الجماعي)
+
+كل دالة clean_* تعيد القيمة بعد التنظيف أو ترفع ValidationError برسالة عربية
+"""
+
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Optional
+
+from utils.helpers import normalize_arabic
+
+
+class ValidationError(ValueError):
+    """خطأ في التحقق من قيمة حقل"""
+
+    def __init__(self, field: str, message: str):
+        super().__init__(f"{field}: {message}")
+        self.field = field
+        self.message = message
+
+
+_NATIONAL_ID_PATTERN = re.compile(r'^[23]\d{13}$')
+_PHONE_PATTERN = re.compile(r'^\+?\d{7,15}$')
+_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+_GENDERS = {
+    'm': 'M', 'male': 'M', 'ذكر': 'M',
+    'f': 'F', 'female': 'F', 'انثي': 'F',
+}
+
+
+def is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def clean_text(value: Any, field: str, max_length: int = None,
+               required: bool = False) -> Optional[str]:
+    """نص بعد حذف المسافات الزائدة"""
+    if is_blank(value):
+        if required:
+            raise ValidationError(field, "حقل مطلوب")
+        return None
+    text = str(value).strip()
+    if max_length and len(text) > max_length:
+        raise ValidationError(field, f"أطول من {max_length} حرف")
+    return text
+
+
+def _digits(value: Any) -> str:
+    """تحويل القيمة إلى نص أرقام (يدعم الأرقام العربية والقيم الرقمية من Excel)"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return normalize_arabic(str(value).strip()).replace(' ', '').replace('-', '')
+
+
+def clean_national_id(value: Any, field: str = "الرقم القومي",
+                      required: bool = False) -> Optional[str]:
+    """الرقم القومي المصري (14 رقماً يبدأ بـ 2 أو 3)"""
+    if is_blank(value):
+        if required:
+            raise ValidationError(field, "حقل مطلوب")
+        return None
+    national_id = _digits(value)
+    if not _NATIONAL_ID_PATTERN.match(national_id):
+        raise ValidationError(field, "يجب أن يكون 14 رقماً يبدأ بـ 2 أو 3")
+    return national_id
+
+
+def clean_phone(value: Any, field: str = "الهاتف", required: bool = False) -> Optional[str]:
+    """رقم هاتف من 7 إلى 15 رقماً"""
+    if is_blank(value):
+        if required:
+            raise ValidationError(field, "حقل مطلوب")
+        return None
+    phone = _digits(value)
+    if not _PHONE_PATTERN.match(phone):
+        raise ValidationError(field, "رقم هاتف غير صالح")
+    return phone
+
+
+def clean_date(value: Any, field: str, required: bool = False) -> Optional[date]:
+    """تاريخ من قيمة Excel أو نص بأحد الصيغ المعروفة"""
+    if is_blank(value):
+        if required:
+            raise ValidationError(field, "حقل مطلوب")
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = normalize_arabic(str(value).strip())
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise ValidationError(field, "تاريخ غير صالح (YYYY-MM-DD)")
+
+
+def clean_gender(value: Any, field: str = "النوع") -> Optional[str]:
+    """النوع: M أو F (يقبل ذكر/أنثى)"""
+    if is_blank(value):
+        return None
+    gender = _GENDERS.get(normalize_arabic(str(value).strip()))
+    if gender is None:
+        raise ValidationError(field, "يجب أن يكون ذكر أو أنثى")
+    return gender
+
+
+def clean_decimal(value: Any, field: str, minimum: Decimal = None) -> Optional[Decimal]:
+    """قيمة عشرية (مبالغ)"""
+    if is_blank(value):
+        return None
+    try:
+        number = Decimal(normalize_arabic(str(value).strip()).replace(',', ''))
+    except InvalidOperation:
+        raise ValidationError(field, "قيمة رقمية غير صالحة")
+    # NaN و Infinity تُقرأ كـ Decimal لكنها ليست قيماً صالحة (وتفشل المقارنة مع NaN)
+    if not number.is_finite():
+        raise ValidationError(field, "قيمة رقمية غير صالحة")
+    if minimum is not None and number < minimum:
+        raise ValidationError(field, f"يجب ألا تقل عن {minimum}")
+    return number
+
+
+def clean_int(value: Any, field: str, minimum: int = None) -> Optional[int]:
+    """عدد صحيح"""
+    number = clean_decimal(value, field, minimum)
+    if number is None:
+        return None
+    if number != number.to_integral_value():
+        raise ValidationError(field, "يجب أن يكون عدداً صحيحاً")
+    return int(number)
+